@@ -1,17 +1,34 @@
 from flask import (
     Flask, render_template, redirect, url_for, request, flash, g,
-    send_from_directory, abort, session
+    abort, session, jsonify, make_response, send_from_directory
 )
 from flask_login import (
     LoginManager, login_user, logout_user, login_required,
     current_user, UserMixin
 )
 
-import sqlite3, os, urllib.parse
-import werkzeug.utils as utils
+import sqlite3, os, urllib.parse, json, hashlib, glob, atexit, time
+from datetime import datetime, timezone
 from functools import wraps
 import os
 
+from db_pool import ConnectionPool, connect as connect_db
+from progress_writer import ProgressWriter
+import migrations
+import progress
+import cache
+import credentials
+import ratelimit
+import metrics
+import media
+import images
+import jobs
+import l10n
+import lesson_html
+import pagination
+import search
+import uploads
+
 # === المسارات الأساسية ===
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 DB_PATH = os.path.join(BASE_DIR, 'instance', 'db.sqlite')
@@ -22,8 +39,72 @@ os.makedirs(os.path.join(BASE_DIR, 'instance'), exist_ok=True)
 # === إعداد التطبيق ===
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'replace-with-secure-key')
-app.config['DATABASE'] = DB_PATH
-app.config['UPLOAD_FOLDER'] = UPLOAD_DIR
+# DATABASE / UPLOAD_FOLDER من البيئة لتشغيل خادم الإنتاج أو القياس على نسخة أخرى
+app.config['DATABASE'] = os.environ.get('DATABASE', DB_PATH)
+app.config['UPLOAD_FOLDER'] = os.environ.get('UPLOAD_FOLDER', UPLOAD_DIR)
+# حجم مجمّع اتصالات SQLite لكل عامل (0 = اتصال جديد لكل طلب كما في السابق)
+app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 8))
+app.config['DB_CACHED_STATEMENTS'] = int(os.environ.get('DB_CACHED_STATEMENTS', 256))
+# مخزن تقدم الطلاب: rows (user_progress) أو bitset (progress_bitsets)
+app.config['PROGRESS_BACKEND'] = os.environ.get('PROGRESS_BACKEND', 'rows')
+# كتابة mark_watched (progress_writer.py): دفعة واحدة كل PROGRESS_FLUSH_INTERVAL ثانية
+# أو عند PROGRESS_FLUSH_SIZE حدثاً؛ 0 = معاملة لكل نقرة كما في السابق
+app.config['PROGRESS_FLUSH_INTERVAL'] = float(os.environ.get('PROGRESS_FLUSH_INTERVAL', 0.05))
+app.config['PROGRESS_FLUSH_SIZE'] = int(os.environ.get('PROGRESS_FLUSH_SIZE', 500))
+# مدة تذكر "الدرس ← الدورة" و"الالتحاق مقبول" لـ mark_watched (الكتابة تعيد التحقق دائماً)
+app.config['PROGRESS_LOOKUP_TTL'] = int(os.environ.get('PROGRESS_LOOKUP_TTL', 60))
+# ذاكرة مؤقتة للصفحة الرئيسية: memory (LRU لكل عامل) أو file (مشتركة بين العمال) أو none
+app.config['CACHE_BACKEND'] = os.environ.get('CACHE_BACKEND', 'memory')
+app.config['CACHE_TTL'] = int(os.environ.get('CACHE_TTL', 300))
+app.config['CACHE_MAXSIZE'] = int(os.environ.get('CACHE_MAXSIZE', 256))
+app.config['CACHE_DIR'] = os.path.join(BASE_DIR, 'instance', 'cache')
+# ذاكرة مؤقتة لبيانات المستخدم في user_loader (بدل استعلام users في كل طلب مسجل الدخول)
+# نفس الخيارات: memory (لكل عامل) | file (مشتركة بين العمال على نفس الجهاز) | none
+app.config['USER_CACHE_BACKEND'] = os.environ.get('USER_CACHE_BACKEND', 'memory')
+app.config['USER_CACHE_TTL'] = int(os.environ.get('USER_CACHE_TTL', 60))
+app.config['USER_CACHE_MAXSIZE'] = int(os.environ.get('USER_CACHE_MAXSIZE', 4096))
+app.config['USER_CACHE_DIR'] = os.path.join(BASE_DIR, 'instance', 'cache', 'users')
+# تجزئة كلمات المرور (credentials.py): تكلفة scrypt، وعدد الخيوط والطلبات المنتظرة لها
+# PASSWORD_SCRYPT_N المناسب للجهاز: python credentials.py --calibrate [ms]
+app.config['PASSWORD_SCRYPT_N'] = int(os.environ.get('PASSWORD_SCRYPT_N', credentials.DEFAULT_N))
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+app.config['PASSWORD_HASH_QUEUE'] = int(os.environ.get('PASSWORD_HASH_QUEUE', 16))
+# تحديد معدل الطلبات (ratelimit.py): memory (لكل عامل) | sqlite (ملف مشترك بين العمال) | none
+# (wsgi.py يجعل sqlite الافتراضي: عدة عمال gunicorn)؛ RATE_LIMIT_DB افتراضياً ratelimit.sqlite بجوار DATABASE
+app.config['RATE_LIMIT_BACKEND'] = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+app.config['RATE_LIMIT_DB'] = os.environ.get('RATE_LIMIT_DB')
+# لكل مسار: "نطاق:عدد/مدة" مفصولة بفواصل؛ ip = عنوان العميل، user = المستخدم (أو البريد المُدخل في الدخول)
+app.config['RATE_LIMITS'] = {
+    'login': os.environ.get('RATE_LIMIT_LOGIN', 'ip:20/minute, user:10/minute'),
+    'register': os.environ.get('RATE_LIMIT_REGISTER', 'ip:5/minute'),
+    'enroll': os.environ.get('RATE_LIMIT_ENROLL', 'ip:30/minute, user:10/minute'),
+}
+# تقديم الملفات المرفوعة: none (Flask يرسل الملف) | x-accel (nginx) | x-sendfile (Apache/lighttpd)
+app.config['MEDIA_OFFLOAD'] = os.environ.get('MEDIA_OFFLOAD', 'none')
+app.config['MEDIA_ACCEL_PREFIX'] = os.environ.get('MEDIA_ACCEL_PREFIX', '/_protected_uploads/')
+# max-age للأسماء غير المبنية على البصمة (0 = تحقق عبر ETag في كل مرة)
+app.config['MEDIA_MAX_AGE'] = int(os.environ.get('MEDIA_MAX_AGE', 0))
+# الرفع المجزأ: الحد الأقصى لحجم الملف ولحجم كل مقطع (PATCH)
+app.config['UPLOAD_MAX_SIZE'] = int(os.environ.get('UPLOAD_MAX_SIZE', 8 * 1024 ** 3))
+app.config['UPLOAD_CHUNK_MAX'] = int(os.environ.get('UPLOAD_CHUNK_MAX', 64 * 1024 ** 2))
+# طابور المهام (jobs.py): خيوط التنفيذ داخل كل عامل (0 = عامل مستقل فقط: python jobs.py --work)
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))
+app.config['JOB_POLL_INTERVAL'] = float(os.environ.get('JOB_POLL_INTERVAL', 2.0))
+# قياس الطلبات (metrics.py): زمن كل عبارة SQL وعرض القوالب لكل مسار في /admin/metrics
+app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '0') == '1'
+# محلل العينات: مكدسات كل طلب أبطأ من PROFILE_SLOW_MS تُحفظ في PROFILE_DIR (0 = معطل)
+app.config['PROFILE_SLOW_MS'] = float(os.environ.get('PROFILE_SLOW_MS', 0))
+app.config['PROFILE_INTERVAL'] = float(os.environ.get('PROFILE_INTERVAL', 0.005))
+app.config['PROFILE_DIR'] = os.path.join(BASE_DIR, 'instance', 'profiles')
+# الواجهة الحية (live.py، ASGI) كما يراها المتصفح على نفس النطاق، مثلاً /live خلف nginx ('' = معطلة)
+app.config['LIVE_URL'] = os.environ.get('LIVE_URL', '').rstrip('/')
+# استطلاع طلبات التسجيل الجديدة: مرة لكل عملية live مهما كان عدد المدراء المتصلين
+app.config['LIVE_POLL_INTERVAL'] = float(os.environ.get('LIVE_POLL_INTERVAL', 1.0))
+app.config['LIVE_PING_INTERVAL'] = float(os.environ.get('LIVE_PING_INTERVAL', 15))
+# نبضات موضع المشاهدة: كل كم ثانية ترسلها الصفحة، وكل كم ثانية تُكتب المجمّعة، ونسبة المدة التي تعني الإكمال
+app.config['LIVE_HEARTBEAT_INTERVAL'] = int(os.environ.get('LIVE_HEARTBEAT_INTERVAL', 15))
+app.config['LIVE_FLUSH_INTERVAL'] = float(os.environ.get('LIVE_FLUSH_INTERVAL', 2.0))
+app.config['LIVE_COMPLETE_RATIO'] = float(os.environ.get('LIVE_COMPLETE_RATIO', 0.9))
 ADMIN_PHONE = os.environ.get('ADMIN_PHONE', '+201124592083')  # رقم واتساب المدير
 
 # === إعداد تسجيل الدخول ===
@@ -39,136 +120,424 @@ class User(UserMixin):
         self.fullname = fullname
         self.is_admin = bool(is_admin)
 
+_user_cache = None
+
+def user_cache():
+    global _user_cache
+    if _user_cache is None:
+        _user_cache = cache.make_cache(app.config['USER_CACHE_BACKEND'], ttl=app.config['USER_CACHE_TTL'],
+                                       maxsize=app.config['USER_CACHE_MAXSIZE'],
+                                       directory=app.config['USER_CACHE_DIR'])
+    return _user_cache
+
+
+def forget_user(user_id):
+    # تُستدعى عند تسجيل الخروج وبعد أي تعديل على كلمة المرور أو صلاحية المدير
+    user_cache().delete(f'user:{user_id}')
+
+
+_hasher = None
+
+def hasher():
+    global _hasher
+    if _hasher is None:
+        _hasher = credentials.Hasher(n=app.config['PASSWORD_SCRYPT_N'],
+                                     workers=app.config['PASSWORD_HASH_WORKERS'],
+                                     queue=app.config['PASSWORD_HASH_QUEUE'])
+    return _hasher
+
+
+# === تحديد معدل الطلبات ===
+_rate_store = None
+_rate_rules = {}
+
+def rate_store():
+    global _rate_store
+    if _rate_store is None:
+        path = app.config['RATE_LIMIT_DB'] or os.path.join(os.path.dirname(app.config['DATABASE']),
+                                                           'ratelimit.sqlite')
+        _rate_store = ratelimit.make_store(app.config['RATE_LIMIT_BACKEND'], path)
+    return _rate_store
+
+
+def rate_rules(endpoint):
+    # تُحلل مرة واحدة لكل نص قاعدة (يمكن تغيير RATE_LIMITS أثناء التشغيل، كما في benchmarks)
+    text = app.config['RATE_LIMITS'].get(endpoint, '')
+    if text not in _rate_rules:
+        _rate_rules[text] = ratelimit.parse_rules(text)
+    return _rate_rules[text]
+
+
+def rate_limited(endpoint, user=None):
+    """429 مع Retry-After قبل تنفيذ المسار (طلبات POST فقط: عرض النموذج لا يُحتسب).
+
+    user: دالة تعيد قيمة نطاق user؛ الافتراضي المستخدم الحالي إن كان مسجلاً.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if request.method != 'POST':
+                return f(*args, **kwargs)
+            values = {'ip': request.remote_addr}
+            if user is not None:
+                values['user'] = user()
+            elif current_user.is_authenticated:
+                values['user'] = current_user.id
+            retry_after = ratelimit.check(rate_store(), endpoint, rate_rules(endpoint), values)
+            if retry_after:
+                lang = request.args.get('lang', session.get('lang', 'ar'))
+                message = ('Too many requests, try again in {} seconds' if lang == 'en'
+                           else 'طلبات كثيرة، حاول بعد {} ثانية').format(retry_after)
+                response = make_response(message, 429)
+                response.headers['Retry-After'] = str(retry_after)
+                return response
+            return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
 @login_manager.user_loader
 def load_user(user_id):
-    conn = get_db()
-    cur = conn.execute('SELECT id, username, fullname, is_admin FROM users WHERE id = ?', (user_id,))
-    row = cur.fetchone()
-    if row:
-        return User(row['id'], row['username'], row['fullname'], row['is_admin'])
-    return None
+    # كل إصابة في الذاكرة المؤقتة = استعلام users موفَّر (العدادات في /admin/cache)
+    key = f'user:{user_id}'
+    row = user_cache().get(key)
+    if row is None:
+        conn = get_db()
+        cur = conn.execute('SELECT id, username, fullname, is_admin FROM users WHERE id = ?', (user_id,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        row = tuple(row)
+        user_cache().set(key, row)
+    return User(*row)
+
+# === قياس الطلبات ومحلل العينات (metrics.py) ===
+_metrics = metrics.Registry()
+_sampler = None
+app.jinja_env.template_class = metrics.TimedTemplate
+
+def sampler():
+    global _sampler
+    if _sampler is None:
+        _sampler = metrics.Sampler(app.config['PROFILE_INTERVAL'])
+    return _sampler
+
+
+@app.before_request
+def start_request_metrics():
+    # أول before_request: يشمل القياس user_loader وبقية الخطافات
+    if app.config['METRICS_ENABLED']:
+        metrics.start()
+    if app.config['PROFILE_SLOW_MS'] > 0:
+        sampler().begin()
+        g._profile_started = time.perf_counter()
+
+
+@app.teardown_request
+def finish_request_metrics(exception):
+    route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+    recorder = metrics.stop()
+    if recorder is not None:
+        _metrics.record(request.method, route, recorder, (time.perf_counter() - recorder.started) * 1000)
+    started = g.pop('_profile_started', None)
+    if started is not None:
+        stacks = sampler().end()
+        total_ms = (time.perf_counter() - started) * 1000
+        if total_ms >= app.config['PROFILE_SLOW_MS'] and stacks:
+            metrics.dump_stacks(stacks, app.config['PROFILE_DIR'], f'{request.method}-{route}', total_ms)
 
 # === إدارة قاعدة البيانات ===
+_pool = None
+
+def get_pool():
+    global _pool
+    path = app.config['DATABASE']
+    if _pool is None or _pool.path != path:
+        if _pool is not None:
+            _pool.close_all()
+        _pool = ConnectionPool(path, size=app.config['DB_POOL_SIZE'],
+                               cached_statements=app.config['DB_CACHED_STATEMENTS'],
+                               on_connect=progress.register_functions)
+    return _pool
+
+
+_migrated_paths = set()
+
 def get_db():
     db = getattr(g, '_database', None)
     if db is None:
-        db = g._database = sqlite3.connect(app.config['DATABASE'])
-        db.row_factory = sqlite3.Row
+        if app.config['DB_POOL_SIZE'] > 0:
+            db = get_pool().acquire()
+        else:
+            db = sqlite3.connect(app.config['DATABASE'])
+            db.row_factory = sqlite3.Row
+            progress.register_functions(db)
+        # تطبيق الترحيلات المعلقة عند أول اتصال بهذه القاعدة في هذه العملية
+        if app.config['DATABASE'] not in _migrated_paths:
+            migrations.migrate(db, app.config['UPLOAD_FOLDER'])
+            _migrated_paths.add(app.config['DATABASE'])
+            job_worker()  # مهام بقيت من تشغيل سابق
+        recorder = metrics.current()
+        if recorder is not None:
+            db = metrics.InstrumentedConnection(db, recorder)
+        g._database = db
     return db
 
 
+def progress_store():
+    return progress.get_store(app.config['PROGRESS_BACKEND'])
+
+
+# === كتابة التقدم المجمّعة (mark_watched) ===
+_progress_writer = None
+_progress_writer_key = None
+_progress_lookups = None
+
+def progress_writer():
+    """كاتب التقدم لهذه العملية (يبدأ عند أول حاجة)؛ None إن كان PROGRESS_FLUSH_INTERVAL = 0."""
+    global _progress_writer, _progress_writer_key
+    if app.config['PROGRESS_FLUSH_INTERVAL'] <= 0:
+        return None
+    key = (app.config['DATABASE'], app.config['PROGRESS_BACKEND'])
+    if _progress_writer is None or _progress_writer_key != key:
+        if _progress_writer is not None:
+            _progress_writer.stop()
+        path = app.config['DATABASE']
+        _progress_writer = ProgressWriter(lambda: connect_db(path, on_connect=progress.register_functions),
+                                          progress_store(), interval=app.config['PROGRESS_FLUSH_INTERVAL'],
+                                          max_batch=app.config['PROGRESS_FLUSH_SIZE']).start()
+        _progress_writer_key = key
+    return _progress_writer
+
+
+@atexit.register
+def flush_progress():
+    # الأحداث التي لم تُكتب بعد تُكتب عند إغلاق العملية (مرة على الأقل)
+    if _progress_writer is not None:
+        _progress_writer.stop()
+
+
+def stop_background():
+    """إيقاف خيوط هذه العملية بلطف (خروج عامل gunicorn): التقدم المعلق ثم المهام الجارية."""
+    flush_progress()
+    if _job_worker is not None:
+        _job_worker.stop()
+
+
+def progress_lookups():
+    global _progress_lookups
+    if _progress_lookups is None:
+        _progress_lookups = cache.MemoryCache(maxsize=16384, ttl=app.config['PROGRESS_LOOKUP_TTL'])
+    return _progress_lookups
+
+
+@app.before_request
+def read_own_progress():
+    # اقرأ ما كتبت: أحداث mark_watched المعلقة لهذا المستخدم تُكتب قبل أي صفحة قد تعرض التقدم
+    writer = _progress_writer
+    if (writer is not None and request.endpoint != 'mark_watched'
+            and current_user.is_authenticated and writer.pending(current_user.id)):
+        writer.flush()
+
+
 @app.teardown_appcontext
 def close_connection(exception):
-    db = getattr(g, '_database', None)
+    db = g.pop('_database', None)
     if db is not None:
-        db.close()
+        db = metrics.unwrap(db)
+        if app.config['DB_POOL_SIZE'] > 0:
+            get_pool().release(db)
+        else:
+            db.close()
 
-# ⚠️ إضافة دالة تهيئة قاعدة البيانات لإنشاء الجداول المفقودة لمرة واحدة
+# تهيئة/ترقية مخطط قاعدة البيانات عبر محرك الترحيل (migrations.py)
 def init_db():
-    conn = get_db() 
-    print("Initializing database (Checking for tables)...")
-    
-    # 1. إنشاء جدول المستخدمين (للتأكد من وجود الجداول الأساسية)
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            fullname TEXT,
-            email TEXT UNIQUE,
-            is_admin BOOLEAN DEFAULT 0
-        );
-    """)
-
-    # 2. إنشاء جدول الشرائح (Hero Slides) - الذي كان مفقوداً
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS hero_slides (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            image_path TEXT NOT NULL,
-            title_ar TEXT NOT NULL,
-            title_en TEXT NOT NULL,
-            desc_ar TEXT,
-            desc_en TEXT
-        );
-    """)
-
-    # 3. إنشاء جدول الدورات (للتأكد) - إذا كان مفقوداً
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS courses (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title_ar TEXT NOT NULL,
-            title_en TEXT NOT NULL,
-            short_desc_ar TEXT,
-            short_desc_en TEXT,
-            full_desc_ar TEXT,
-            full_desc_en TEXT,
-            image TEXT
-        );
-    """)
-
-    # 4. إنشاء جدول الدروس (للتأكد) - إذا كان مفقوداً
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS lessons (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            course_id INTEGER NOT NULL,
-            title_ar TEXT NOT NULL,
-            title_en TEXT NOT NULL,
-            content_ar TEXT,
-            content_en TEXT,
-            position INTEGER DEFAULT 0,
-            video TEXT,
-            FOREIGN KEY(course_id) REFERENCES courses(id)
-        );
-    """)
-
-    # 5. جدول طلبات التسجيل (للتأكد)
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS enroll_requests (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            course_id INTEGER NOT NULL,
-            status TEXT DEFAULT 'pending', -- accepted, rejected
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(user_id) REFERENCES users(id),
-            FOREIGN KEY(course_id) REFERENCES courses(id),
-            UNIQUE(user_id, course_id)
-        );
-    """)
-
-    # 6. جدول الالتحاق المقبول (للتأكد)
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS enrollments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            course_id INTEGER NOT NULL,
-            approved BOOLEAN DEFAULT 0,
-            UNIQUE(user_id, course_id),
-            FOREIGN KEY(user_id) REFERENCES users(id),
-            FOREIGN KEY(course_id) REFERENCES courses(id)
-        );
-    """)
-    
-    # 7. جدول تقدم المستخدم (للتأكد)
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS user_progress (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            lesson_id INTEGER NOT NULL,
-            completed BOOLEAN DEFAULT 0,
-            UNIQUE(user_id, lesson_id),
-            FOREIGN KEY(user_id) REFERENCES users(id),
-            FOREIGN KEY(lesson_id) REFERENCES lessons(id)
-        );
-    """)
-
-    conn.commit()
-    print("✅ Database initialization complete.")
-# نهاية دالة init_db
+    conn = get_db()
+    applied = migrations.migrate(conn, app.config['UPLOAD_FOLDER'])
+    if applied:
+        app.logger.info("Applied schema migrations: %s", applied)
+    return applied
 
 # === دالة مساعدة لتحديد الملفات المسموح بها ===
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in {'png', 'jpg', 'jpeg', 'gif'}
+# === طابور المهام (jobs.py): عمال داخل العملية + المعالجات ===
+_job_worker = None
+_job_worker_path = None
+
+def make_job_worker(concurrency):
+    path = app.config['DATABASE']
+    return jobs.Worker(lambda: connect_db(path, on_connect=progress.register_functions),
+                       concurrency=concurrency, poll_interval=app.config['JOB_POLL_INTERVAL'])
+
+
+def job_worker():
+    """عمال المهام لهذه العملية (تبدأ عند أول حاجة، أي بعد fork في gunicorn)."""
+    global _job_worker, _job_worker_path
+    if app.config['JOB_WORKERS'] <= 0:
+        return None
+    if _job_worker is None or _job_worker_path != app.config['DATABASE']:
+        if _job_worker is not None:
+            _job_worker.stop(wait=False)
+        _job_worker = make_job_worker(app.config['JOB_WORKERS']).start()
+        _job_worker_path = app.config['DATABASE']
+    return _job_worker
+
+
+def wake_jobs():
+    worker = job_worker()
+    if worker is not None:
+        worker.notify()
+
+
+def enqueue_job(conn, kind, payload=None, **kwargs):
+    """إضافة مهمة ثم commit وإيقاظ العمال؛ يُستدعى بعد commit التعديل الذي سببها."""
+    jobs.enqueue(conn, kind, payload, **kwargs)
+    conn.commit()
+    wake_jobs()
+
+
+# حذف الملفات التي لم يعد يشير إليها أي سجل (media.py)؛ تعيد جدولة نفسها
+# لموعد انتهاء مهلة أقرب ملف ما زال ينتظر
+@jobs.task('media_gc')
+def media_gc_job(conn, payload):
+    media.collect_garbage(conn, app.config['UPLOAD_FOLDER'])
+    delay = media.next_collection(conn)
+    if delay is not None:
+        jobs.enqueue(conn, 'media_gc', delay=delay + 1, unique=True)
+        conn.commit()
+
+
+# مشتقات الصور (images.py)؛ اكتمالها يغيّر srcset في الصفحة الرئيسية
+@jobs.task('image_derivatives')
+def image_derivatives_job(conn, payload):
+    info = images.generate(app.config['UPLOAD_FOLDER'], payload['name'])
+    if info is not None:
+        images.record(conn, payload['name'], info)
+        invalidate_landing()
+
+
+# بقية حذف الدورة: تقدم الطلاب والدروس ثم ملفاتها (صف الدورة حُذف في الطلب نفسه)
+@jobs.task('purge_course')
+def purge_course_job(conn, payload):
+    course_id = payload['course_id']
+    search.remove_course_lessons(conn, course_id)
+    conn.execute('DELETE FROM user_progress WHERE lesson_id IN (SELECT id FROM lessons WHERE course_id = ?)', (course_id,))
+    conn.execute('DELETE FROM progress_bitsets WHERE course_id = ?', (course_id,))
+    conn.execute('DELETE FROM lessons WHERE course_id = ?', (course_id,))
+    conn.commit()
+    jobs.enqueue(conn, 'media_gc', unique=True)
+    conn.commit()
+
+
+# === حذف الملفات التي لم يعد يشير إليها أي سجل ===
+# المخزن معنون بالمحتوى فقد تشترك عدة سجلات في الملف نفسه؛ triggers تعدّ المراجع (media.py)
+# ويُستدعى هذا بعد commit الحذف/الاستبدال بدل حذف الملف مباشرة (الحذف الفعلي في media_gc)
+def collect_media(conn):
+    enqueue_job(conn, 'media_gc', unique=True)
+# === ذاكرة التخزين المؤقت للصفحة الرئيسية ===
+# اللغات التي نخزن صفحتها؛ أي قيمة أخرى لـ ?lang= تُعرض بدون تخزين
+LANDING_LANGS = ('ar', 'en')
+_page_cache = None
+
+def page_cache():
+    global _page_cache
+    if _page_cache is None:
+        _page_cache = cache.make_cache(app.config['CACHE_BACKEND'], ttl=app.config['CACHE_TTL'],
+                                       maxsize=app.config['CACHE_MAXSIZE'],
+                                       directory=app.config['CACHE_DIR'])
+    return _page_cache
+
+
+def invalidate_landing():
+    # تُستدعى بعد أي تعديل على الشرائح أو الدورات. الصحة لا تعتمد عليها: المفاتيح تحمل
+    # site_revisions.revision (عمال gunicorn الآخرون و jobs.py --work لا يرون هذا المسح)؛
+    # هنا نحرر ذاكرة هذه العملية فقط
+    page_cache().delete_namespace('landing')
+
+
+def landing_courses(conn, lang, after=None, user_id=None, limit=pagination.LANDING_PAGE_SIZE):
+    """صفحة من بطاقات الدورات (كقواميس) ومؤشر التالية؛ user_id يستبعد الدورات المقبول فيها."""
+    rows, next_cursor = pagination.fetch(conn, pagination.LANDING_COURSES_SQL, (l10n.resolve(lang), user_id or 0),
+                                         pagination.LANDING_COURSES_KEY, after, limit)
+    return [dict(row) for row in rows], next_cursor
+
+
+def landing_data(conn, lang, revision):
+    """الشرائح والصفحة الأولى من الدورات للغة المطلوبة، من الذاكرة المؤقتة إن وُجدت.
+
+    revision: site_revisions.revision مقروءة قبل البيانات؛ أي تعديل يرفعها فلا يُقرأ ما قبله.
+    """
+    # حجم الصفحة ضمن المفتاح: ذاكرة الملفات (FileCache) تبقى بعد النشر
+    key = f'landing:data:{revision}:{lang}:{pagination.LANDING_PAGE_SIZE}'
+    data = page_cache().get(key) if lang in LANDING_LANGS else None
+    if data is None:
+        # 🛑 تحويل الصفوف إلى قواميس لضمان إمكانية تحويلها إلى JSON في القالب
+        hero_slides = [dict(slide) for slide in conn.execute("""
+            SELECT s.*, b.derivatives FROM hero_slides s
+            LEFT JOIN media_blobs b ON b.name = s.image_path
+            ORDER BY s.id ASC
+        """)]
+        data = (hero_slides, *landing_courses(conn, lang))
+        if lang in LANDING_LANGS:
+            page_cache().set(key, data)
+    return data
+
+
+# === مشتقات الصور: توليد في طابور المهام + srcset في القوالب ===
+def generate_derivatives(conn, name):
+    if name and images.Image is not None:
+        enqueue_job(conn, 'image_derivatives', {'name': name}, unique=True)
+
+
+@app.template_global()
+def image_sources(name, derivatives):
+    return images.image_sources(name, derivatives,
+                                lambda n: url_for('uploaded_file', filename=n))
+
+
+# === الطلبات الشرطية (ETag / Last-Modified → 304) ===
+# نسخة الكود والقوالب: أي نشر جديد يغيّر ETag لكل الصفحات
+CODE_VERSION = int(max(os.path.getmtime(p) for p in
+                       [__file__] + glob.glob(os.path.join(BASE_DIR, 'templates', '**', '*.html'),
+                                              recursive=True)))
+
+
+def page_etag(*parts):
+    return hashlib.sha1(repr((CODE_VERSION,) + parts).encode('utf-8')).hexdigest()[:20]
+
+
+def http_time(*timestamps):
+    """أحدث ختم زمني (ثواني unix) كـ datetime لترويسة Last-Modified."""
+    return datetime.fromtimestamp(max([CODE_VERSION] + [t for t in timestamps if t]), timezone.utc)
+
+
+def with_validators(response, etag, last_modified=None):
+    response = make_response(response)
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # الصفحة خاصة بالمستخدم: لا تخزين في الوسطاء، والمتصفح يتحقق قبل إعادة الاستخدام
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response
+
+
+def not_modified(etag, last_modified=None):
+    """رد 304 إن كانت نسخة المتصفح ما زالت صالحة، وإلا None."""
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    elif last_modified is not None and request.if_modified_since:
+        fresh = last_modified <= request.if_modified_since
+    else:
+        fresh = False
+    if not fresh:
+        return None
+    return with_validators(app.response_class(status=304), etag, last_modified)
+
+
 @app.route('/')
 def landing():
     # ✅ تحديد اللغة وتخزينها في الجلسة
@@ -176,39 +545,34 @@ def landing():
     session['lang'] = lang
 
     conn = get_db()
+    site = conn.execute("SELECT revision, updated_at FROM site_revisions WHERE name='landing'").fetchone()
 
-    # 🛑 التعديل لحل خطأ "Object of type Row is not JSON serializable"
-    # جلب الشرائح من قاعدة البيانات (Hero Section)
-    raw_hero_slides = conn.execute('SELECT * FROM hero_slides ORDER BY id ASC').fetchall()
-    
-    # تحويل كائنات الصفوف إلى قواميس لضمان إمكانية تحويلها إلى JSON في القالب
-    hero_slides = [dict(slide) for slide in raw_hero_slides]
-    hero_slides = hero_slides if hero_slides else [] 
-
-    # ✅ جلب الدورات بناءً على حالة المستخدم
+    # ✅ المستخدم المسجل: الصفحة تعتمد أيضاً على الدورات المقبول فيها
+    enrolled = set()
     if current_user.is_authenticated:
-        raw_courses = conn.execute("""
-            SELECT id,
-                   CASE WHEN ?='en' THEN title_en ELSE title_ar END AS title,
-                   CASE WHEN ?='en' THEN short_desc_en ELSE short_desc_ar END AS short_desc,
-                   image
-            FROM courses
-            WHERE id NOT IN (
-                SELECT course_id FROM enrollments WHERE user_id=? AND approved=1
-            )
-        """, (lang, lang, current_user.id)).fetchall()
+        enrolled = {row[0] for row in conn.execute(
+            'SELECT course_id FROM enrollments WHERE user_id=? AND approved=1', (current_user.id,))}
+        etag = page_etag('landing', lang, site['revision'], current_user.id, sorted(enrolled))
+        last_modified = None
     else:
-        raw_courses = conn.execute("""
-            SELECT id,
-                   CASE WHEN ?='en' THEN title_en ELSE title_ar END AS title,
-                   CASE WHEN ?='en' THEN short_desc_en ELSE short_desc_ar END AS short_desc,
-                   image
-            FROM courses
-        """, (lang, lang)).fetchall()
-    
-    # 🛑 تحويل الدورات إلى قواميس أيضاً
-    courses = [dict(course) for course in raw_courses]
-
+        etag = page_etag('landing', lang, site['revision'])
+        last_modified = http_time(site['updated_at'])
+    response = not_modified(etag, last_modified)
+    if response is not None:
+        return response
+
+    # ✅ الزائر المجهول: الصفحة المعروضة تعتمد على اللغة فقط
+    # المراجعة ضمن المفتاح: تعديل من عملية أخرى يجعله يخطئ الذاكرة، وعرض بدأ قبل التعديل
+    # يخزن تحت المراجعة القديمة التي لن تُطلب بعد الآن
+    html_key = f'landing:html:{site["revision"]}:{lang}'
+    if not current_user.is_authenticated and lang in LANDING_LANGS:
+        html = page_cache().get(html_key)
+        if html is not None:
+            return with_validators(html, etag, last_modified)
+
+    hero_slides, courses, next_cursor = landing_data(conn, lang, site['revision'])
+    if enrolled:
+        courses, next_cursor = landing_courses(conn, lang, user_id=current_user.id)
 
     # ✅ النصوص الترويجية
     promos = (
@@ -218,17 +582,37 @@ def landing():
     )
 
     # ✅ تمرير البيانات للقالب
-    return render_template(
+    html = render_template(
         'landing.html',
         lang=lang,
         promos=promos,
         courses=courses,
+        next_cursor=next_cursor,
         hero_slides=hero_slides
     )
+    if not current_user.is_authenticated and lang in LANDING_LANGS:
+        page_cache().set(html_key, html)
+    return with_validators(html, etag, last_modified)
+
+# === "عرض المزيد" في شبكة الدورات: الصفحة التالية كـ JSON (HTML البطاقات + المؤشر) ===
+@app.route('/courses/more')
+def landing_more_courses():
+    lang = request.args.get('lang', session.get('lang', 'ar'))
+    try:
+        after = pagination.parse_cursor(request.args.get('after'))
+    except ValueError:
+        abort(400)
+    limit = pagination.page_size(request.args.get('limit'), pagination.LANDING_PAGE_SIZE)
+    user_id = current_user.id if current_user.is_authenticated else None
+    courses, next_cursor = landing_courses(get_db(), lang, after, user_id, limit)
+    return jsonify({'html': render_template('_course_cards.html', courses=courses, lang=lang),
+                    'count': len(courses), 'next': next_cursor})
+
 
 # === التسجيل ===
 # (بقية دوال التسجيل والدخول والمستخدمين لم تتغير)
 @app.route('/register', methods=['GET', 'POST'])
+@rate_limited('register')
 def register():
     lang = request.args.get('lang', 'ar')
     if request.method == 'POST':
@@ -241,10 +625,16 @@ def register():
             flash('Passwords do not match' if lang == 'en' else 'كلمتا المرور غير متطابقتين')
             return redirect(url_for('register', lang=lang))
 
+        try:
+            password_hash = hasher().hash(password)
+        except credentials.Busy:
+            flash('Server is busy, please try again' if lang == 'en' else 'الخادم مشغول، حاول مرة أخرى')
+            return render_template('register.html', lang=lang), 503
+
         conn = get_db()
         try:
             conn.execute('INSERT INTO users (username, password, fullname, email) VALUES (?, ?, ?, ?)',
-                         (email, password, fullname, email))
+                         (email, password_hash, fullname, email))
             conn.commit()
         except Exception:
             flash('Email already used' if lang == 'en' else 'البريد مستخدم')
@@ -257,6 +647,7 @@ def register():
 
 # === تسجيل الدخول ===
 @app.route('/login', methods=['GET', 'POST'])
+@rate_limited('login', user=lambda: request.form.get('email', '').strip().lower() or None)
 def login():
     lang = request.args.get('lang', 'ar')
     if request.method == 'POST':
@@ -265,7 +656,18 @@ def login():
         conn = get_db()
 
         user = conn.execute('SELECT id, username, fullname, password, is_admin FROM users WHERE username = ? OR email = ?', (email, email)).fetchone()
-        if user and password == user['password']:
+        # التحقق في مجمّع التجزئة (credentials.py)؛ مستخدم غير موجود يأخذ نفس الزمن
+        try:
+            ok, new_hash = hasher().verify(user['password'] if user else None, password)
+        except credentials.Busy:
+            flash('Server is busy, please try again' if lang == 'en' else 'الخادم مشغول، حاول مرة أخرى')
+            return render_template('login.html', lang=lang), 503
+        if ok:
+            # نص صريح أو تجزئة قديمة أو تكلفة أقل من الحالية: استبدالها الآن
+            if new_hash:
+                conn.execute('UPDATE users SET password = ? WHERE id = ?', (new_hash, user['id']))
+                conn.commit()
+                forget_user(user['id'])
             user_obj = User(user['id'], user['username'], user['fullname'], user['is_admin'])
             login_user(user_obj)
 
@@ -286,44 +688,31 @@ def login():
 @login_required
 def logout():
     lang = request.args.get('lang', 'ar')
+    forget_user(current_user.id)
     logout_user()
     flash('Logged out' if lang == 'en' else 'تم تسجيل الخروج')
     return redirect(url_for('landing', lang=lang))
 
+# === البحث في الدورات والدروس (search.py) ===
+@app.route('/search')
+def search_page():
+    lang = request.args.get('lang', session.get('lang', 'ar'))
+    q = request.args.get('q', '').strip()[:200]
+    page = max(request.args.get('page', 1, type=int), 1)
+    results, total = search.search(get_db(), q, lang, page) if q else ([], 0)
+    pages = (total + search.PER_PAGE - 1) // search.PER_PAGE
+    return render_template('search.html', q=q, results=results, total=total,
+                           page=page, pages=pages, lang=lang)
+
+
 @app.route('/profile')
 @login_required
 def profile():
     lang = request.args.get('lang', 'ar')
     conn = get_db()
 
-    # جلب الدورات التي تم قبول طلب التسجيل فيها فقط
-    enrolled_courses = conn.execute('''
-        SELECT c.id, 
-               CASE WHEN ?='en' THEN c.title_en ELSE c.title_ar END AS title,
-               c.image,
-               CASE WHEN ?='en' THEN c.short_desc_en ELSE c.short_desc_ar END AS short_desc
-        FROM enrollments e
-        JOIN courses c ON e.course_id = c.id
-        WHERE e.user_id = ? 
-          AND e.approved = 1
-    ''', (lang, lang, current_user.id)).fetchall()
-
-    # جلب الدروس فقط في الدورات المقبولة
-    courses_with_lessons = []
-    for course in enrolled_courses:
-        lessons = conn.execute('''
-             SELECT l.id,
-                    CASE WHEN ?='en' THEN l.title_en ELSE l.title_ar END AS title,
-                    up.completed
-             FROM lessons l
-             LEFT JOIN user_progress up ON up.lesson_id = l.id AND up.user_id = ?
-             WHERE l.course_id = ?
-             ORDER BY l.position ASC
-          ''', (lang, current_user.id, course['id'])).fetchall()
-        courses_with_lessons.append({
-            'course': course,
-            'lessons': lessons
-        })
+    # جلب الدورات المقبولة ودروسها وحالة الإكمال باستعلامين (بدل استعلام لكل دورة)
+    courses_with_lessons = progress_store().profile_tree(conn, current_user.id, lang)
 
     return render_template('profile.html', lang=lang, courses=courses_with_lessons)
 
@@ -337,12 +726,17 @@ def profile():
 @login_required
 def lesson_page(lesson_id):
     conn = get_db()
-    lesson = conn.execute("SELECT * FROM lessons WHERE id = ?", (lesson_id,)).fetchone()
-    if not lesson:
+    # جلب اللغة من query param أولاً ثم session
+    lang = l10n.resolve(request.args.get('lang', session.get('lang', 'ar')))
+    session['lang'] = lang
+
+    # الدورة وبصمة المحتوى المجهز فقط؛ القطعة الكاملة تُجلب بعد فحص 304
+    head = conn.execute(lesson_html.HEAD_SQL, (lang, lesson_html.VERSION, lesson_id)).fetchone()
+    if not head:
         abort(404)
-        
+
     # التحقق من أن المستخدم مسجل في الدورة (approved=1)
-    course_id = lesson['course_id']
+    course_id = head['course_id']
     enrollment = conn.execute("""
           SELECT * FROM enrollments 
           WHERE user_id=? AND course_id=? AND approved=1
@@ -352,34 +746,38 @@ def lesson_page(lesson_id):
         flash("❌ يجب أن تكون مسجلاً ومقبولاً في الدورة للوصول لهذا الدرس.", "error")
         return redirect(url_for('course_page', course_id=course_id))
 
-    # جلب اللغة من query param أولاً ثم session
-    lang = request.args.get('lang', session.get('lang', 'ar'))
-    session['lang'] = lang
+    # لم يُجهَّز بعد (تعديل خارج مسارات الإدارة أو نسخة تنقية أقدم): تجهيزه الآن مرة واحدة
+    if head['content_hash'] is None:
+        lesson_html.compile_lesson(conn, lesson_id, lang)
+        conn.commit()
+        head = conn.execute(lesson_html.HEAD_SQL, (lang, lesson_html.VERSION, lesson_id)).fetchone()
+
+    # ✅ 304 قبل التحميل الثقيل: بصمة محتوى الدرس، وحالة الإكمال تتبع العدادات
+    etag = page_etag('lesson', lesson_id, lang, current_user.id, head['content_hash'],
+                     enrollment['completed_lessons'], enrollment['total_lessons'])
+    last_modified = http_time(head['compiled_at'], enrollment['updated_at'])
+    response = not_modified(etag, last_modified)
+    if response is not None:
+        return response
+    # العنوان والمحتوى المنقّى ورابط التضمين كما جُهزت عند الحفظ
+    lesson = conn.execute(lesson_html.PAGE_SQL, (lang, lesson_id)).fetchone()
 
-    # استخدام index للوصول إلى الأعمدة
-    if lang == 'en':
-        title = lesson['title_en'] if 'title_en' in lesson.keys() else lesson['title_ar']
-        description = lesson['content_en'] if 'content_en' in lesson.keys() else lesson['content_ar']
-    else:
-        title = lesson['title_ar'] if 'title_ar' in lesson.keys() else lesson['title_en']
-        description = lesson['content_ar'] if 'content_ar' in lesson.keys() else lesson['content_en']
-        
     # جلب حالة مشاهدة الدرس
-    progress = conn.execute("SELECT completed FROM user_progress WHERE user_id=? AND lesson_id=?", (current_user.id, lesson_id)).fetchone()
-    is_completed = progress['completed'] if progress else 0
+    is_completed = 1 if progress_store().is_completed(conn, current_user.id, lesson_id) else 0
 
-    return render_template(
+    html = render_template(
         'lesson_page.html',
         lesson=lesson,
-        title=title,
-        description=description,
+        title=lesson['title'],
         lang=lang,
         is_completed=is_completed
     )
+    return with_validators(html, etag, last_modified)
 
 # === طلب التسجيل في دورة ===
 @app.route('/course/<int:course_id>/enroll', methods=['POST'])
 @login_required
+@rate_limited('enroll')
 def enroll(course_id):
     lang = request.args.get('lang', 'ar')
     conn = get_db()
@@ -416,28 +814,39 @@ def enroll(course_id):
 @app.route('/lesson/<int:lesson_id>/mark_watched', methods=['POST'])
 @login_required
 def mark_watched(lesson_id):
-    conn = get_db()
-    
+    # النتائج الإيجابية فقط تُحفظ في progress_lookups؛ الكتابة نفسها تعيد التحقق من الالتحاق
+    lookups = progress_lookups()
+    conn = None
+
     # التأكد من وجود الدرس
-    lesson = conn.execute("SELECT course_id FROM lessons WHERE id = ?", (lesson_id,)).fetchone()
-    if not lesson:
-        return ('', 404)
-        
+    course_id = lookups.get(f'lesson:{lesson_id}')
+    if course_id is None:
+        conn = get_db()
+        lesson = conn.execute("SELECT course_id FROM lessons WHERE id = ?", (lesson_id,)).fetchone()
+        if not lesson:
+            return ('', 404)
+        course_id = lesson['course_id']
+        lookups.set(f'lesson:{lesson_id}', course_id)
+
     # التأكد من أن المستخدم مسجل ومقبول في الدورة
-    enrollment = conn.execute("""
-          SELECT * FROM enrollments 
-          WHERE user_id=? AND course_id=? AND approved=1
-      """, (current_user.id, lesson['course_id'])).fetchone()
-      
-    if not enrollment:
-        return ('', 403) # Forbidden
-        
-    # تحديث حالة التقدم إلى مكتمل (completed=1)
-    conn.execute('''
-        INSERT INTO user_progress (user_id, lesson_id, completed)
-        VALUES (?, ?, 1)
-        ON CONFLICT(user_id, lesson_id) DO UPDATE SET completed=1
-    ''', (current_user.id, lesson_id))
+    enrolled_key = f'enrolled:{current_user.id}:{course_id}'
+    if lookups.get(enrolled_key) is None:
+        conn = conn or get_db()
+        enrollment = conn.execute("""
+              SELECT * FROM enrollments 
+              WHERE user_id=? AND course_id=? AND approved=1
+          """, (current_user.id, course_id)).fetchone()
+        if not enrollment:
+            return ('', 403) # Forbidden
+        lookups.set(enrolled_key, True)
+
+    # تحديث حالة التقدم إلى مكتمل (completed=1): دفعة مجمّعة أو معاملة فورية
+    writer = progress_writer()
+    if writer is not None:
+        writer.add(current_user.id, lesson_id)
+        return ('', 204)
+    conn = conn or get_db()
+    progress_store().mark_completed_many(conn, [(current_user.id, lesson_id)])
     conn.commit()
     return ('', 204)
 
@@ -454,11 +863,8 @@ def request_certificate(course_id):
         flash("❌ يجب أن تكون مسجلاً ومقبولاً في الدورة لطلب الشهادة.", "error")
         return redirect(url_for('course_page', course_id=course_id))
 
-    # التحقق من إكمال جميع الدروس (اختياري، يمكن أن تعتمد على منطق آخر)
-    lessons_count = conn.execute("SELECT COUNT(*) FROM lessons WHERE course_id=?", (course_id,)).fetchone()[0]
-    completed_count = conn.execute("SELECT COUNT(*) FROM user_progress WHERE user_id=? AND lesson_id IN (SELECT id FROM lessons WHERE course_id = ?) AND completed=1", (current_user.id, course_id)).fetchone()[0]
-
-    if completed_count < lessons_count:
+    # التحقق من إكمال جميع الدروس عبر عدادات الالتحاق (بدون COUNT على الدروس والتقدم)
+    if not progress.is_course_complete(enrollment):
         flash("❌ يجب إكمال جميع الدروس في الدورة أولاً لطلب الشهادة.", "error")
         return redirect(url_for('course_page', course_id=course_id))
 
@@ -491,10 +897,76 @@ def admin_required(f):
 def admin_index():
     lang = request.args.get('lang', session.get('lang', 'ar'))
     conn = get_db()
-    courses = conn.execute('SELECT * FROM courses ORDER BY id DESC').fetchall()
+    try:
+        after = pagination.parse_cursor(request.args.get('after'))
+    except ValueError:
+        abort(400)
+    # 🔎 تصفية الدورات بالبحث (في الدورة نفسها أو في أحد دروسها)
+    q = request.args.get('q', '').strip()[:200]
+    expr = search.match_expression(q) if q else None
+    sql, params = pagination.ADMIN_COURSES_SQL, ()
+    if expr:
+        sql, params = pagination.ADMIN_COURSES_MATCHING_SQL, (expr, expr)
+    courses, next_cursor = pagination.fetch(conn, sql, params, pagination.ADMIN_COURSES_KEY, after,
+                                            pagination.ADMIN_PAGE_SIZE, descending=True)
     # ⬅️ جلب بيانات الشرائح لإدارتها في لوحة المشرف
-    hero_slides = conn.execute('SELECT * FROM hero_slides ORDER BY id ASC').fetchall()
-    return render_template('admin/index.html', courses=courses, lang=lang, hero_slides=hero_slides)
+    hero_slides = conn.execute('SELECT id, image_path, title_ar, title_en FROM hero_slides ORDER BY id ASC').fetchall()
+    return render_template('admin/index.html', courses=courses, lang=lang, hero_slides=hero_slides, q=q,
+                           next_cursor=next_cursor, first_page=after is None)
+
+# === قياس المسارات واستعلامات SQL لهذا العامل (METRICS_ENABLED=1) ===
+@app.route('/admin/metrics')
+@login_required
+@admin_required
+def admin_metrics():
+    if request.args.get('format') == 'prometheus':
+        response = make_response(_metrics.prometheus())
+        response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+        return response
+    return jsonify(dict(_metrics.snapshot(int(request.args.get('top', 20))),
+                        enabled=app.config['METRICS_ENABLED'],
+                        profile_slow_ms=app.config['PROFILE_SLOW_MS'],
+                        profiles=metrics.list_profiles(app.config['PROFILE_DIR'])))
+
+
+@app.route('/admin/metrics/reset', methods=['POST'])
+@login_required
+@admin_required
+def admin_metrics_reset():
+    _metrics.reset()
+    return ('', 204)
+
+
+# تشغيل/إيقاف القياس ومحلل العينات في هذا العامل دون إعادة تشغيل (slow_ms=0 يوقف المحلل)
+@app.route('/admin/metrics/toggle', methods=['POST'])
+@login_required
+@admin_required
+def admin_metrics_toggle():
+    if 'enabled' in request.form:
+        app.config['METRICS_ENABLED'] = request.form['enabled'] == '1'
+    if 'slow_ms' in request.form:
+        try:
+            app.config['PROFILE_SLOW_MS'] = max(0.0, float(request.form['slow_ms']))
+        except ValueError:
+            abort(400)
+    return jsonify(enabled=app.config['METRICS_ENABLED'], profile_slow_ms=app.config['PROFILE_SLOW_MS'])
+
+
+@app.route('/admin/metrics/profiles/<name>')
+@login_required
+@admin_required
+def admin_metrics_profile(name):
+    if name not in metrics.list_profiles(app.config['PROFILE_DIR']):
+        abort(404)
+    return send_from_directory(app.config['PROFILE_DIR'], name, mimetype='text/plain')
+
+# === إحصاءات الذاكرة المؤقتة (إصابات/إخفاقات) لهذا العامل ===
+@app.route('/admin/cache')
+@login_required
+@admin_required
+def admin_cache_stats():
+    # users.hits = استعلامات user_loader الموفَّرة
+    return jsonify(dict(page_cache().stats(), users=user_cache().stats()))
 # -----------------------------------------------
 # 🖼️ دوال إدارة شرائح الشريط الرئيسي (Hero Slides)
 # -----------------------------------------------
@@ -532,9 +1004,8 @@ def admin_slider_new():
 
 
         if img and img.filename and allowed_file(img.filename):
-            img_name = utils.secure_filename(img.filename)
             try:
-                img.save(os.path.join(app.config['UPLOAD_FOLDER'], img_name))
+                img_name = media.save_upload(img, app.config['UPLOAD_FOLDER'], get_db())
             except Exception as e:
                 flash(f'فشل حفظ الصورة: {e}', 'error')
                 return redirect(url_for('admin_slider_new', lang=lang))
@@ -549,6 +1020,8 @@ def admin_slider_new():
                 VALUES (?, ?, ?, ?, ?)
             ''', (img_name, title_ar, title_en, desc_ar, desc_en))
             conn.commit()
+            invalidate_landing()
+            generate_derivatives(conn, img_name)
             flash('✅ تم إضافة شريحة جديدة بنجاح', 'success')
             return redirect(url_for('admin_index', lang=lang))
         except Exception as e:
@@ -586,18 +1059,9 @@ def admin_slider_edit(slide_id):
         img_name = slide['image_path']  
 
         if img and img.filename and allowed_file(img.filename):
-            new_name = utils.secure_filename(img.filename)
-            
-            # حذف الملف القديم
-            if slide['image_path']:
-                old_path = os.path.join(app.config['UPLOAD_FOLDER'], slide['image_path'])
-                if os.path.exists(old_path):
-                    os.remove(old_path)
-            
-            # حفظ الملف الجديد
+            # حفظ الملف الجديد؛ القديم يُحذف بعد تحديث السجل إن لم يعد له مرجع
             try:
-                img.save(os.path.join(app.config['UPLOAD_FOLDER'], new_name))
-                img_name = new_name
+                img_name = media.save_upload(img, app.config['UPLOAD_FOLDER'], conn)
             except Exception as e:
                 flash(f'فشل حفظ الصورة الجديدة: {e}', 'error')
                 return redirect(url_for('admin_slider_edit', slide_id=slide_id, lang=lang))
@@ -610,6 +1074,9 @@ def admin_slider_edit(slide_id):
                 WHERE id=?
             ''', (title_ar, title_en, desc_ar, desc_en, img_name, slide_id))
             conn.commit()
+            invalidate_landing()
+            collect_media(conn)
+            generate_derivatives(conn, img_name)
             
             flash('✅ تم تحديث الشريحة بنجاح', 'success')
             return redirect(url_for('admin_index', lang=lang))
@@ -644,13 +1111,10 @@ def admin_slider_delete(slide_id):
         return redirect(url_for('admin_index', lang=lang))
 
     try:
-        if slide['image_path']:
-            ipath = os.path.join(app.config['UPLOAD_FOLDER'], slide['image_path'])
-            if os.path.exists(ipath):
-                os.remove(ipath)
-
         conn.execute('DELETE FROM hero_slides WHERE id = ?', (slide_id,))
         conn.commit()
+        invalidate_landing()
+        collect_media(conn)
         flash('🗑️ تم حذف الشريحة بنجاح', 'info')
     except Exception:
         conn.rollback()
@@ -677,12 +1141,10 @@ def admin_slider_delete_image(slide_id):
         return redirect(url_for('admin_slider_edit', slide_id=slide_id, lang=lang))
     
     try:
-        ipath = os.path.join(app.config['UPLOAD_FOLDER'], slide['image_path'])
-        if os.path.exists(ipath):
-            os.remove(ipath)
-
         conn.execute('UPDATE hero_slides SET image_path = ? WHERE id = ?', (None, slide_id))
         conn.commit()
+        invalidate_landing()
+        collect_media(conn)
         
         flash('🖼️ تم حذف الصورة بنجاح. يمكنك رفع صورة جديدة الآن.', 'info')
     except Exception as e:
@@ -707,17 +1169,19 @@ def admin_course_new():
         title_en = request.form.get('title_en', '').strip()
         img = request.files.get('image')
         img_name = None
-        if img and img.filename and allowed_file(img.filename): # تم إضافة التحقق من allowed_file
-            img_name = utils.secure_filename(img.filename)
-            img.save(os.path.join(app.config['UPLOAD_FOLDER'], img_name))
         conn = get_db()
-        conn.execute('''
+        if img and img.filename and allowed_file(img.filename): # تم إضافة التحقق من allowed_file
+            img_name = media.save_upload(img, app.config['UPLOAD_FOLDER'], conn)
+        cur = conn.execute('''
             INSERT INTO courses (title_ar, title_en, short_desc_ar, short_desc_en, full_desc_ar, full_desc_en, image)
             VALUES (?, ?, ?, ?, ?, ?, ?)
         ''', (title_ar, title_en, request.form.get('short_desc_ar'),
               request.form.get('short_desc_en'), request.form.get('full_desc_ar'),
               request.form.get('full_desc_en'), img_name))
+        search.index_course(conn, cur.lastrowid)
         conn.commit()
+        invalidate_landing()
+        generate_derivatives(conn, img_name)
         return redirect(url_for('admin_index'))
     return render_template('admin/course_form.html', course=None)
 
@@ -740,24 +1204,32 @@ def admin_lesson_new(course_id):
         
         video = request.files.get('video')
         video_filename = None
+        video_upload = request.form.get('video_upload', '').strip()
         
-        # 2. معالجة تحميل الفيديو المحلي
-        if video and video.filename:
-            video_filename = utils.secure_filename(video.filename)
-            # يجب التأكد من عمل هذه الدالة بشكل صحيح لحفظ الملف
-            video.save(os.path.join(app.config['UPLOAD_FOLDER'], video_filename))
+        conn = get_db()
+
+        # 2. معالجة تحميل الفيديو المحلي: رفع مجزأ مكتمل (uploads.py) أو ملف مرفق بالنموذج
+        if video_upload:
+            video_filename = uploads.claim(conn, video_upload)
+            if not video_filename:
+                flash("❌ لم يكتمل رفع الفيديو، أعد المحاولة", "error")
+                return redirect(url_for('admin_lesson_new', course_id=course_id))
+            video_url = None
+        elif video and video.filename:
+            # اسم مبني على بصمة المحتوى ليُخزَّن في المتصفح كملف immutable ولا يتكرر على القرص
+            video_filename = media.save_upload(video, app.config['UPLOAD_FOLDER'], conn)
             
             # 💡 منطق تفضيل: إذا تم تحميل ملف، يتم إهمال رابط اليوتيوب
             video_url = None
         
-        conn = get_db()
-        
         # 3. تحديث استعلام الإضافة (إضافة حقل video_url)
-        conn.execute('''
+        cur = conn.execute('''
              INSERT INTO lessons (course_id, title_ar, title_en, content_ar, content_en, position, video, video_url)
              VALUES (?, ?, ?, ?, ?, ?, ?, ?)
            ''', (course_id, title_ar, title_en, content_ar,
                  content_en, pos, video_filename, video_url))
+        search.index_lesson(conn, cur.lastrowid)
+        lesson_html.compile_lesson(conn, cur.lastrowid)
         conn.commit()
         
         flash("✅ تم إضافة الدرس بنجاح", "success")
@@ -796,15 +1268,16 @@ def admin_lesson_edit(course_id, lesson_id):
         video_filename = lesson["video"] # الاحتفاظ بالاسم القديم للفيديو المحلي
 
         # 3. معالجة تحميل ملف جديد
-        if video and video.filename:
-            # حذف الفيديو القديم إذا وُجد
-            if video_filename:
-                old_path = os.path.join(app.config.get("UPLOAD_FOLDER", ''), video_filename)
-                if os.path.exists(old_path) and os.path.isfile(old_path):
-                    os.remove(old_path)
-            # حفظ الفيديو الجديد
-            video_filename = utils.secure_filename(video.filename)
-            # video.save(os.path.join(app.config.get("UPLOAD_FOLDER", ''), video_filename))
+        video_upload = request.form.get("video_upload", "").strip()
+        if video_upload or (video and video.filename):
+            # حفظ الفيديو الجديد؛ القديم يُحذف بعد تحديث الصف إن لم يعد له مرجع
+            if video_upload:
+                video_filename = uploads.claim(conn, video_upload)
+                if not video_filename:
+                    flash("❌ لم يكتمل رفع الفيديو، أعد المحاولة", "error")
+                    return redirect(url_for("admin_lesson_edit", course_id=course_id, lesson_id=lesson_id))
+            else:
+                video_filename = media.save_upload(video, app.config['UPLOAD_FOLDER'], conn)
             
             # منطق تفضيل: إذا تم تحميل ملف، يتم إهمال رابط اليوتيوب
             video_url_value = None 
@@ -816,7 +1289,10 @@ def admin_lesson_edit(course_id, lesson_id):
              SET title_ar=?, title_en=?, content_ar=?, content_en=?, position=?, video=?, video_url=?
              WHERE id=? AND course_id=?
            """, (title_ar, title_en, content_ar, content_en, position, video_filename, video_url_value, lesson_id, course_id))
+        search.index_lesson(conn, lesson_id)
+        lesson_html.compile_lesson(conn, lesson_id)
         conn.commit()
+        collect_media(conn)
 
         flash("✅ تم تحديث بيانات الدرس بنجاح", "success")
         return redirect(url_for("admin_lessons", course_id=course_id))
@@ -838,26 +1314,118 @@ def admin_lesson_delete(course_id, lesson_id):
         flash("لم يتم العثور على الدرس")
         return redirect(url_for("admin_lessons", course_id=course_id))
 
-    # حذف الفيديو إذا موجود
-    if lesson["video"]:
-        video_path = os.path.join(app.config["UPLOAD_FOLDER"], lesson["video"])
-        if os.path.exists(video_path):
-            os.remove(video_path)
-
     conn.execute("DELETE FROM lessons WHERE id=? AND course_id=?", (lesson_id, course_id))
+    progress_store().lesson_deleted(conn, lesson)
+    search.remove_lesson(conn, lesson_id)
     conn.commit()
+    # حذف الفيديو إذا لم يعد له مرجع
+    collect_media(conn)
     flash("🗑️ تم حذف الدرس بنجاح", "info")
     return redirect(url_for("admin_lessons", course_id=course_id))
 
 
+# === الرفع المجزأ القابل للاستئناف لفيديو الدروس (انظر uploads.py) ===
+def upload_error(status, message):
+    return jsonify({'error': message}), status
+
+
+@app.route('/admin/uploads', methods=['POST'])
+@login_required
+@admin_required
+def admin_upload_create():
+    payload = request.get_json(silent=True) or {}
+    filename = str(payload.get('filename') or '').strip()
+    try:
+        size = int(payload.get('size'))
+    except (TypeError, ValueError):
+        return upload_error(400, 'size must be an integer')
+    if not filename or size <= 0:
+        return upload_error(400, 'filename and a positive size are required')
+    if size > app.config['UPLOAD_MAX_SIZE']:
+        return upload_error(413, 'file too large')
+
+    upload = uploads.create(get_db(), app.config['UPLOAD_FOLDER'], filename, size, current_user.id)
+    location = url_for('admin_upload_status', upload_id=upload['id'])
+    return jsonify({'id': upload['id'], 'offset': 0, 'size': size, 'url': location}), 201, \
+        {'Location': location}
+
+
+@app.route('/admin/uploads/<upload_id>', methods=['GET', 'HEAD'])
+@login_required
+@admin_required
+def admin_upload_status(upload_id):
+    upload = uploads.get(get_db(), upload_id)
+    if upload is None:
+        return upload_error(404, 'unknown upload')
+    response = jsonify({'id': upload['id'], 'offset': upload['received'], 'size': upload['size'],
+                        'complete': bool(upload['stored_name'])})
+    response.headers['Upload-Offset'] = str(upload['received'])
+    response.headers['Upload-Length'] = str(upload['size'])
+    response.cache_control.no_store = True
+    return response
+
+
+@app.route('/admin/uploads/<upload_id>', methods=['PATCH'])
+@login_required
+@admin_required
+def admin_upload_patch(upload_id):
+    conn = get_db()
+    upload = uploads.get(conn, upload_id)
+    if upload is None:
+        return upload_error(404, 'unknown upload')
+    length = request.content_length
+    if length is not None and length > app.config['UPLOAD_CHUNK_MAX']:
+        return upload_error(413, 'chunk too large')
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return upload_error(400, 'Upload-Offset header required')
+
+    # request.stream: البايتات تُقرأ من الاتصال مباشرة دون تخزين الطلب كاملاً
+    try:
+        received = uploads.write_chunk(conn, app.config['UPLOAD_FOLDER'], upload, offset,
+                                       request.stream, length, request.headers.get('Upload-Checksum'))
+    except uploads.UploadError as e:
+        return upload_error(e.status, e.message)
+    response = jsonify({'id': upload_id, 'offset': received, 'size': upload['size'],
+                        'complete': received == upload['size']})
+    response.headers['Upload-Offset'] = str(received)
+    return response
+
+
+@app.route('/admin/uploads/<upload_id>', methods=['DELETE'])
+@login_required
+@admin_required
+def admin_upload_delete(upload_id):
+    conn = get_db()
+    upload = uploads.get(conn, upload_id)
+    if upload is None:
+        return upload_error(404, 'unknown upload')
+    uploads.discard(conn, app.config['UPLOAD_FOLDER'], upload)
+    return '', 204
+
+
 @app.route('/admin/course/<int:course_id>/lessons')
 @login_required
 @admin_required
 def admin_lessons(course_id):
+    try:
+        after = pagination.parse_cursor(request.args.get('after'), 2)
+    except ValueError:
+        abort(400)
     conn = get_db()
-    course = conn.execute('SELECT * FROM courses WHERE id=?', (course_id,)).fetchone()
-    lessons = conn.execute('SELECT * FROM lessons WHERE course_id=? ORDER BY position', (course_id,)).fetchall()
-    return render_template('admin/lessons.html', course=course, lessons=lessons)
+    course = conn.execute('SELECT id, title_ar, title_en FROM courses WHERE id=?', (course_id,)).fetchone()
+    if course is None:
+        abort(404)
+    lessons, next_cursor = pagination.fetch(conn, pagination.ADMIN_LESSONS_SQL, (course_id,),
+                                            pagination.ADMIN_LESSONS_KEY, after, pagination.LESSONS_PAGE_SIZE)
+    # عمود "#" رقم متتابع يكمل عدّ الصفحات السابقة: الدروس قبل المؤشر (فهرس course_id, position)
+    start = 0
+    if after is not None:
+        start = conn.execute('SELECT COUNT(*) FROM lessons l WHERE l.course_id = ? AND (l.position, l.id) <= (?, ?)',
+                             (course_id, *after)).fetchone()[0]
+    return render_template('admin/lessons.html', course=course, lessons=lessons, next_cursor=next_cursor,
+                           first_page=after is None, start=start)
 
 # === تعديل دورة (Edit Course) ===
 @app.route('/admin/course/<int:course_id>/edit', methods=['GET', 'POST'])
@@ -883,18 +1451,8 @@ def admin_course_edit(course_id):
         img_name = course['image']  # default to existing
 
         if img and img.filename:
-            # احفظ الصورة الجديدة واحذف القديمة إن وُجدت
-            new_name = utils.secure_filename(img.filename)
-            img.save(os.path.join(app.config['UPLOAD_FOLDER'], new_name))
-            # احذف الملف القديم إذا كان موجوداً
-            if course['image']:
-                try:
-                    old_path = os.path.join(app.config['UPLOAD_FOLDER'], course['image'])
-                    if os.path.exists(old_path):
-                        os.remove(old_path)
-                except Exception:
-                    app.logger.exception("Failed to remove old course image")
-            img_name = new_name
+            # احفظ الصورة الجديدة؛ القديمة تُحذف بعد تحديث السجل إن لم يعد لها مرجع
+            img_name = media.save_upload(img, app.config['UPLOAD_FOLDER'], conn)
 
         # تحديث السجل
         conn.execute('''
@@ -902,7 +1460,11 @@ def admin_course_edit(course_id):
              SET title_ar=?, title_en=?, short_desc_ar=?, short_desc_en=?, full_desc_ar=?, full_desc_en=?, image=?
              WHERE id=?
           ''', (title_ar, title_en, short_desc_ar, short_desc_en, full_desc_ar, full_desc_en, img_name, course_id))
+        search.index_course(conn, course_id)
         conn.commit()
+        invalidate_landing()
+        collect_media(conn)
+        generate_derivatives(conn, img_name)
         flash('Course updated' if request.args.get('lang', 'ar') == 'en' else 'تم تحديث الدورة')
         return redirect(url_for('admin_index'))
 
@@ -923,34 +1485,18 @@ def admin_course_delete(course_id):
         return redirect(url_for('admin_index'))
 
     try:
-        # حذف ملفات الفيديو والصورة المرتبطة بالدروس
-        lessons = conn.execute('SELECT video FROM lessons WHERE course_id = ?', (course_id,)).fetchall()
-        for l in lessons:
-            if l['video']:
-                try:
-                    vpath = os.path.join(app.config['UPLOAD_FOLDER'], l['video'])
-                    if os.path.exists(vpath):
-                        os.remove(vpath)
-                except Exception:
-                    app.logger.exception("Failed to remove lesson video")
-
-        # حذف ملف صورة الدورة إن وُجد
-        if course['image']:
-            try:
-                ipath = os.path.join(app.config['UPLOAD_FOLDER'], course['image'])
-                if os.path.exists(ipath):
-                    os.remove(ipath)
-            except Exception:
-                app.logger.exception("Failed to remove course image")
-
-        # حذف الصفوف المرتبطة: user_progress, lessons, enrollments, likes, enroll_requests (إن وجدت)
-        conn.execute('DELETE FROM user_progress WHERE lesson_id IN (SELECT id FROM lessons WHERE course_id = ?)', (course_id,))
-        conn.execute('DELETE FROM lessons WHERE course_id = ?', (course_id,))
+        # حذف الصفوف المرتبطة: enrollments, enroll_requests ثم الدورة نفسها
+        # الالتحاقات أولاً حتى لا تُحدّث triggers العدادات صفوفاً ستُحذف على أي حال
         conn.execute('DELETE FROM enrollments WHERE course_id = ?', (course_id,))
         # conn.execute('DELETE FROM likes WHERE course_id = ?', (course_id,)) # (تم التعليق عليها لأن جدول Likes غير موجود في init_db)
         conn.execute('DELETE FROM enroll_requests WHERE course_id = ?', (course_id,))
         conn.execute('DELETE FROM courses WHERE id = ?', (course_id,))
+        search.remove_course(conn, course_id)
+        # الدروس وتقدم الطلاب وملفات الدورة في طابور المهام (ضمن نفس المعاملة)
+        jobs.enqueue(conn, 'purge_course', {'course_id': course_id})
         conn.commit()
+        wake_jobs()
+        invalidate_landing()
         flash('Course deleted' if request.args.get('lang', 'ar') == 'en' else 'تم حذف الدورة')
     except Exception:
         conn.rollback()
@@ -958,25 +1504,67 @@ def admin_course_delete(course_id):
         flash('Delete failed' if request.args.get('lang', 'ar') == 'en' else 'فشل الحذف')
     return redirect(url_for('admin_index'))
 
+# === حالة طابور المهام (jobs.py) ===
+@app.route('/admin/jobs')
+@login_required
+@admin_required
+def admin_jobs():
+    lang = request.args.get('lang', session.get('lang', 'ar'))
+    status = request.args.get('status')
+    if status not in jobs.STATUSES:
+        status = None
+    conn = get_db()
+    rows = conn.execute(f"""
+        SELECT * FROM jobs {'WHERE status = ?' if status else ''}
+        ORDER BY id DESC LIMIT 200
+    """, (status,) if status else ()).fetchall()
+    return render_template('admin/jobs.html', jobs=rows, counts=jobs.stats(conn),
+                           status=status, lang=lang, now=datetime.now().timestamp())
+
+
+@app.route('/admin/jobs/<int:job_id>/retry', methods=['POST'])
+@login_required
+@admin_required
+def admin_job_retry(job_id):
+    conn = get_db()
+    if jobs.retry(conn, job_id):
+        wake_jobs()
+        flash("🔁 أُعيدت المهمة إلى الطابور", "success")
+    else:
+        flash("❌ لا يمكن إعادة هذه المهمة", "error")
+    return redirect(url_for('admin_jobs', lang=request.args.get('lang')))
+
 # === عرض طلبات التسجيل في الدورات (المعلقة فقط) ===
 @app.route('/admin/enroll_requests')
 @login_required
 @admin_required
 def admin_enroll_requests():
-    conn = get_db()
-    # عرض الطلبات التي لم يتم التعامل معها بعد (status=NULL أو 'pending')
-    requests = conn.execute("""
-             SELECT er.id, er.status, u.id AS user_id, u.fullname, u.username, 
-                     c.id AS course_id, c.title_ar, c.title_en
-             FROM enroll_requests er
-             JOIN users u ON er.user_id = u.id
-             JOIN courses c ON er.course_id = c.id
-             WHERE er.status IS NULL OR er.status='pending'
-             ORDER BY er.id DESC
-          """).fetchall()
-    return render_template('admin/enroll_requests.html', requests=requests)
-
-# === قبول الطلب وتسجيل المستخدم في الدورة وتفعيل جميع الدروس ===
+    # الطلبات التي لم يتم التعامل معها بعد؛ الصفحة الأولى هنا والباقي من admin_enroll_requests_more
+    requests, next_cursor = pending_requests(get_db(), None, pagination.ADMIN_PAGE_SIZE)
+    return render_template('admin/enroll_requests.html', requests=requests, next_cursor=next_cursor)
+
+
+def pending_requests(conn, after, limit):
+    return pagination.fetch(conn, pagination.PENDING_REQUESTS_SQL, (), pagination.PENDING_REQUESTS_KEY,
+                            after, limit, descending=True)
+
+
+# === "عرض المزيد" في طابور الطلبات المعلقة (JSON) ===
+@app.route('/admin/enroll_requests/more')
+@login_required
+@admin_required
+def admin_enroll_requests_more():
+    try:
+        after = pagination.parse_cursor(request.args.get('after'))
+    except ValueError:
+        abort(400)
+    limit = pagination.page_size(request.args.get('limit'), pagination.ADMIN_PAGE_SIZE)
+    requests, next_cursor = pending_requests(get_db(), after, limit)
+    return jsonify({'html': render_template('admin/_request_rows.html', requests=requests),
+                    'requests': [dict(r) for r in requests], 'next': next_cursor})
+
+# === قبول الطلب وتسجيل المستخدم في الدورة ===
+# التقدم متناثر: لا نُنشئ صفوف user_progress مسبقاً، فغياب الصف يعني أن الدرس لم يكتمل
 @app.route('/admin/enroll_requests/<int:request_id>/accept', methods=['POST'])
 @login_required
 @admin_required
@@ -999,14 +1587,6 @@ def admin_accept_enroll_request(request_id):
              ON CONFLICT(user_id, course_id) DO UPDATE SET approved=1
           """, (user_id, course_id))
 
-    # تفعيل جميع الدروس للمستخدم
-    lessons = conn.execute("SELECT id FROM lessons WHERE course_id=?", (course_id,)).fetchall()
-    for lesson in lessons:
-        conn.execute("""
-              INSERT OR IGNORE INTO user_progress (user_id, lesson_id, completed)
-              VALUES (?, ?, 0)
-          """, (user_id, lesson['id']))  # اجعل completed=0 لتبدأ الدروس مغلقة لكنها متاحة
-
     # تحديث حالة الطلب
     conn.execute("UPDATE enroll_requests SET status='accepted' WHERE id=?", (request_id,))
     conn.commit()
@@ -1014,6 +1594,42 @@ def admin_accept_enroll_request(request_id):
     flash("✅ تم قبول الطلب وتفعيل جميع دروس الدورة للمستخدم", "success")
     return redirect(url_for('admin_enroll_requests'))
 
+# === قبول عدة طلبات دفعة واحدة (معاملة واحدة، INSERT ... SELECT) ===
+@app.route('/admin/enroll_requests/accept_bulk', methods=['POST'])
+@login_required
+@admin_required
+def admin_accept_enroll_requests_bulk():
+    payload = request.get_json(silent=True) or {}
+    ids = payload.get('ids') or request.form.getlist('ids')
+    try:
+        ids = json.dumps([int(i) for i in ids])
+    except (TypeError, ValueError):
+        abort(400)
+
+    conn = get_db()
+    try:
+        conn.execute("""
+            INSERT INTO enrollments (user_id, course_id, approved)
+            SELECT user_id, course_id, 1 FROM enroll_requests
+            WHERE id IN (SELECT value FROM json_each(?))
+              AND (status IS NULL OR status = 'pending')
+            ON CONFLICT(user_id, course_id) DO UPDATE SET approved=1
+        """, (ids,))
+        accepted = conn.execute("""
+            UPDATE enroll_requests SET status='accepted'
+            WHERE id IN (SELECT value FROM json_each(?))
+              AND (status IS NULL OR status = 'pending')
+        """, (ids,)).rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        app.logger.exception("Failed to bulk-accept enroll requests")
+        flash("❌ فشل قبول الطلبات", "error")
+        return redirect(url_for('admin_enroll_requests'))
+
+    flash(f"✅ تم قبول {accepted} طلب/طلبات", "success")
+    return redirect(url_for('admin_enroll_requests'))
+
 # === رفض أو إيقاف الطلب ===
 @app.route('/admin/enroll_requests/<int:request_id>/reject', methods=['POST'])
 @login_required
@@ -1044,14 +1660,8 @@ def like_course(course_id):
 # === عرض الملفات المرفوعة (صور / فيديوهات) ===
 @app.route('/uploads/<path:filename>')
 def uploaded_file(filename):
-    # تأمين المسار ضد محاولات ../
-    safe_path = os.path.normpath(filename)
-    if safe_path.startswith('..'):
-        abort(404)
-    full_path = os.path.join(app.config['UPLOAD_FOLDER'], safe_path)
-    if not os.path.exists(full_path):
-        abort(404)
-    return send_from_directory(app.config['UPLOAD_FOLDER'], safe_path)
+    # Range / ETag / Cache-Control وتفويض الإرسال — انظر media.py (يرفض مسارات ../)
+    return media.send_media(app.config['UPLOAD_FOLDER'], filename)
 
 # === صفحة الدورة التفصيلية ===
 @app.route('/course/<int:course_id>')
@@ -1061,7 +1671,14 @@ def course_page(course_id):
     lang = request.args.get('lang', session.get('lang', 'ar'))
 
     # جلب بيانات الدورة
-    course_row = conn.execute("SELECT * FROM courses WHERE id=?", (course_id,)).fetchone()
+    course_row = conn.execute("""
+        SELECT c.id, c.image, c.revision, c.updated_at, b.derivatives,
+               t.title, t.short_desc, t.full_desc
+        FROM courses c
+        JOIN course_text t ON t.lang = ? AND t.course_id = c.id
+        LEFT JOIN media_blobs b ON b.name = c.image
+        WHERE c.id=?
+    """, (l10n.resolve(lang), course_id)).fetchone()
     if not course_row:
         flash("❌ لم يتم العثور على الدورة", "error")
         # يفترض وجود مسار '/courses' لصفحة الدورات العامة
@@ -1074,17 +1691,16 @@ def course_page(course_id):
           WHERE user_id=? AND course_id=? AND approved=1
       """, (current_user.id, course_id)).fetchone()
 
-    # جلب الدروس الخاصة بهذه الدورة
-    lessons = conn.execute("""
-        SELECT l.id,
-               CASE WHEN ?='en' THEN l.title_en ELSE l.title_ar END AS title,
-               l.position,
-               up.completed
-        FROM lessons l
-        LEFT JOIN user_progress up ON up.lesson_id = l.id AND up.user_id = ?
-        WHERE l.course_id = ?
-        ORDER BY l.position ASC
-    """, (lang, current_user.id, course_id)).fetchall()
+    # ✅ 304 قبل الاستعلامات الثقيلة: الصفحة تتغير بمراجعة الدورة أو بتقدم الطالب
+    etag = page_etag('course', course_id, lang, current_user.id, course_row['revision'],
+                     enrollment and (enrollment['completed_lessons'], enrollment['total_lessons']))
+    last_modified = http_time(course_row['updated_at'], enrollment and enrollment['updated_at'])
+    response = not_modified(etag, last_modified)
+    if response is not None:
+        return response
+
+    # جلب الدروس الخاصة بهذه الدورة مع حالة الإكمال من مخزن التقدم
+    lessons = progress_store().course_lessons(conn, current_user.id, course_id, lang)
 
     # تحديد حالة التسجيل
     is_enrolled = enrollment is not None
@@ -1093,24 +1709,58 @@ def course_page(course_id):
     course = {
         'id': course_row['id'],
         'image': course_row['image'],
-        'title': course_row['title_en'] if lang == 'en' else course_row['title_ar'],
-        'short_desc': course_row['short_desc_en'] if lang == 'en' else course_row['short_desc_ar'],
-        'full_desc': course_row['full_desc_en'] if lang == 'en' else course_row['full_desc_ar']
+        'derivatives': course_row['derivatives'],
+        'title': course_row['title'],
+        'short_desc': course_row['short_desc'],
+        'full_desc': course_row['full_desc']
     }
 
-    return render_template(
+    html = render_template(
         'course_page.html',
         course=course,
         lessons=lessons,
         is_enrolled=is_enrolled,
+        enrollment=enrollment,
+        progress_percent=progress.percent_complete(enrollment) if enrollment else 0,
+        resume_lesson_id=progress_store().resume_lesson(conn, current_user.id, course_id) if enrollment else None,
         lang=lang
     )
+    return with_validators(html, etag, last_modified)
+
+
+# === فحص الصحة: حياة العملية (/healthz) والجاهزية لاستقبال الطلبات (/readyz) ===
+@app.route('/healthz')
+def healthz():
+    # لا يلمس القاعدة: يفشل فقط إذا توقف العامل عن الرد
+    response = make_response('ok\n')
+    response.headers['Content-Type'] = 'text/plain'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+@app.route('/readyz')
+def readyz():
+    # القاعدة تجيب والمخطط بآخر إصدار (يستعملها الموازن قبل إرسال الطلبات إلى العامل)
+    try:
+        conn = get_db()
+        version = migrations.current_version(conn)
+    except sqlite3.Error as e:
+        ready, body = False, {'status': 'unavailable', 'error': str(e)}
+    else:
+        ready = version >= migrations.MIGRATIONS[-1][0]
+        body = {'status': 'ok' if ready else 'migrating', 'schema': version}
+    body['pid'] = os.getpid()
+    response = jsonify(body)
+    response.status_code = 200 if ready else 503
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
 
 # === تشغيل التطبيق ===
+# خادم التطوير فقط؛ للإنتاج: gunicorn wsgi:app (انظر wsgi.py و gunicorn.conf.py)
 if __name__ == '__main__':
-    # ⚠️ استدعاء الدالة لتهيئة الجداول (بما فيها hero_slides) لمرة واحدة فقط
-    #with app.app_context():
-        #init_db() 
-        
+    # تطبيق ترحيلات المخطط قبل استقبال الطلبات
+    with app.app_context():
+        init_db()
+
     app.run()
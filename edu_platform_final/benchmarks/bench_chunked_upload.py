@@ -0,0 +1,129 @@
+# رفع ملف اصطناعي كبير (افتراضياً 2GB) عبر الرفع المجزأ إلى خادم HTTP حقيقي مع قياس ذاكرة العملية
+# ومحاكاة انقطاع الاتصال في منتصف مقطع ثم الاستئناف.
+#   python benchmarks/bench_chunked_upload.py [size_gb] [chunk_mb]
+import base64
+import hashlib
+import http.client
+import json
+import os
+import resource
+import shutil
+import socket
+import sys
+import threading
+import time
+
+from common import make_db, seed, webapp
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+BLOCK = os.urandom(1024 * 1024)
+MAX_RSS_GROWTH_MB = 32  # الرفع يُكتب للقرص على دفعات: الذاكرة لا تتبع حجم الملف ولا المقطع
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def rss_mb():
+    with open('/proc/self/status') as fh:
+        for line in fh:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def chunk_blocks(mb):
+    for _ in range(mb):
+        yield BLOCK
+
+
+def chunk_checksum(mb):
+    digest = hashlib.sha256()
+    for block in chunk_blocks(mb):
+        digest.update(block)
+    return 'sha256 ' + base64.b64encode(digest.digest()).decode()
+
+
+def main(size_gb, chunk_mb):
+    path = make_db()
+    upload_dir = os.path.join(os.path.dirname(path), f'bench-uploads-{os.getpid()}')
+    os.makedirs(upload_dir)
+    webapp.app.config['UPLOAD_FOLDER'] = upload_dir
+    user_ids, _, _ = seed(path, users=1, courses=1, lessons=1, enroll=False)
+    import sqlite3
+    conn = sqlite3.connect(path)
+    conn.execute('UPDATE users SET is_admin=1 WHERE id=?', (user_ids[0],))
+    conn.commit()
+    conn.close()
+    cookie_value = webapp.app.session_interface.get_signing_serializer(webapp.app).dumps(
+        {'_user_id': str(user_ids[0]), '_fresh': True})
+    cookie = f"{webapp.app.config.get('SESSION_COOKIE_NAME', 'session')}={cookie_value}"
+
+    server = make_server('127.0.0.1', 0, webapp.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_port
+    try:
+        def call(method, url, body=None, headers=None):
+            c = http.client.HTTPConnection('127.0.0.1', port)
+            c.request(method, url, body=body, headers=dict(headers or {}, Cookie=cookie))
+            r = c.getresponse()
+            data = r.read()
+            c.close()
+            return r.status, json.loads(data) if data else None
+
+        size = size_gb * 1024 ** 3
+        chunk = chunk_mb * 1024 * 1024
+        checksum = chunk_checksum(chunk_mb)
+        status, created = call('POST', '/admin/uploads', json.dumps({'filename': 'lecture.mp4', 'size': size}),
+                               {'Content-Type': 'application/json'})
+        url = created['url']
+        print(f'--- {size_gb} GB in {chunk_mb} MB chunks (upload {created["id"]}) ---')
+        rss_start = peak = rss_mb()
+        t0 = time.perf_counter()
+        offset, dropped = 0, False
+        while offset < size:
+            if not dropped and offset >= size // 2:
+                # انقطاع في منتصف المقطع: نرسل نصفه ثم نغلق الاتصال
+                s = socket.create_connection(('127.0.0.1', port))
+                s.sendall((f'PATCH {url} HTTP/1.1\r\nHost: x\r\nCookie: {cookie}\r\n'
+                           f'Upload-Offset: {offset}\r\nUpload-Checksum: {checksum}\r\n'
+                           f'Content-Length: {chunk}\r\n\r\n').encode())
+                for block in list(chunk_blocks(chunk_mb))[:chunk_mb // 2]:
+                    s.sendall(block)
+                s.close()
+                time.sleep(0.5)
+                _, state = call('GET', url)
+                print(f'  connection dropped mid-chunk at {offset / 2**20:.0f} MB; '
+                      f'server offset after resume check: {state["offset"] / 2**20:.0f} MB')
+                offset, dropped = state['offset'], True
+                continue
+            status, state = call('PATCH', url, chunk_blocks(chunk_mb), {
+                'Upload-Offset': str(offset), 'Upload-Checksum': checksum,
+                'Content-Length': str(chunk), 'Content-Type': 'application/offset+octet-stream'})
+            if status != 200:
+                raise SystemExit(f'PATCH failed: {status} {state}')
+            offset = state['offset']
+            peak = max(peak, rss_mb())
+        elapsed = time.perf_counter() - t0
+        _, state = call('GET', url)
+        print(f'  complete={state["complete"]}  {size / 2**20 / elapsed:.0f} MB/s  ({elapsed:.1f}s)')
+        print(f'  RSS start={rss_start:.0f} MB  peak={peak:.0f} MB  end={rss_mb():.0f} MB '
+              f'(client and server share this process)')
+        if not state['complete']:
+            raise SystemExit('BAD upload did not complete')
+        if peak - rss_start >= MAX_RSS_GROWTH_MB:
+            raise SystemExit(f'BAD RSS grew by {peak - rss_start:.0f} MB (limit {MAX_RSS_GROWTH_MB} MB)')
+    finally:
+        server.shutdown()
+        # الكتل في مجلدات فرعية (ab/cd/...) و .partial: حذف الشجرة كلها ثم القاعدة المؤقتة
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    size_gb = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    chunk_mb = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    main(size_gb, chunk_mb)
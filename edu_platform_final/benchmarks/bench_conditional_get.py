@@ -0,0 +1,44 @@
+# قياس الزيارات المتكررة مع ETag: البايتات المنقولة وزمن الخادم لـ /, /course/<id>, /lesson/<id>
+#   python benchmarks/bench_conditional_get.py [repeats]
+import os
+import sys
+import time
+
+from common import client_for, make_db, percentile, seed, webapp
+
+
+def visit(client, url, repeats, conditional):
+    """زيارة أولى ثم repeats زيارات متكررة؛ يعيد (بايتات، أزمنة بالمللي ثانية، رموز الحالة)."""
+    etag = client.get(url).headers.get('ETag')
+    total_bytes, times, codes = 0, [], set()
+    for _ in range(repeats):
+        headers = {'If-None-Match': etag} if conditional and etag else {}
+        t0 = time.perf_counter()
+        r = client.get(url, headers=headers)
+        times.append((time.perf_counter() - t0) * 1000)
+        total_bytes += len(r.data)
+        codes.add(r.status_code)
+    return total_bytes, times, codes
+
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    path = make_db(CACHE_BACKEND='none')
+    user_ids, course_ids, lesson_ids = seed(path, users=2, courses=10, lessons=30)
+    anon, student = client_for(), client_for(user_ids[0])
+    pages = [('GET / (anonymous)', anon, '/'),
+             ('GET / (logged in)', student, '/'),
+             ('GET /course/<id>', student, f'/course/{course_ids[0]}'),
+             ('GET /lesson/<id>', student, f'/lesson/{lesson_ids[0]}')]
+    for label, client, url in pages:
+        for conditional in (False, True):
+            size, times, codes = visit(client, url, repeats, conditional)
+            print(f'{label:<22} {"If-None-Match" if conditional else "plain":<14} '
+                  f'status={sorted(codes)}  bytes/visit={size // repeats:7d}  '
+                  f'p50={percentile(times, 50):6.2f}ms  p99={percentile(times, 99):6.2f}ms')
+
+    if webapp._pool is not None:
+        webapp._pool.close_all()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
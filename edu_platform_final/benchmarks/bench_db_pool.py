@@ -0,0 +1,38 @@
+# قياس أثر مجمّع الاتصالات و WAL على /, /course/<id>, /lesson/<id>/mark_watched
+#   python benchmarks/bench_db_pool.py [clients] [requests_per_client]
+import os
+import sys
+
+from common import client_for, make_db, report, run_concurrent, seed, webapp
+
+
+def bench(label, pool_size, clients, per_client):
+    path = make_db(DB_POOL_SIZE=pool_size)
+    webapp._pool = None
+    user_ids, course_ids, lesson_ids = seed(path, users=clients, courses=5, lessons=20)
+    anon = [client_for() for _ in range(clients)]
+    logged = [client_for(user_ids[i]) for i in range(clients)]
+
+    print(f'--- {label} (DB_POOL_SIZE={pool_size}) ---')
+    rps, lat = run_concurrent(lambda c, i: anon[c].get('/'), clients, per_client)
+    report('GET /', rps, lat)
+    rps, lat = run_concurrent(
+        lambda c, i: logged[c].get(f'/course/{course_ids[i % len(course_ids)]}'), clients, per_client)
+    report('GET /course/<id>', rps, lat)
+    rps, lat = run_concurrent(
+        lambda c, i: logged[c].post(f'/lesson/{lesson_ids[i % len(lesson_ids)]}/mark_watched'),
+        clients, per_client)
+    report('POST /lesson/<id>/mark_watched', rps, lat)
+
+    if webapp._pool is not None:
+        webapp._pool.close_all()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    bench('before: connect per request, rollback journal', 0, clients, per_client)
+    bench('after: pooled WAL connections', 8, clients, per_client)
@@ -0,0 +1,113 @@
+# قياس طابور المهام (jobs.py) والتحقق من استعادة المهام بعد توقف عامل
+#   python benchmarks/bench_jobs.py [jobs] [concurrency]
+# 1) إنتاجية العمال لمهام قصيرة (noop): كلفة الحجز والإنهاء نفسها
+# 2) عامل "مات" بعد الحجز: تنتهي مدة الحجز فيأخذ عامل آخر المهمة، ونتيجة العامل الميت تُرفض
+# 3) مهمة تفشل دائماً: إعادة المحاولة بتأخير أُسّي ثم failed بعد max_attempts
+import logging
+import os
+import sys
+import time
+
+from common import make_db, webapp
+
+import jobs
+from db_pool import connect
+
+done_ids = []
+failures = []
+
+
+@jobs.task('bench_noop')
+def noop(conn, payload):
+    done_ids.append(payload['n'])
+
+
+@jobs.task('bench_always_fails')
+def always_fails(conn, payload):
+    raise RuntimeError('boom')
+
+
+def check(label, ok):
+    print(f"  {'OK ' if ok else 'BAD'} {label}")
+    if not ok:
+        failures.append(label)
+    return ok
+
+
+def throughput(path, count, concurrency):
+    conn = connect(path)
+    for n in range(count):
+        jobs.enqueue(conn, 'bench_noop', {'n': n})
+    conn.commit()
+    worker = jobs.Worker(lambda: connect(path), concurrency=concurrency, poll_interval=0.05).start()
+    t0 = time.perf_counter()
+    while jobs.stats(conn)['done'] < count:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - t0
+    worker.stop()
+    print(f'{count} jobs / {concurrency} threads: {count / elapsed:9.1f} jobs/s')
+    check('every job ran exactly once', sorted(done_ids) == list(range(count)))
+    conn.close()
+
+
+def crash_recovery(path):
+    conn = connect(path)
+    job_id = jobs.enqueue(conn, 'bench_noop', {'n': -1}, max_attempts=2)
+    conn.commit()
+    now = time.time()
+    dead = jobs.lease(conn, 'dead-worker', lease_seconds=30, now=now)
+    check('dead worker leased the job', dead is not None and dead['id'] == job_id)
+    check('job is not re-leased while the lease is valid',
+          jobs.lease(conn, 'live-worker', now=now + 10) is None)
+    alive = jobs.lease(conn, 'live-worker', now=now + 31)
+    check('expired lease is re-leased by another worker',
+          alive is not None and alive['id'] == job_id and alive['attempts'] == 2)
+    check('late completion by the dead worker is rejected', not jobs.complete(conn, dead))
+    check('live worker completes the job', jobs.run_job(conn, alive) and jobs.get(conn, job_id)['status'] == 'done')
+
+    # مات العامل في كل المحاولات المسموحة ← failed بدل التكرار إلى ما لا نهاية
+    job_id = jobs.enqueue(conn, 'bench_noop', {'n': -2}, max_attempts=1)
+    conn.commit()
+    now = time.time()
+    jobs.lease(conn, 'dead-worker', lease_seconds=30, now=now)
+    check('lease expiring on the last attempt fails the job',
+          jobs.lease(conn, 'live-worker', now=now + 31) is None
+          and jobs.get(conn, job_id)['status'] == 'failed')
+    conn.close()
+
+
+def retries(path):
+    conn = connect(path)
+    job_id = jobs.enqueue(conn, 'bench_always_fails', max_attempts=3)
+    conn.commit()
+    now = time.time()
+    delays = []
+    for attempt in range(3):
+        job = jobs.lease(conn, 'w', now=now)
+        jobs.run_job(conn, job)
+        row = jobs.get(conn, job_id)
+        delays.append(round(row['run_after'] - row['updated_at']))
+        now = row['run_after'] + 1
+    check(f'backoff between attempts {delays[:2]}s', delays[:2] == [jobs.RETRY_BASE_SECONDS, 2 * jobs.RETRY_BASE_SECONDS])
+    check('failed after max_attempts', row['status'] == 'failed' and 'boom' in row['last_error'])
+    check('manual retry requeues it', jobs.retry(conn, job_id) and jobs.get(conn, job_id)['status'] == 'queued')
+    conn.close()
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    logging.getLogger('jobs').setLevel(logging.CRITICAL)  # الفشل هنا متعمد
+    path = make_db(JOB_WORKERS=0)
+    throughput(path, count, concurrency)
+    print('crash recovery:')
+    crash_recovery(path)
+    print('retries:')
+    retries(path)
+    if webapp._pool is not None:
+        webapp._pool.close_all()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    if failures:
+        sys.exit(f'{len(failures)} checks failed')
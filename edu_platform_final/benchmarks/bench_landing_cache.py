@@ -0,0 +1,36 @@
+# قياس أثر التخزين المؤقت على الصفحة الرئيسية (زائر مجهول ومستخدم مسجّل)
+#   python benchmarks/bench_landing_cache.py [clients] [requests_per_client]
+import os
+import sys
+import tempfile
+
+from common import client_for, make_db, report, run_concurrent, seed, webapp
+
+
+def bench(backend, clients, per_client):
+    path = make_db(CACHE_BACKEND=backend, CACHE_DIR=tempfile.mkdtemp(prefix='bench-cache-'))
+    webapp._pool = None
+    webapp._page_cache = None
+    user_ids, course_ids, _ = seed(path, users=clients, courses=30, lessons=2, enroll=False)
+    anon = [client_for() for _ in range(clients)]
+    logged = [client_for(user_ids[i]) for i in range(clients)]
+
+    print(f'--- CACHE_BACKEND={backend} ---')
+    rps, lat = run_concurrent(lambda c, i: anon[c].get('/?lang=en'), clients, per_client)
+    report('GET / (anonymous)', rps, lat)
+    rps, lat = run_concurrent(lambda c, i: logged[c].get('/?lang=en'), clients, per_client)
+    report('GET / (logged in)', rps, lat)
+    print('  cache:', webapp.page_cache().stats())
+
+    if webapp._pool is not None:
+        webapp._pool.close_all()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    for backend in ('none', 'memory', 'file'):
+        bench(backend, clients, per_client)
@@ -0,0 +1,90 @@
+# قياس عرض صفحة الدرس مع المحتوى المجهز مسبقاً (lesson_html.py) مقابل التجهيز في كل زيارة
+#   python benchmarks/bench_lesson_page.py [content_kb] [clients] [requests_per_client]
+# "قبل": الصفوف المجهزة تُحذف قبل كل طلب فيعيد المسار التنقية ورابط التضمين والتخزين
+#        (تكلفة تنقية المحتوى لو بقيت عند العرض).
+# "بعد": القطعة المخزنة كما هي، ثم إعادة التحقق بـ If-None-Match (304).
+import os
+import sqlite3
+import statistics
+import sys
+import time
+
+from common import client_for, make_db, report, run_concurrent, seed, webapp
+
+import lesson_html
+
+VIDEO_URL = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL123&index=4'
+
+
+def lesson_content(kb):
+    """HTML محرر نموذجي: فقرات وقوائم وروابط وجداول وبعض ما يجب حذفه."""
+    block = ('<h3>عنوان فرعي</h3><p dir="rtl">فقرة <strong>مهمة</strong> مع <a href="https://example.com/a?b=1&c=2" '
+             'onclick="track()">رابط</a> و<em>تأكيد</em>.</p><ul><li>نقطة أولى</li><li>نقطة ثانية</li></ul>'
+             '<table><tr><th>أ</th><th>ب</th></tr><tr><td>1</td><td>2</td></tr></table>'
+             '<pre><code>print("hi") &lt; 3</code></pre><script>alert(1)</script><img src="/u/x.png" onerror="x()">')
+    return block * max(1, kb * 1024 // len(block.encode('utf-8')))
+
+
+def timed(fn, rounds):
+    times = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+
+def main(content_kb, clients, requests_per_client):
+    path = make_db(CACHE_BACKEND='none')
+    user_ids, course_ids, lesson_ids = seed(path, users=clients, courses=1, lessons=20)
+    content = lesson_content(content_kb)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute('UPDATE lessons SET content_ar = ?, content_en = ?, video_url = ?', (content, content, VIDEO_URL))
+    with conn:
+        lesson_html.rebuild(conn)
+    print(f'lesson content {len(content.encode("utf-8")) / 1024:.0f} KB, {clients} clients × {requests_per_client} requests')
+
+    print(f'  sanitize once per save             {timed(lambda: lesson_html.sanitize(content), 50):8.3f} ms')
+
+    students = [client_for(u) for u in user_ids]
+    urls = [f'/lesson/{lesson_id}' for lesson_id in lesson_ids]
+
+    def compile_each_view(idx, i):
+        url = urls[(idx + i) % len(urls)]
+        conn.execute('DELETE FROM lesson_html WHERE lesson_id = ?', (int(url.rsplit('/', 1)[1]),))
+        conn.commit()
+        assert students[idx].get(url).status_code == 200
+
+    def stored(idx, i):
+        assert students[idx].get(urls[(idx + i) % len(urls)]).status_code == 200
+
+    etags = {}
+    for idx, client in enumerate(students):
+        for url in urls:
+            etags[idx, url] = client.get(url).headers['ETag']
+
+    def revalidate(idx, i):
+        url = urls[(idx + i) % len(urls)]
+        assert students[idx].get(url, headers={'If-None-Match': etags[idx, url]}).status_code == 304
+
+    # خيط واحد لحالة "قبل": الحذف يمر عبر اتصال القياس الوحيد
+    report('before: sanitize on every view', *run_concurrent(compile_each_view, 1, requests_per_client))
+    with conn:
+        lesson_html.rebuild(conn)
+    report('after: stored fragment (1 client)', *run_concurrent(stored, 1, requests_per_client))
+    report(f'after: stored fragment ({clients} clients)', *run_concurrent(stored, clients, requests_per_client))
+    report(f'after: If-None-Match → 304 ({clients} clients)', *run_concurrent(revalidate, clients, requests_per_client))
+
+    conn.close()
+    if webapp._pool is not None:
+        webapp._pool.close_all()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    content_kb = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    requests_per_client = int(sys.argv[3]) if len(sys.argv) > 3 else 300
+    main(content_kb, clients, requests_per_client)
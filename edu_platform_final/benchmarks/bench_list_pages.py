@@ -0,0 +1,142 @@
+# قياس صفحات القوائم قبل وبعد الترقيم بالمؤشر وإسقاط الأعمدة (pagination.py)
+#   python benchmarks/bench_list_pages.py [courses] [pending_requests] [html_kb]
+# الافتراضي 50k دورة (بوصف HTML كامل html_kb لكل لغة) و 1M طلب تسجيل معلق.
+# "قبل": الاستعلامات السابقة (fetchall لكل الصفوف، SELECT c.*، شرط OR على الحالة).
+# "بعد": الصفحة الأولى، وصفحة في منتصف القائمة بالمؤشر مقابل OFFSET لنفس الموضع.
+import os
+import sqlite3
+import statistics
+import sys
+import time
+import tracemalloc
+
+from common import client_for, make_db, webapp
+
+import pagination
+
+OLD_LANDING_SQL = """
+    SELECT c.id,
+           CASE WHEN ?='en' THEN c.title_en ELSE c.title_ar END AS title,
+           CASE WHEN ?='en' THEN c.short_desc_en ELSE c.short_desc_ar END AS short_desc,
+           c.image, b.derivatives
+    FROM courses c LEFT JOIN media_blobs b ON b.name = c.image
+"""
+OLD_ADMIN_COURSES_SQL = """
+    SELECT c.*,
+           (SELECT COUNT(*) FROM enrollments e
+             WHERE e.course_id = c.id AND e.approved = 1) AS students,
+           (SELECT COUNT(*) FROM enrollments e
+             WHERE e.course_id = c.id AND e.approved = 1
+               AND e.total_lessons > 0 AND e.completed_lessons >= e.total_lessons) AS graduates
+    FROM courses c
+    ORDER BY c.id DESC
+"""
+OLD_REQUESTS_SQL = """
+    SELECT er.id, er.status, u.id AS user_id, u.fullname, u.username,
+           c.id AS course_id, c.title_ar, c.title_en
+    FROM enroll_requests er
+    JOIN users u ON er.user_id = u.id
+    JOIN courses c ON er.course_id = c.id
+    WHERE er.status IS NULL OR er.status='pending'
+    ORDER BY er.id DESC
+"""
+
+
+def populate(path, courses, pending, html_kb):
+    conn = sqlite3.connect(path)
+    html = '<p>' + 'وصف كامل للدورة ' * (html_kb * 1024 // 30) + '</p>'
+    conn.executemany(
+        'INSERT INTO courses (title_ar, title_en, short_desc_ar, short_desc_en, full_desc_ar, full_desc_en) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        ((f'دورة {i}', f'Course {i}', 'وصف مختصر', 'Short description', html, html) for i in range(courses)))
+    per_user = 50
+    users = (pending + per_user - 1) // per_user
+    conn.executemany('INSERT INTO users (username, password, fullname, email) VALUES (?, ?, ?, ?)',
+                     ((f'u{i}', 'x', f'User {i}', f'u{i}@example.com') for i in range(users)))
+    conn.executemany(
+        "INSERT INTO enroll_requests (user_id, course_id, status) VALUES (?, ?, 'pending')",
+        ((1 + n // per_user, 1 + (n * 7919) % courses) for n in range(pending)))
+    conn.commit()
+    return conn
+
+
+def measure(fn, rounds=5):
+    """(الزمن الوسيط بالمللي ثانية، ذروة الذاكرة المخصصة في Python بالميغابايت)."""
+    times = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(times), peak / 1024 / 1024
+
+
+def row(label, fn, rounds=5):
+    ms, mb = measure(fn, rounds)
+    print(f'  {label:<44} {ms:10.2f} ms {mb:10.2f} MB')
+
+
+def main(courses, pending, html_kb):
+    path = make_db(JOB_WORKERS=0, CACHE_BACKEND='none')
+    webapp._page_cache = None
+    t0 = time.perf_counter()
+    conn = populate(path, courses, pending, html_kb)
+    conn.row_factory = sqlite3.Row
+    print(f'{courses} courses ({html_kb} KB HTML per language), {pending} pending requests '
+          f'— populated in {time.perf_counter() - t0:.1f}s')
+    mid_course = courses // 2
+    mid_request = conn.execute('SELECT MAX(id) FROM enroll_requests').fetchone()[0] // 2
+    offset_requests = conn.execute('SELECT COUNT(*) FROM enroll_requests WHERE id > ?', (mid_request,)).fetchone()[0]
+
+    print(f'  {"":<44} {"latency":>13} {"peak alloc":>13}')
+    print('landing course grid')
+    row('before: every course', lambda: [dict(r) for r in conn.execute(OLD_LANDING_SQL, ('ar', 'ar'))])
+    row('after: first page', lambda: webapp.landing_courses(conn, 'ar'))
+    row('after: page at the middle (cursor)', lambda: webapp.landing_courses(conn, 'ar', (mid_course,)))
+
+    print('admin_index courses')
+    row('before: SELECT c.* for every course', lambda: conn.execute(OLD_ADMIN_COURSES_SQL).fetchall(), 1)
+    row('after: first page', lambda: pagination.fetch(
+        conn, pagination.ADMIN_COURSES_SQL, (), pagination.ADMIN_COURSES_KEY, None, descending=True))
+    row('after: page at the middle (cursor)', lambda: pagination.fetch(
+        conn, pagination.ADMIN_COURSES_SQL, (), pagination.ADMIN_COURSES_KEY, (mid_course,), descending=True))
+    row('same page with OFFSET', lambda: conn.execute(
+        OLD_ADMIN_COURSES_SQL + ' LIMIT 50 OFFSET ?', (courses - mid_course,)).fetchall())
+
+    print('admin_enroll_requests (pending queue)')
+    row('before: every pending request', lambda: conn.execute(OLD_REQUESTS_SQL).fetchall(), 1)
+    row('after: first page', lambda: webapp.pending_requests(conn, None, pagination.ADMIN_PAGE_SIZE))
+    row('after: page at the middle (cursor)', lambda: webapp.pending_requests(
+        conn, (mid_request,), pagination.ADMIN_PAGE_SIZE))
+    row('same page with OFFSET', lambda: conn.execute(
+        OLD_REQUESTS_SQL + ' LIMIT 50 OFFSET ?', (offset_requests,)).fetchall(), 1)
+
+    # الطلب كاملاً (قالب + JSON) عبر عميل الاختبار
+    admin = conn.execute("INSERT INTO users (username, password, fullname, email, is_admin) "
+                         "VALUES ('admin', 'x', 'Admin', 'admin@example.com', 1)").lastrowid
+    conn.commit()
+    client, anon = client_for(admin), client_for()
+    print('HTTP (test client)')
+    row('GET /?lang=ar', lambda: anon.get('/?lang=ar'))
+    row(f'GET /courses/more?after={mid_course}', lambda: anon.get(f'/courses/more?lang=ar&after={mid_course}'))
+    row('GET /admin', lambda: client.get('/admin'))
+    row('GET /admin/enroll_requests', lambda: client.get('/admin/enroll_requests'))
+    row(f'GET /admin/enroll_requests/more?after={mid_request}',
+        lambda: client.get(f'/admin/enroll_requests/more?after={mid_request}'))
+
+    conn.close()
+    if webapp._pool is not None:
+        webapp._pool.close_all()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    courses = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    pending = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+    html_kb = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    main(courses, pending, html_kb)
@@ -0,0 +1,185 @@
+# الواجهة الحية (live.py تحت uvicorn): آلاف اتصالات SSE خاملة في عملية واحدة + نبضات موضع المشاهدة
+#   python benchmarks/bench_live.py [sse_connections] [new_requests] [heartbeat_clients] [seconds]
+# 1. ذاكرة وخيوط العملية قبل الاتصالات وبعدها (/proc): لا خيط لكل اتصال
+# 2. طلبات تسجيل جديدة تُكتب في القاعدة مباشرة: زمن وصول كل حدث إلى كل المشتركين
+# 3. نبضات متواصلة (اتصالات keep-alive) والاتصالات الخاملة ما زالت مفتوحة: req/s والكتابة المجمّعة
+import asyncio
+import json
+import os
+import re
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import BASE_DIR, percentile, report, webapp
+
+POLL_INTERVAL = 0.5
+FLUSH_INTERVAL = 2.0
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def proc_status(pid):
+    fields = {}
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            fields[key] = value.strip()
+    return int(fields['VmRSS'].split()[0]) / 1024, int(fields['Threads'])
+
+
+def session_cookie(user_id):
+    serializer = webapp.app.session_interface.get_signing_serializer(webapp.app)
+    return f'{webapp.app.config["SESSION_COOKIE_NAME"]}={serializer.dumps({"_user_id": str(user_id), "_fresh": True})}'
+
+
+async def read_head(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = re.search(rb'(?i)content-length:\s*(\d+)', head)
+    return status, int(length[1]) if length else 0
+
+
+async def subscribe(port, cookie, arrivals, ready):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET /live/admin/enroll_requests HTTP/1.1\r\nHost: localhost\r\nCookie: {cookie}\r\n'
+                 f'Accept: text/event-stream\r\n\r\n'.encode())
+    status, _ = await read_head(reader)
+    assert status == 200, status
+    ready.append(writer)
+    while True:
+        data = await reader.read(65536)
+        if not data:
+            return
+        now = time.perf_counter()
+        for event_id in re.findall(rb'\nid: (\d+)\n|^id: (\d+)\n', data):
+            arrivals.setdefault(int(event_id[0] or event_id[1]), []).append(now)
+
+
+async def heartbeats(port, cookie, lessons, deadline, latencies, statuses):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    i = 0
+    while time.perf_counter() < deadline:
+        lesson_id = lessons[i % len(lessons)]
+        body = json.dumps({'position': 10.0 + i, 'duration': 600}).encode()
+        t0 = time.perf_counter()
+        writer.write(f'POST /live/lessons/{lesson_id}/heartbeat HTTP/1.1\r\nHost: localhost\r\nCookie: {cookie}\r\n'
+                     f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n'.encode() + body)
+        status, length = await read_head(reader)
+        if length:
+            await reader.readexactly(length)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        statuses[status] = statuses.get(status, 0) + 1
+        i += 1
+    writer.close()
+
+
+async def run(port, db, connections, new_requests, heartbeat_clients, seconds, pid):
+    admin_cookie = session_cookie(1)
+    rss0, threads0 = proc_status(pid)
+    arrivals, ready, tasks = {}, [], []
+    t0 = time.perf_counter()
+    for start in range(0, connections, 500):
+        tasks += [asyncio.ensure_future(subscribe(port, admin_cookie, arrivals, ready))
+                  for _ in range(min(500, connections - start))]
+        while len(ready) < min(start + 500, connections):
+            await asyncio.sleep(0.05)
+    rss1, threads1 = proc_status(pid)
+    print(f'{connections} SSE connections open in {time.perf_counter() - t0:.1f}s: '
+          f'RSS {rss0:.0f} → {rss1:.0f} MB ({(rss1 - rss0) * 1024 / connections:.1f} KB/connection), '
+          f'threads {threads0} → {threads1}')
+
+    conn = sqlite3.connect(db)
+    committed = {}
+    pairs = conn.execute('SELECT u.id, c.id FROM users u, courses c WHERE NOT EXISTS ('
+                         'SELECT 1 FROM enroll_requests r WHERE r.user_id = u.id AND r.course_id = c.id) '
+                         'LIMIT ?', (new_requests,)).fetchall()
+    for user_id, course_id in pairs:
+        cur = conn.execute("INSERT INTO enroll_requests (user_id, course_id, status) VALUES (?, ?, 'pending')",
+                           (user_id, course_id))
+        conn.commit()
+        committed[cur.lastrowid] = time.perf_counter()
+        await asyncio.sleep(POLL_INTERVAL * 2)
+    await asyncio.sleep(POLL_INTERVAL * 2)
+    delays = [(t - committed[event_id]) * 1000 for event_id, times in arrivals.items() for t in times
+              if event_id in committed]
+    delivered = sum(len(arrivals.get(event_id, ())) for event_id in committed)
+    print(f'{new_requests} new requests → {delivered}/{new_requests * connections} events delivered; '
+          f'commit→receive p50={percentile(delays, 50):.0f}ms p99={percentile(delays, 99):.0f}ms '
+          f'max={max(delays, default=0):.0f}ms (poll every {POLL_INTERVAL * 1000:.0f} ms)')
+
+    # طلاب مقبولون ودروس دوراتهم
+    students = {}
+    for user_id, lesson_id in conn.execute(
+            'SELECT e.user_id, l.id FROM enrollments e JOIN lessons l ON l.course_id = e.course_id '
+            'WHERE e.approved = 1 ORDER BY e.user_id, l.id'):
+        if len(students) >= heartbeat_clients and user_id not in students:
+            break
+        students.setdefault(user_id, []).append(lesson_id)
+    conn.execute('DELETE FROM watch_positions')
+    conn.commit()
+    latencies, statuses = [], {}
+    deadline = time.perf_counter() + seconds
+    t0 = time.perf_counter()
+    await asyncio.gather(*(heartbeats(port, session_cookie(u), lessons[:5], deadline, latencies, statuses)
+                           for u, lessons in students.items()))
+    elapsed = time.perf_counter() - t0
+    rss2, threads2 = proc_status(pid)
+    report(f'heartbeats ({len(students)} keep-alive clients)', len(latencies) / elapsed, latencies)
+    await asyncio.sleep(FLUSH_INTERVAL * 1.5)
+    rows = conn.execute('SELECT COUNT(*) FROM watch_positions').fetchone()[0]
+    expected = sum(min(5, len(lessons)) for lessons in students.values())
+    print(f'{"":<40} status {statuses}; watch_positions rows {rows}/{expected}; '
+          f'{len(latencies) / rows if rows else 0:.0f} heartbeats coalesced per row; '
+          f'RSS {rss2:.0f} MB, threads {threads2}, SSE still open {sum(not t.done() for t in tasks)}')
+    conn.close()
+    for writer in ready:
+        writer.close()
+    for task in tasks:
+        task.cancel()
+
+
+def main(connections, new_requests, heartbeat_clients, seconds):
+    workdir = tempfile.mkdtemp(prefix='bench-live-')
+    db = os.path.join(workdir, 'db.sqlite')
+    subprocess.run([sys.executable, 'datagen.py', '--scale', 'small', '--no-html', db], cwd=BASE_DIR, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    port = free_port()
+    env = dict(os.environ, DATABASE=db, LIVE_POLL_INTERVAL=str(POLL_INTERVAL),
+               LIVE_FLUSH_INTERVAL=str(FLUSH_INTERVAL), JOB_WORKERS='0')
+    proc = subprocess.Popen([sys.executable, 'live.py', str(port)], cwd=BASE_DIR, env=env)
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.1)
+        print(f'live.py (uvicorn, 1 process), {os.cpu_count()} CPUs')
+        asyncio.run(run(port, db, connections, new_requests, heartbeat_clients, seconds, proc.pid))
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db + suffix):
+                os.remove(db + suffix)
+        os.rmdir(workdir)
+
+
+if __name__ == '__main__':
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    new_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    heartbeat_clients = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    seconds = float(sys.argv[4]) if len(sys.argv) > 4 else 10
+    main(connections, new_requests, heartbeat_clients, seconds)
@@ -0,0 +1,160 @@
+# قياس الإسقاط المترجم (l10n.py) مقابل CASE WHEN ?='en' في كل استعلام
+#   python benchmarks/bench_localized_text.py [courses] [lessons_per_course] [students]
+# الافتراضي 2000 دورة × 50 درس، و 2000 طالب ملتحق بعشر دورات لكل منهم.
+# "قبل": صيغ الاستعلامات السابقة (CASE WHEN على أعمدة title_ar / title_en ...).
+# "بعد": استعلامات progress.py / pagination.py الحالية على course_text / lesson_text.
+import os
+import sqlite3
+import statistics
+import sys
+import time
+
+from common import make_db, webapp
+
+import l10n
+import pagination
+import progress
+
+OLD_COURSE_LESSONS_SQL = """
+    SELECT l.id,
+           CASE WHEN ?='en' THEN l.title_en ELSE l.title_ar END AS title,
+           l.position,
+           up.completed
+    FROM lessons l
+    LEFT JOIN user_progress up ON up.lesson_id = l.id AND up.user_id = ?
+    WHERE l.course_id = ?
+    ORDER BY l.position ASC
+"""
+OLD_PROFILE_LESSONS_SQL = """
+    SELECT l.course_id,
+           l.id,
+           CASE WHEN ?='en' THEN l.title_en ELSE l.title_ar END AS title,
+           l.position,
+           up.completed
+    FROM enrollments e
+    JOIN lessons l ON l.course_id = e.course_id
+    LEFT JOIN user_progress up ON up.lesson_id = l.id AND up.user_id = e.user_id
+    WHERE e.user_id = ?
+      AND e.approved = 1
+    ORDER BY e.course_id, l.position
+"""
+OLD_LANDING_SQL = """
+    SELECT c.id,
+           CASE WHEN ?='en' THEN c.title_en ELSE c.title_ar END AS title,
+           CASE WHEN ?='en' THEN c.short_desc_en ELSE c.short_desc_ar END AS short_desc,
+           c.image, b.derivatives
+    FROM courses c LEFT JOIN media_blobs b ON b.name = c.image
+    WHERE c.id NOT IN (SELECT course_id FROM enrollments WHERE user_id = ? AND approved = 1)
+      AND c.id > ?
+    ORDER BY c.id LIMIT ?
+"""
+OLD_COURSE_SQL = """
+    SELECT c.*, b.derivatives FROM courses c
+    LEFT JOIN media_blobs b ON b.name = c.image
+    WHERE c.id=?
+"""
+
+
+def populate(path, courses, lessons, students, per_student=10):
+    conn = sqlite3.connect(path)
+    body = '<p>' + 'محتوى الدرس ' * 200 + '</p>'
+    conn.executemany(
+        'INSERT INTO courses (title_ar, title_en, short_desc_ar, short_desc_en, full_desc_ar, full_desc_en) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        # ثلث الدورات بلا ترجمة إنجليزية (يُعرض البديل العربي)
+        ((f'دورة {i}', '' if i % 3 == 0 else f'Course {i}', 'وصف مختصر', 'Short description', body, body)
+         for i in range(courses)))
+    conn.executemany(
+        'INSERT INTO lessons (course_id, title_ar, title_en, content_ar, content_en, position) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        ((1 + n // lessons, f'درس {n}', f'Lesson {n}', body, body, n % lessons) for n in range(courses * lessons)))
+    conn.executemany('INSERT INTO users (username, password, fullname, email) VALUES (?, ?, ?, ?)',
+                     ((f'u{i}', 'x', f'User {i}', f'u{i}@example.com') for i in range(students)))
+    conn.executemany(
+        'INSERT INTO enrollments (user_id, course_id, approved, total_lessons) VALUES (?, ?, 1, ?)',
+        ((1 + s, 1 + (s * 7 + k * 101) % courses, lessons) for s in range(students) for k in range(per_student)))
+    conn.commit()
+    return conn
+
+
+def latency(fn, rounds):
+    times = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+
+def compare(label, before, after, rounds=200):
+    b, a = latency(before, rounds), latency(after, rounds)
+    print(f'  {label:<34} {b:9.3f} ms {a:9.3f} ms {b / a:7.1f}x')
+
+
+def main(courses, lessons, students):
+    path = make_db(JOB_WORKERS=0, CACHE_BACKEND='none')
+    t0 = time.perf_counter()
+    conn = populate(path, courses, lessons, students)
+    conn.row_factory = sqlite3.Row
+    print(f'{courses} courses × {lessons} lessons, {students} students — populated in '
+          f'{time.perf_counter() - t0:.1f}s (projections maintained by triggers during the load)')
+    t0 = time.perf_counter()
+    with conn:
+        l10n.rebuild(conn)
+    print(f'  full l10n.rebuild: {time.perf_counter() - t0:.2f}s')
+
+    mid = courses // 2
+    user = students // 2
+    print(f'  {"":<34} {"CASE WHEN":>12} {"projection":>12} {"speedup":>8}')
+    for lang in ('ar', 'en'):
+        print(f'lang={lang}')
+        compare('course_page lessons',
+                lambda: conn.execute(OLD_COURSE_LESSONS_SQL, (lang, user, mid)).fetchall(),
+                lambda: conn.execute(progress.COURSE_LESSONS_SQL, (user, lang, mid)).fetchall())
+        compare('profile lessons (10 courses)',
+                lambda: conn.execute(OLD_PROFILE_LESSONS_SQL, (lang, user)).fetchall(),
+                lambda: conn.execute(progress.PROFILE_LESSONS_SQL, (lang, user)).fetchall(), 50)
+        compare('landing grid page (middle)',
+                lambda: conn.execute(OLD_LANDING_SQL, (lang, lang, user, mid, 12)).fetchall(),
+                lambda: pagination.fetch(conn, pagination.LANDING_COURSES_SQL, (lang, user),
+                                         pagination.LANDING_COURSES_KEY, (mid,), 12))
+        compare('course_page course row',
+                lambda: conn.execute(OLD_COURSE_SQL, (mid,)).fetchone(),
+                lambda: conn.execute("""
+                    SELECT c.id, c.image, c.revision, c.updated_at, b.derivatives,
+                           t.title, t.short_desc, t.full_desc
+                    FROM courses c
+                    JOIN course_text t ON t.lang = ? AND t.course_id = c.id
+                    LEFT JOIN media_blobs b ON b.name = c.image
+                    WHERE c.id=?
+                """, (lang, mid)).fetchone())
+
+    # تكلفة الكتابة: trigger يعيد كتابة صف لكل لغة عند تعديل درس
+    ids = [r[0] for r in conn.execute('SELECT id FROM lessons ORDER BY RANDOM() LIMIT 500')]
+
+    def edit(column):
+        times = []
+        for lesson_id in ids:
+            t0 = time.perf_counter()
+            conn.execute(f"UPDATE lessons SET {column} = {column} || '.' WHERE id = ?", (lesson_id,))
+            conn.commit()
+            times.append((time.perf_counter() - t0) * 1000)
+        return statistics.median(times)
+
+    print('write path (UPDATE + commit, p50)')
+    print(f'  lesson video (not projected)       {edit("video"):9.3f} ms')
+    print(f'  lesson title_en (projected)        {edit("title_en"):9.3f} ms')
+
+    conn.close()
+    if webapp._pool is not None:
+        webapp._pool.close_all()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    courses = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    lessons = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    students = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+    main(courses, lessons, students)
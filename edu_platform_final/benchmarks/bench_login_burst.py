@@ -0,0 +1,108 @@
+# موجة تسجيلات دخول مع طلبات عادية متزامنة: إنتاجية الدخول وزمن p99 لبقية الصفحات
+#   python benchmarks/bench_login_burst.py [login_clients] [logins_per_client] [readers] [scrypt_n]
+# "بلا حد": خيوط تجزئة بعدد عملاء الدخول (كأن كل طلب يجزئ في خيطه)
+# "محدود": PASSWORD_HASH_WORKERS الافتراضي (نصف المعالجات) وطابور انتظار
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from common import client_for, make_db, percentile, seed, webapp
+
+import credentials
+
+
+def readers_during(fn, readers, urls, student_ids):
+    """تشغيل fn() بينما readers خيوط تطلب صفحات عادية؛ يعيد (نتيجة fn، أزمنة القراء بالمللي ثانية)."""
+    latencies, done = [], threading.Event()
+    lock = threading.Lock()
+
+    def reader(idx):
+        client, local, i = client_for(student_ids[idx % len(student_ids)]), [], 0
+        while not done.is_set():
+            t0 = time.perf_counter()
+            client.get(urls[(idx + i) % len(urls)])
+            local.append((time.perf_counter() - t0) * 1000)
+            i += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for t in threads:
+        t.start()
+    try:
+        result = fn()
+    finally:
+        done.set()
+        for t in threads:
+            t.join()
+    return result, latencies
+
+
+def login_burst(clients, logins_per_client, emails):
+    codes, times = {}, []
+    lock = threading.Lock()
+
+    def worker(idx):
+        local = []
+        for i in range(logins_per_client):
+            client = webapp.app.test_client()
+            t0 = time.perf_counter()
+            r = client.post('/login', data={'email': emails[(idx + i) % len(emails)], 'password': 'pass'})
+            local.append((time.perf_counter() - t0) * 1000)
+            with lock:
+                codes[r.status_code] = codes.get(r.status_code, 0) + 1
+        with lock:
+            times.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - t0, codes, times
+
+
+def main(login_clients, logins_per_client, readers, scrypt_n):
+    path = make_db(CACHE_BACKEND='none', JOB_WORKERS=0, PASSWORD_SCRYPT_N=scrypt_n, RATE_LIMIT_BACKEND='none')
+    user_ids, course_ids, _ = seed(path, users=50, courses=3, lessons=20)
+    conn = sqlite3.connect(path)
+    stored = credentials.hash_password('pass', scrypt_n)
+    conn.execute('UPDATE users SET password = ?', (stored,))
+    conn.commit()
+    emails = [r[0] for r in conn.execute('SELECT email FROM users')]
+    conn.close()
+    urls = [f'/course/{c}' for c in course_ids]
+    print(f'scrypt n={scrypt_n}, {os.cpu_count()} CPUs, {login_clients} login clients × {logins_per_client}, '
+          f'{readers} readers on /course/<id>')
+
+    _, quiet = readers_during(lambda: time.sleep(3), readers, urls, user_ids)
+    print(f'{"readers alone":<36} p50={percentile(quiet, 50):7.2f}ms  p99={percentile(quiet, 99):7.2f}ms')
+
+    default_workers = max(1, (os.cpu_count() or 2) // 2)
+    for label, workers in (('unbounded (1 per login)', login_clients), ('bounded pool', default_workers)):
+        webapp.app.config['PASSWORD_HASH_WORKERS'] = workers
+        webapp._hasher = None
+        webapp.hasher()
+        (elapsed, codes, times), during = readers_during(
+            lambda: login_burst(login_clients, logins_per_client, emails), readers, urls, user_ids)
+        logins = login_clients * logins_per_client
+        print(f'{label + f" ({workers} workers)":<36} logins {logins / elapsed:6.1f}/s '
+              f'p99={percentile(times, 99):7.1f}ms {dict(sorted(codes.items()))} | '
+              f'readers p50={percentile(during, 50):7.2f}ms  p99={percentile(during, 99):7.2f}ms')
+
+    if webapp._pool is not None:
+        webapp._pool.close_all()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    login_clients = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    logins_per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    readers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    scrypt_n = int(sys.argv[4]) if len(sys.argv) > 4 else credentials.DEFAULT_N
+    main(login_clients, logins_per_client, readers, scrypt_n)
@@ -0,0 +1,62 @@
+# نهاية حصة مباشرة: markers طالب يضغطون "تمت المشاهدة" في نفس اللحظة
+#   python benchmarks/bench_mark_watched.py [markers] [marks_per_marker] [lessons]
+# "قبل": استعلاما الدرس والالتحاق ثم upsert و commit لكل نقرة (PROGRESS_LOOKUP_TTL=0، PROGRESS_FLUSH_INTERVAL=0)
+# "استعلامات محفوظة": نفس commit لكل نقرة مع تذكر الدرس والالتحاق
+# "مجمّع": progress_writer.py يكتب كل ما تجمّع في معاملة واحدة كل PROGRESS_FLUSH_INTERVAL ثانية
+# commits/s = معاملات الكتابة الفعلية؛ بعد كل تشغيل يُتحقق أن كل نقرة وصلت إلى user_progress.
+import os
+import sqlite3
+import sys
+import time
+
+from common import client_for, make_db, report, run_concurrent, seed, webapp
+
+
+def main(markers, marks_per_marker, lessons):
+    path = make_db(CACHE_BACKEND='none', JOB_WORKERS=0, USER_CACHE_BACKEND='memory', RATE_LIMIT_BACKEND='none')
+    user_ids, course_ids, lesson_ids = seed(path, users=markers, courses=1, lessons=lessons)
+    students = [client_for(u) for u in user_ids]
+    conn = sqlite3.connect(path, check_same_thread=False)
+    print(f'{markers} concurrent markers × {marks_per_marker} marks, {lessons} lessons, {os.cpu_count()} CPUs')
+
+    def mark(idx, i):
+        r = students[idx].post(f'/lesson/{lesson_ids[(idx + i) % lessons]}/mark_watched')
+        assert r.status_code == 204, r.status_code
+
+    expected = markers * min(marks_per_marker, lessons)
+    for label, ttl, interval in (('before: lookups + commit per mark', 0, 0),
+                                 ('cached lookups, commit per mark', 60, 0),
+                                 ('cached lookups, batched (50 ms)', 60, 0.05)):
+        conn.execute('DELETE FROM user_progress')
+        conn.execute('UPDATE enrollments SET completed_lessons = 0')
+        conn.commit()
+        webapp.app.config.update(PROGRESS_LOOKUP_TTL=ttl, PROGRESS_FLUSH_INTERVAL=interval)
+        webapp._progress_lookups = None
+        t0 = time.perf_counter()
+        rps, latencies = run_concurrent(mark, markers, marks_per_marker)
+        writer = webapp._progress_writer
+        if interval:
+            writer.stop()
+            webapp._progress_writer = None
+        elapsed = time.perf_counter() - t0
+        rows = conn.execute('SELECT COUNT(*) FROM user_progress').fetchone()[0]
+        # بدون تجميع: commit لكل نقرة نجحت (كل نقرة في التشغيل على درس مختلف)
+        commits = writer.stats()['batches'] if interval else rows
+        counted = conn.execute('SELECT SUM(completed_lessons) FROM enrollments').fetchone()[0]
+        report(label, rps, latencies)
+        print(f'{"":<40} {commits / elapsed:9.1f} commits/s   rows {rows}/{expected}   '
+              f'counters {"ok" if counted == expected else counted}')
+
+    conn.close()
+    if webapp._pool is not None:
+        webapp._pool.close_all()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    markers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    marks_per_marker = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    lessons = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    main(markers, marks_per_marker, lessons)
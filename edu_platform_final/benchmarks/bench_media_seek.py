@@ -0,0 +1,63 @@
+# قياس عدة "مشاهدين" يقفزون في فيديو كبير عبر خادم HTTP حقيقي (werkzeug متعدد الخيوط)
+#   python benchmarks/bench_media_seek.py [clients] [seeks_per_client] [file_mb]
+import http.client
+import os
+import random
+import sys
+import tempfile
+import threading
+
+from common import report, run_concurrent, webapp
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+WINDOW = 1024 * 1024  # ما يطلبه المتصفح تقريباً بعد كل قفزة
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def main(clients, seeks, file_mb):
+    upload_dir = tempfile.mkdtemp(prefix='bench-media-')
+    name = 'lesson-0123456789abcdef.mp4'
+    size = file_mb * 1024 * 1024
+    with open(os.path.join(upload_dir, name), 'wb') as fh:
+        fh.truncate(size)  # ملف متناثر: كبير دون الكتابة على القرص
+    webapp.app.config.update(UPLOAD_FOLDER=upload_dir, MEDIA_OFFLOAD='none')
+
+    server = make_server('127.0.0.1', 0, webapp.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_port
+    conns = [http.client.HTTPConnection('127.0.0.1', port) for _ in range(clients)]
+    transferred = [0] * clients
+
+    def fetch(c, headers):
+        conns[c].request('GET', f'/uploads/{name}', headers=headers)
+        r = conns[c].getresponse()
+        transferred[c] += len(r.read())
+        return r.status
+
+    print(f'--- {clients} clients x {seeks} seeks, {file_mb} MB file ---')
+    rng = random.Random(1)
+    rps, lat = run_concurrent(
+        lambda c, i: fetch(c, {'Range': f'bytes={(s := rng.randrange(size - WINDOW))}-{s + WINDOW - 1}'}),
+        clients, seeks)
+    report('seek: Range 1MB window (206)', rps, lat)
+    print(f'  transferred {sum(transferred) / 2**20:.1f} MB')
+
+    transferred[:] = [0] * clients
+    rps, lat = run_concurrent(lambda c, i: fetch(c, {}), clients, max(1, seeks // 20))
+    report('seek without Range: full file (200)', rps, lat)
+    print(f'  transferred {sum(transferred) / 2**20:.1f} MB')
+
+    server.shutdown()
+    os.remove(os.path.join(upload_dir, name))
+    os.rmdir(upload_dir)
+
+
+if __name__ == '__main__':
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    seeks = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    file_mb = int(sys.argv[3]) if len(sys.argv) > 3 else 256
+    main(clients, seeks, file_mb)
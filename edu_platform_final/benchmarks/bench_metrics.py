@@ -0,0 +1,52 @@
+# كلفة القياس: نفس الحمل بدون metrics.py ثم مع قياس SQL والقوالب ثم مع محلل العينات أيضاً
+#   python benchmarks/bench_metrics.py [clients] [requests_per_client]
+# في النهاية ملخص /admin/metrics كما يراه المدير (الأزمنة لكل مسار وأثقل العبارات).
+import os
+import shutil
+import sys
+import tempfile
+
+from common import client_for, make_db, report, run_concurrent, seed, webapp
+
+
+def main(clients, requests_per_client):
+    path = make_db(CACHE_BACKEND='none', JOB_WORKERS=0)
+    user_ids, course_ids, lesson_ids = seed(path, users=clients + 1, courses=5, lessons=20)
+    profile_dir = tempfile.mkdtemp(prefix='bench-profiles-')
+    webapp.app.config['PROFILE_DIR'] = profile_dir
+    students = [client_for(u) for u in user_ids[1:]]
+    urls = ['/', '/profile'] + [f'/course/{c}' for c in course_ids] + [f'/lesson/{l}' for l in lesson_ids[:10]]
+    print(f'{clients} clients × {requests_per_client} requests over {len(urls)} pages')
+
+    def browse(idx, i):
+        assert students[idx].get(urls[(idx + i) % len(urls)]).status_code == 200
+
+    # محلل العينات يعمل طوال كل طلب؛ الحد المرتفع يمنع كتابة الملفات فيُقاس أخذ العينات وحده
+    for label, enabled, slow_ms in (('metrics off', False, 0), ('METRICS_ENABLED=1', True, 0),
+                                    ('+ sampler (5 ms)', True, 10 ** 6)):
+        webapp.app.config.update(METRICS_ENABLED=enabled, PROFILE_SLOW_MS=slow_ms)
+        webapp._metrics.reset()
+        run_concurrent(browse, clients, 20)
+        report(label, *run_concurrent(browse, clients, requests_per_client))
+
+    snapshot = webapp._metrics.snapshot(top=5)
+    print(f'\n{"route":<36} {"p50 ms":>8} {"p99 ms":>8} {"db p50":>8} {"render p50":>11} {"queries":>8}')
+    for route, stats in snapshot['routes'].items():
+        print(f'{route:<36} {stats["total_ms"]["p50"]:8.2f} {stats["total_ms"]["p99"]:8.2f} '
+              f'{stats["db_ms"]["p50"]:8.2f} {stats["render_ms"]["p50"]:11.2f} {stats["queries"]["p50"]:8}')
+    print('\nheaviest statements:')
+    for st in snapshot['statements']:
+        print(f'  {st["calls"]:6} calls {st["total_ms"]:9.1f} ms  {st["sql"][:80]}')
+
+    if webapp._pool is not None:
+        webapp._pool.close_all()
+    shutil.rmtree(profile_dir, ignore_errors=True)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    requests_per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    main(clients, requests_per_client)
@@ -0,0 +1,108 @@
+# قياس وزن صور الصفحة الرئيسية قبل وبعد مشتقات الصور (images.py)
+#   python benchmarks/bench_page_weight.py [viewport_px] [dpr]
+# تُستخدم صور instance/uploads الحقيقية كصور للدورات والشرائح، ويُحاكى اختيار المتصفح
+# من srcset/sizes: أول <source> بصيغة مدعومة، وأصغر عرض يغطي عرض الخانة × DPR.
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+from common import BASE_DIR, client_for, make_db, webapp
+
+import images
+
+PICTURE_RE = re.compile(r'<picture\b.*?</picture>', re.S)
+ATTR_RE = re.compile(r'(\w+)="([^"]*)"')
+
+
+def slot_width(sizes, viewport):
+    """تقييم مبسط لـ sizes: (min-width: Npx) X, ..., X الافتراضي — X بالـ px أو vw."""
+    for part in sizes.split(','):
+        part = part.strip()
+        m = re.match(r'\(min-width:\s*(\d+)px\)\s*(.+)', part)
+        if m and viewport < int(m.group(1)):
+            continue
+        value = m.group(2) if m else part
+        return float(value[:-2]) * viewport / 100 if value.endswith('vw') else float(value[:-2])
+    return viewport
+
+
+def pick(picture, viewport, dpr, accept):
+    """الرابط الذي سيحمّله متصفح يدعم الصيغ accept لعنصر <picture>."""
+    tags = re.findall(r'<(source|img)\b([^>]*)>', picture)
+    for tag, attrs in tags:
+        attrs = dict(ATTR_RE.findall(attrs))
+        if tag == 'source' and attrs.get('type') not in accept:
+            continue
+        if 'srcset' not in attrs:
+            return attrs['src']
+        need = slot_width(attrs.get('sizes', '100vw'), viewport) * dpr
+        candidates = sorted((int(w[:-1]), url) for url, w in
+                            (c.strip().split(' ') for c in attrs['srcset'].split(',')))
+        return next((url for w, url in candidates if w >= need), candidates[-1][1])
+    return None
+
+
+def page_weight(client, viewport, dpr, accept):
+    html = client.get('/?lang=en').get_data(as_text=True)
+    total, count = 0, 0
+    for picture in PICTURE_RE.findall(html):
+        url = pick(picture, viewport, dpr, accept)
+        if url and url.startswith('/uploads/'):
+            total += len(client.get(url).data)
+            count += 1
+    return total, count
+
+
+def main(viewport, dpr):
+    source_dir = os.path.join(BASE_DIR, 'instance', 'uploads')
+    originals = sorted(f for f in os.listdir(source_dir) if os.path.isfile(os.path.join(source_dir, f)))
+    upload_dir = tempfile.mkdtemp(prefix='bench-uploads-')
+    path = make_db(UPLOAD_FOLDER=upload_dir, JOB_WORKERS=0, CACHE_BACKEND='none')
+    webapp._pool = None
+    webapp._page_cache = None
+
+    # الصور كملفات في المخزن دون مشتقات (حالة ما قبل images.py)
+    conn = sqlite3.connect(path)
+    names = []
+    for f in originals:
+        tmp = os.path.join(upload_dir, f)
+        shutil.copy(os.path.join(source_dir, f), tmp)
+        names.append(webapp.media.store_file(conn, upload_dir, tmp, f))
+    for i, name in enumerate(names):
+        conn.execute('INSERT INTO courses (title_ar, title_en, image) VALUES (?, ?, ?)',
+                     (f'دورة {i}', f'Course {i}', name))
+        conn.execute('INSERT INTO hero_slides (image_path, title_ar, title_en) VALUES (?, ?, ?)',
+                     (name, f'شريحة {i}', f'Slide {i}'))
+    conn.commit()
+
+    client = client_for()
+    before, count = page_weight(client, viewport, dpr, {'image/jpeg'})
+    t0 = time.perf_counter()
+    done = images.backfill(conn, upload_dir, workers=os.cpu_count() or 2)
+    elapsed = time.perf_counter() - t0
+    print(f'viewport={viewport}px dpr={dpr}  {count} images on the landing page')
+    print(f'  backfill: {done} images in {elapsed:.2f}s ({", ".join(images.available_formats())})')
+    print(f'{"originals":<28} {before / 1024:9.1f} KB')
+    for label, accept in (('jpeg fallback', {'image/jpeg'}),
+                          ('webp', {'image/webp', 'image/jpeg'}),
+                          ('avif', {'image/avif', 'image/webp', 'image/jpeg'})):
+        after, _ = page_weight(client, viewport, dpr, accept)
+        print(f'{label:<28} {after / 1024:9.1f} KB   ({100 * (1 - after / before):5.1f}% smaller)')
+
+    conn.close()
+    if webapp._pool is not None:
+        webapp._pool.close_all()
+    shutil.rmtree(upload_dir, ignore_errors=True)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    viewport = int(sys.argv[1]) if len(sys.argv) > 1 else 390
+    dpr = float(sys.argv[2]) if len(sys.argv) > 2 else 2
+    main(viewport, dpr)
@@ -0,0 +1,77 @@
+# مقارنة /profile القديم (استعلام لكل دورة) مع progress.profile_tree (استعلامان)
+#   python benchmarks/bench_profile.py [iterations]
+import os
+import sqlite3
+import sys
+import time
+
+from common import make_db, seed, webapp
+
+import progress
+
+
+def legacy_profile(conn, user_id, lang):
+    # نسخة من منطق profile() قبل التعديل (N+1)
+    enrolled_courses = conn.execute('''
+        SELECT c.id,
+               CASE WHEN ?='en' THEN c.title_en ELSE c.title_ar END AS title,
+               c.image,
+               CASE WHEN ?='en' THEN c.short_desc_en ELSE c.short_desc_ar END AS short_desc
+        FROM enrollments e
+        JOIN courses c ON e.course_id = c.id
+        WHERE e.user_id = ? AND e.approved = 1
+    ''', (lang, lang, user_id)).fetchall()
+    result = []
+    for course in enrolled_courses:
+        lessons = conn.execute('''
+             SELECT l.id,
+                    CASE WHEN ?='en' THEN l.title_en ELSE l.title_ar END AS title,
+                    up.completed
+             FROM lessons l
+             LEFT JOIN user_progress up ON up.lesson_id = l.id AND up.user_id = ?
+             WHERE l.course_id = ?
+             ORDER BY l.position ASC
+          ''', (lang, user_id, course['id'])).fetchall()
+        result.append({'course': course, 'lessons': lessons})
+    return result
+
+
+class CountingConnection(sqlite3.Connection):
+    statements = 0
+
+    def execute(self, *args, **kwargs):
+        CountingConnection.statements += 1
+        return super().execute(*args, **kwargs)
+
+
+def timed(fn, conn, user_id, iterations):
+    CountingConnection.statements = 0
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        fn(conn, user_id, 'ar')
+    ms = (time.perf_counter() - t0) * 1000 / iterations
+    return ms, CountingConnection.statements // iterations
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    path = make_db()
+    # مستخدم واحد لكل حجم؛ نسجله في أول N دورة فقط
+    user_ids, course_ids, lesson_ids = seed(path, users=3, courses=100, lessons=20, enroll=False)
+    conn = sqlite3.connect(path, factory=CountingConnection)
+    conn.row_factory = sqlite3.Row
+    for user_id, n in zip(user_ids, (1, 10, 100)):
+        conn.executemany('INSERT INTO enrollments (user_id, course_id, approved) VALUES (?, ?, 1)',
+                         [(user_id, c) for c in course_ids[:n]])
+        # نصف الدروس مكتملة
+        conn.executemany('INSERT INTO user_progress (user_id, lesson_id, completed) VALUES (?, ?, 1)',
+                         [(user_id, l) for l in lesson_ids[:n * 20:2]])
+    conn.commit()
+
+    print(f'{"enrollments":>11} {"legacy ms":>10} {"queries":>8} {"batched ms":>11} {"queries":>8}')
+    for user_id, n in zip(user_ids, (1, 10, 100)):
+        old_ms, old_q = timed(legacy_profile, conn, user_id, iterations)
+        new_ms, new_q = timed(progress.profile_tree, conn, user_id, iterations)
+        print(f'{n:>11} {old_ms:>10.2f} {old_q:>8} {new_ms:>11.2f} {new_q:>8}')
+    conn.close()
+    os.remove(path)
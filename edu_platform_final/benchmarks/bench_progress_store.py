@@ -0,0 +1,88 @@
+# مقارنة مخزن التقدم بالصفوف (user_progress) مع مخزن البتات (progress_bitsets)
+#   python benchmarks/bench_progress_store.py [users] [lessons]
+# الافتراضي: 10k مستخدم × 200 درس، كل مستخدم أكمل عدداً عشوائياً من الدروس
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+import common  # noqa: F401  (يضيف مجلد المشروع إلى sys.path)
+
+import migrations
+import progress
+
+
+def table_bytes(conn, *names):
+    # حجم الجداول وفهارسها على القرص عبر dbstat
+    placeholders = ','.join('?' * len(names))
+    return conn.execute(f"""
+        SELECT COALESCE(SUM(pgsize), 0) FROM dbstat
+        WHERE name IN ({placeholders})
+           OR name IN (SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name IN ({placeholders}))
+    """, names + names).fetchone()[0]
+
+
+def build(path, users, lessons, seed=42):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    progress.register_functions(conn)
+    migrations.migrate(conn)
+    conn.execute("INSERT INTO courses (id, title_ar, title_en) VALUES (1, 'دورة', 'Course')")
+    conn.executemany('INSERT INTO lessons (course_id, title_ar, title_en, position) VALUES (1, ?, ?, ?)',
+                     [(f'درس {i}', f'Lesson {i}', i) for i in range(lessons)])
+    conn.executemany("INSERT INTO users (id, username, password) VALUES (?, ?, 'x')",
+                     [(u, f'user{u}') for u in range(1, users + 1)])
+    conn.executemany('INSERT INTO enrollments (user_id, course_id, approved) VALUES (?, 1, 1)',
+                     [(u,) for u in range(1, users + 1)])
+    lesson_ids = [r[0] for r in conn.execute('SELECT id FROM lessons ORDER BY position')]
+    rnd = random.Random(seed)
+    rows = []
+    for u in range(1, users + 1):
+        done = rnd.randint(0, lessons)
+        rows.extend((u, lid) for lid in lesson_ids[:done])
+    conn.executemany('INSERT INTO user_progress (user_id, lesson_id, completed) VALUES (?, ?, 1)', rows)
+    t0 = time.perf_counter()
+    progress.migrate_rows_to_bitsets(conn)
+    convert_s = time.perf_counter() - t0
+    conn.commit()
+    return conn, lesson_ids, len(rows), convert_s
+
+
+def time_ops(conn, store, users, lesson_ids, n=2000, seed=7):
+    rnd = random.Random(seed)
+    samples = [(rnd.randint(1, users), rnd.choice(lesson_ids)) for _ in range(n)]
+    t0 = time.perf_counter()
+    for u, lid in samples:
+        store.mark_completed(conn, u, lid, 1)
+    conn.commit()
+    write_us = (time.perf_counter() - t0) * 1e6 / n
+    t0 = time.perf_counter()
+    for u, _ in samples[:500]:
+        store.course_lessons(conn, u, 1, 'ar')
+    read_us = (time.perf_counter() - t0) * 1e6 / 500
+    t0 = time.perf_counter()
+    for u, _ in samples[:500]:
+        store.resume_lesson(conn, u, 1)
+    resume_us = (time.perf_counter() - t0) * 1e6 / 500
+    return write_us, read_us, resume_us
+
+
+if __name__ == '__main__':
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    lessons = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    path = os.path.join(tempfile.gettempdir(), f'bench-progress-{os.getpid()}.sqlite')
+    print(f'building {users} users × {lessons} lessons ...')
+    conn, lesson_ids, row_count, convert_s = build(path, users, lessons)
+    rows_bytes = table_bytes(conn, 'user_progress')
+    bits_bytes = table_bytes(conn, 'progress_bitsets')
+    print(f'completed lessons: {row_count:,}  (row → bitset conversion {convert_s:.2f}s)')
+    print(f'{"store":<8} {"on-disk bytes":>14} {"bytes/user":>11} {"mark µs":>9} {"course µs":>10} {"resume µs":>10}')
+    for name, size in (('rows', rows_bytes), ('bitset', bits_bytes)):
+        w, r, res = time_ops(conn, progress.get_store(name), users, lesson_ids)
+        print(f'{name:<8} {size:>14,} {size / users:>11.1f} {w:>9.1f} {r:>10.1f} {res:>10.1f}')
+    conn.close()
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
@@ -0,0 +1,119 @@
+# هجوم تخمين كلمات مرور على /login مع زوار عاديين متزامنين: تحديد المعدل معطل ثم memory ثم sqlite
+#   python benchmarks/bench_rate_limit.py [attack_rate] [attacker_ips] [readers] [seconds] [warmup]
+# المهاجم: attack_rate محاولة/ثانية بمعدل ثابت لا ينتظر الردود (كمهاجم حقيقي عبر الشبكة)،
+#   POST /login ببريد وكلمة مرور عشوائيين من attacker_ips عنواناً (كل محاولة بلا حد = تجزئة scrypt).
+# الزوار: خيوط تسجل الدخول مرة بكلمة مرور صحيحة ثم تطلب /course/<id>، كلٌّ من عنوانه.
+# القياس يبدأ بعد warmup ثانية من الهجوم (استنفدت دلاء المهاجم سعتها: الحالة المستقرة لهجوم مستمر).
+# المقارنة: p50/p99 للزوار ونتائج دخول الطالب ونسبة محاولات المهاجم المرفوضة بـ 429.
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from common import client_for, make_db, percentile, seed, webapp
+
+import credentials
+
+ATTACK_THREADS = 16
+
+
+def attack(seconds, warmup, attack_rate, attacker_ips, readers, urls, user_ids, emails):
+    """يعيد (أزمنة الزوار، رموز دخولهم، رموز المهاجم، عدد محاولاته) خلال فترة القياس."""
+    measuring, done = threading.Event(), threading.Event()
+    lock = threading.Lock()
+    latencies, login_codes, attack_codes = [], {}, {}
+
+    def count(codes, code):
+        if measuring.is_set():
+            with lock:
+                codes[code] = codes.get(code, 0) + 1
+
+    def reader(idx):
+        client, local, i = client_for(user_ids[idx % len(user_ids)]), [], 0
+        env = {'REMOTE_ADDR': f'192.168.0.{idx + 1}'}
+        measuring.wait()
+        r = webapp.app.test_client().post('/login', data={'email': emails[idx % len(emails)], 'password': 'pass'},
+                                          environ_base=env)
+        count(login_codes, r.status_code)
+        while not done.is_set():
+            t0 = time.perf_counter()
+            client.get(urls[(idx + i) % len(urls)], environ_base=env)
+            local.append((time.perf_counter() - t0) * 1000)
+            i += 1
+        with lock:
+            latencies.extend(local)
+
+    def attacker(idx):
+        rnd = random.Random(idx)
+        client = webapp.app.test_client()
+        interval = ATTACK_THREADS / attack_rate
+        next_at = time.perf_counter() + rnd.random() * interval
+        while not done.is_set():
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            next_at = max(next_at + interval, time.perf_counter() - interval)
+            n = rnd.randrange(attacker_ips)
+            env = {'REMOTE_ADDR': f'10.0.{n // 250}.{n % 250 + 1}'}
+            r = client.post('/login', data={'email': f'victim{rnd.randrange(10 ** 6)}@example.com',
+                                            'password': f'guess{rnd.randrange(10 ** 6)}'}, environ_base=env)
+            count(attack_codes, r.status_code)
+
+    threads = ([threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+               + [threading.Thread(target=attacker, args=(i,)) for i in range(ATTACK_THREADS if attack_rate else 0)])
+    for t in threads:
+        t.start()
+    time.sleep(warmup if attack_rate else 0)
+    measuring.set()
+    time.sleep(seconds)
+    done.set()
+    for t in threads:
+        t.join()
+    return latencies, login_codes, attack_codes, sum(attack_codes.values())
+
+
+def main(attack_rate, attacker_ips, readers, seconds, warmup):
+    path = make_db(CACHE_BACKEND='none', JOB_WORKERS=0)
+    user_ids, course_ids, _ = seed(path, users=20, courses=3, lessons=20)
+    conn = sqlite3.connect(path)
+    conn.execute('UPDATE users SET password = ?', (credentials.hash_password('pass'),))
+    conn.commit()
+    emails = [r[0] for r in conn.execute('SELECT email FROM users ORDER BY id')]
+    conn.close()
+    urls = [f'/course/{c}' for c in course_ids]
+    limits_db = tempfile.mktemp(suffix='.sqlite', prefix='bench-ratelimit-')
+    print(f'{os.cpu_count()} CPUs, attack {attack_rate}/s from {attacker_ips} IPs, {readers} readers, {seconds}s per run after {warmup}s of attack, '
+          f'login limit "{webapp.app.config["RATE_LIMITS"]["login"]}"')
+
+    for label, backend, rate in (('no attack', 'none', 0), ('attack, limiter off', 'none', attack_rate),
+                                 ('attack, memory store', 'memory', attack_rate),
+                                 ('attack, sqlite store', 'sqlite', attack_rate)):
+        webapp.app.config.update(RATE_LIMIT_BACKEND=backend, RATE_LIMIT_DB=limits_db)
+        webapp._rate_store = None
+        webapp._hasher = None
+        latencies, login_codes, attack_codes, tries = attack(
+            seconds, warmup, rate, attacker_ips, readers, urls, user_ids, emails)
+        limited = attack_codes.get(429, 0) / tries * 100 if tries else 0
+        print(f'{label:<22} readers p50={percentile(latencies, 50):7.2f}ms p99={percentile(latencies, 99):7.2f}ms '
+              f'| logins {dict(sorted(login_codes.items()))} '
+              f'| attacker {tries / seconds:6.0f}/s {dict(sorted(attack_codes.items()))} ({limited:.0f}% 429) '
+              f'| buckets {webapp.rate_store().stats()["keys"]}')
+
+    if webapp._pool is not None:
+        webapp._pool.close_all()
+    for p in (path, limits_db):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(p + suffix):
+                os.remove(p + suffix)
+
+
+if __name__ == '__main__':
+    attack_rate = float(sys.argv[1]) if len(sys.argv) > 1 else 50
+    attacker_ips = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    readers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    seconds = float(sys.argv[4]) if len(sys.argv) > 4 else 5
+    warmup = float(sys.argv[5]) if len(sys.argv) > 5 else 15
+    main(attack_rate, attacker_ips, readers, seconds, warmup)
@@ -0,0 +1,131 @@
+# قياس البحث النصي (search.py) على فهرس كبير مقابل المسح بـ LIKE
+#   python benchmarks/bench_search.py [courses] [lessons_per_course]
+# الافتراضي 1000 دورة × 100 درس = 100k درس بمحتوى عربي/إنجليزي اصطناعي (مصطلحات + حشو)،
+# والاستعلامات مكتوبة بصيغ مختلفة عن المخزّن (همزات، ة/ه، ى/ي، تشكيل، "ال") ليتحقق التطبيع.
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+
+from common import make_db, webapp
+
+import search
+
+AR_WORDS = ['مدرسة', 'الكتاب', 'أساسيات', 'البرمجة', 'إدارة', 'المشاريع', 'التصميم', 'مستشفى',
+            'الرياضيات', 'الفيزياء', 'اللغة', 'العربية', 'تحليل', 'البيانات', 'الشبكات', 'الأمن',
+            'السيبراني', 'المحاسبة', 'التسويق', 'الرقمي', 'قواعد', 'الإحصاء', 'التفاضل', 'الكيمياء']
+EN_WORDS = ['introduction', 'python', 'database', 'design', 'network', 'security', 'marketing',
+            'statistics', 'algebra', 'physics', 'chemistry', 'accounting', 'analysis', 'project',
+            'management', 'fundamentals', 'advanced', 'workshop', 'practice', 'review']
+# صيغ كتابة تختلف عن المخزّن: ه/ة، ي/ى، ا/أ/إ، تشكيل، بدون "ال"، وبادئات
+QUERIES = ['python', 'مدرسه', 'اساسيات البرمجه', 'security analysis', 'ادارة المشاريع',
+           'مستشفي', 'امن سيبراني', 'manag', 'إحصا', 'chemistry workshop']
+
+
+def vocabulary(rng, letters, size):
+    """كلمات حشو مصطنعة (3-8 أحرف) حتى لا يطابق كل مصطلح معظم المستندات."""
+    return [''.join(rng.choice(letters) for _ in range(rng.randint(3, 8))) for _ in range(size)]
+
+
+def text(rng, topics, filler, n, topic_share=0.05):
+    return ' '.join(rng.choice(topics) if rng.random() < topic_share else rng.choice(filler)
+                    for _ in range(n))
+
+
+def populate(path, courses, lessons, seed=1):
+    rng = random.Random(seed)
+    ar, en = vocabulary(rng, 'ابتثجحخدذرزسشصضطظعغفقكلمنهوي', 5000), vocabulary(rng, 'abcdefghiklmnoprstuvwy', 5000)
+    conn = sqlite3.connect(path)
+    for c in range(courses):
+        cur = conn.execute(
+            'INSERT INTO courses (title_ar, title_en, short_desc_ar, short_desc_en, full_desc_ar, full_desc_en) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (text(rng, AR_WORDS, ar, 3, 1), text(rng, EN_WORDS, en, 3, 1),
+             text(rng, AR_WORDS, ar, 8), text(rng, EN_WORDS, en, 8),
+             f'<p>{text(rng, AR_WORDS, ar, 40)}</p>', f'<p>{text(rng, EN_WORDS, en, 40)}</p>'))
+        course_id = cur.lastrowid
+        conn.executemany(
+            'INSERT INTO lessons (course_id, title_ar, title_en, content_ar, content_en, position) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            [(course_id, text(rng, AR_WORDS, ar, 4, 0.5), text(rng, EN_WORDS, en, 4, 0.5),
+              f'<p>{text(rng, AR_WORDS, ar, 60)}</p>', f'<p>{text(rng, EN_WORDS, en, 60)}</p>', p)
+             for p in range(lessons)])
+    conn.commit()
+    return conn
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def latency(label, fn, rounds):
+    times = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    print(f'  {label:<34} p50 {statistics.median(times):8.2f} ms   p99 {percentile(times, 0.99):8.2f} ms')
+
+
+def like_scan(conn, query):
+    """البديل بلا فهرس: LIKE على كل الأعمدة (بدون تطبيع؛ يفوّت صيغ الكتابة المختلفة)."""
+    pattern = f'%{query}%'
+    return conn.execute("""
+        SELECT id FROM lessons
+        WHERE title_ar LIKE ? OR title_en LIKE ? OR content_ar LIKE ? OR content_en LIKE ?
+        LIMIT 20
+    """, (pattern,) * 4).fetchall()
+
+
+def main(courses, lessons):
+    path = make_db(JOB_WORKERS=0)
+    print(f'{courses} courses × {lessons} lessons = {courses * lessons} lessons')
+    t0 = time.perf_counter()
+    conn = populate(path, courses, lessons)
+    conn.row_factory = sqlite3.Row
+    print(f'  populate                           {time.perf_counter() - t0:8.2f} s')
+
+    t0 = time.perf_counter()
+    with conn:
+        search.rebuild(conn)
+    docs = conn.execute('SELECT COUNT(*) FROM search_index').fetchone()[0]
+    print(f'  rebuild ({docs} documents)      {time.perf_counter() - t0:8.2f} s')
+
+    print('queries (first page, BM25):')
+    for q in QUERIES:
+        _, total = search.search(conn, q, 'ar')
+        latency(f'{q!r} → {total}', lambda: search.search(conn, q, 'ar'), 30)
+    latency("deep page 50 of 'python'", lambda: search.search(conn, 'python', 'en', page=50), 30)
+
+    print('LIKE scan without the index:')
+    for q in ('python', 'مدرسه'):
+        latency(f'{q!r} → {len(like_scan(conn, q))} (limit 20)', lambda: like_scan(conn, q), 5)
+
+    # تحديث تدريجي كما في مسار تعديل الدرس
+    lesson_ids = [r[0] for r in conn.execute('SELECT id FROM lessons ORDER BY RANDOM() LIMIT 200')]
+    times = []
+    for lesson_id in lesson_ids:
+        t0 = time.perf_counter()
+        conn.execute("UPDATE lessons SET content_en = content_en || ' zebrafish' WHERE id = ?", (lesson_id,))
+        search.index_lesson(conn, lesson_id)
+        conn.commit()
+        times.append((time.perf_counter() - t0) * 1000)
+    _, found = search.search(conn, 'zebrafish')
+    print(f'incremental lesson update + commit     p50 {statistics.median(times):8.2f} ms   '
+          f'p99 {percentile(times, 0.99):8.2f} ms   ({found}/{len(lesson_ids)} findable)')
+
+    conn.close()
+    if webapp._pool is not None:
+        webapp._pool.close_all()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    courses = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    lessons = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    main(courses, lessons)
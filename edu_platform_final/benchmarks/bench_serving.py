@@ -0,0 +1,227 @@
+# خادم التطوير (app.run) مقابل gunicorn (wsgi.py + gunicorn.conf.py) على نفس القاعدة المولدة
+#   python benchmarks/bench_serving.py [clients] [seconds] [workers] [threads]
+# كل خادم عملية مستقلة؛ العملاء خيوط هنا باتصالات keep-alive (يُعاد الاتصال إن أغلقه الخادم).
+# الحمل: 70% صفحة الهبوط بلا جلسة، 30% صفحة دورة لطالب مسجل الدخول.
+# ثم مع gunicorn: بث فيديو بطيء + HUP أثناءه؛ يجب أن يكتمل البث وألا يفشل أي طلب أثناء الاستبدال.
+import http.client
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+from common import BASE_DIR, report
+
+VIDEO_MB = 32
+STREAM_SECONDS = 6
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class Client:
+    """اتصال keep-alive واحد مع كوكيز الجلسة."""
+
+    def __init__(self, port):
+        self.port = port
+        self.conn = None
+        self.cookie = None
+        self.connects = 0
+
+    def request(self, method, url, body=None, headers=None):
+        headers = dict(headers or {})
+        if body is not None:
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        for attempt in (0, 1):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+                self.connects += 1
+            try:
+                self.conn.request(method, url, body=body, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+            except (ConnectionError, http.client.HTTPException):
+                # اتصال keep-alive أغلقه الخادم بين طلبين: أعد المحاولة مرة على اتصال جديد
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+                continue
+            cookie = response.getheader('Set-Cookie')
+            if cookie:
+                self.cookie = cookie.split(';', 1)[0]
+            if response.will_close:
+                self.conn.close()
+                self.conn = None
+            return response.status, data
+
+    def login(self, email):
+        status, _ = self.request('POST', '/login', urllib.parse.urlencode({'email': email, 'password': 'pass'}))
+        assert status == 302, status
+
+
+def start_server(kind, port, env, workers, threads):
+    if kind == 'dev':
+        cmd = [sys.executable, '-c',
+               f'import app; app.app.run(host="127.0.0.1", port={port}, threaded=True)']
+    else:
+        cmd = [sys.executable, 'wsgi.py', '--bind', f'127.0.0.1:{port}',
+               '--workers', str(workers), '--threads', str(threads)]
+    proc = subprocess.Popen(cmd, cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if Client(port).request('GET', '/readyz')[0] == 200:
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f'{kind} server did not become ready')
+
+
+def worker_pids(port, probes=40):
+    # اتصال جديد لكل فحص حتى تتوزع على العمال
+    pids = set()
+    for _ in range(probes):
+        client = Client(port)
+        pids.add(json.loads(client.request('GET', '/readyz')[1])['pid'])
+    return pids
+
+
+def load(port, students, clients, seconds, errors):
+    """حمل مغلق لمدة seconds؛ يعيد (req/s, latencies, connections)."""
+    conn = sqlite3.connect(students['db'])
+    courses = {}
+    for user_id, course_id in conn.execute('SELECT user_id, course_id FROM enrollments WHERE approved = 1'):
+        courses.setdefault(user_id, []).append(course_id)
+    conn.close()
+    sessions = []
+    for idx in range(clients):
+        user_id = students['ids'][idx % len(students['ids'])]
+        client = Client(port)
+        client.login(f'user{user_id}@example.com')
+        sessions.append((client, Client(port), courses[user_id]))
+    latencies, lock = [], threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(idx):
+        rnd = random.Random(idx)
+        student, anonymous, course_ids = sessions[idx]
+        local = []
+        while time.perf_counter() < deadline:
+            if rnd.random() < 0.7:
+                client, url = anonymous, '/'
+            else:
+                client, url = student, f'/course/{rnd.choice(course_ids)}'
+            t0 = time.perf_counter()
+            try:
+                status, _ = client.request('GET', url)
+            except OSError:
+                status = 'error'
+            local.append((time.perf_counter() - t0) * 1000)
+            if status != 200:
+                errors.append(status)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    connections = sum(s.connects + a.connects for s, a, _ in sessions)
+    return len(latencies) / elapsed, latencies, connections
+
+
+def stream_video(port, result):
+    """بث الفيديو بمعدل ثابت (مشاهد حقيقي) مع عدّ البايتات المستلمة."""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    conn.request('GET', '/uploads/lesson.mp4')
+    response = conn.getresponse()
+    expected = int(response.getheader('Content-Length'))
+    received, chunk = 0, 256 * 1024
+    delay = STREAM_SECONDS / (expected / chunk)
+    try:
+        while True:
+            data = response.read(chunk)
+            if not data:
+                break
+            received += len(data)
+            time.sleep(delay)
+    except (OSError, http.client.HTTPException) as e:
+        result['error'] = repr(e)
+    conn.close()
+    result.update(status=response.status, received=received, expected=expected)
+
+
+def main(clients, seconds, workers, threads):
+    workdir = tempfile.mkdtemp(prefix='bench-serving-')
+    db = os.path.join(workdir, 'db.sqlite')
+    subprocess.run([sys.executable, 'datagen.py', '--scale', 'small', db], cwd=BASE_DIR, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    uploads = os.path.join(workdir, 'uploads')
+    os.makedirs(uploads)
+    with open(os.path.join(uploads, 'lesson.mp4'), 'wb') as f:
+        f.write(os.urandom(VIDEO_MB * 1024 * 1024))
+    conn = sqlite3.connect(db)
+    ids = [r[0] for r in conn.execute('SELECT DISTINCT user_id FROM enrollments WHERE approved = 1 '
+                                      'ORDER BY user_id LIMIT ?', (clients,))]
+    conn.close()
+    students = {'db': db, 'ids': ids}
+    env = dict(os.environ, DATABASE=db, UPLOAD_FOLDER=uploads, RATE_LIMIT_BACKEND='none', JOB_WORKERS='0')
+    print(f'{clients} keep-alive clients × {seconds}s, {os.cpu_count()} CPUs; '
+          f'gunicorn: {workers} workers × {threads} threads')
+
+    for kind in ('dev', 'gunicorn'):
+        port = free_port()
+        proc = start_server(kind, port, env, workers, threads)
+        try:
+            errors = []
+            load(port, students, clients, 2, errors)  # تسخين
+            errors.clear()
+            rps, latencies, connections = load(port, students, clients, seconds, errors)
+            report('dev server (app.run)' if kind == 'dev' else 'gunicorn (wsgi.py)', rps, latencies)
+            print(f'{"":<40} {connections} TCP connections for {len(latencies)} requests, '
+                  f'{len(errors)} errors')
+
+            if kind == 'gunicorn':
+                before = worker_pids(port)
+                result, errors = {}, []
+                streamer = threading.Thread(target=stream_video, args=(port, result))
+                streamer.start()
+                time.sleep(1)
+                os.kill(proc.pid, signal.SIGHUP)
+                rps, latencies, _ = load(port, students, clients, STREAM_SECONDS, errors)
+                streamer.join()
+                report('gunicorn during HUP reload', rps, latencies)
+                print(f'{"":<40} {len(errors)} failed requests; video {result["status"]} '
+                      f'{result["received"]}/{result["expected"]} bytes {result.get("error", "complete")}')
+                after = worker_pids(port)
+                print(f'{"":<40} workers {sorted(before)} → {sorted(after)}')
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=180)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else max(2, os.cpu_count() or 1)
+    threads = int(sys.argv[4]) if len(sys.argv) > 4 else 8
+    main(clients, seconds, workers, threads)
@@ -0,0 +1,65 @@
+# حمل على /course/<id> بجلسات كثيرة مسجلة الدخول: user_loader مع ذاكرة المستخدمين وبدونها
+#   python benchmarks/bench_user_loader.py [sessions] [clients] [requests_per_client]
+# لكل خلفية (none / memory / file): طلبات كاملة (200) ثم إعادة تحقق بـ If-None-Match (304)،
+# حيث يصبح استعلام users جزءاً أكبر من زمن الطلب. misses = استعلامات users المنفذة فعلاً.
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from common import client_for, make_db, report, run_concurrent, seed, webapp
+
+
+def main(sessions, clients, requests_per_client):
+    path = make_db(CACHE_BACKEND='none', JOB_WORKERS=0)
+    user_ids, course_ids, _ = seed(path, users=sessions, courses=5, lessons=20)
+    students = [client_for(u) for u in user_ids]
+    urls = [f'/course/{c}' for c in course_ids]
+    etags = {}
+    cache_dir = tempfile.mkdtemp(prefix='bench-users-')
+    print(f'{sessions} logged-in sessions, {clients} clients × {requests_per_client} requests on /course/<id>')
+
+    def pick(idx, i):
+        n = (idx * 7919 + i * 104729) % (sessions * len(urls))
+        return n % sessions, urls[n // sessions]
+
+    def full(idx, i):
+        s, url = pick(idx, i)
+        r = students[s].get(url)
+        assert r.status_code == 200, r.status_code
+        etags[s, url] = r.headers['ETag']
+
+    def revalidate(idx, i):
+        s, url = pick(idx, i)
+        assert students[s].get(url, headers={'If-None-Match': etags[s, url]}).status_code == 304
+
+    for backend in ('none', 'memory', 'file'):
+        webapp.app.config.update(USER_CACHE_BACKEND=backend, USER_CACHE_DIR=cache_dir)
+        webapp._user_cache = None
+        print(f'USER_CACHE_BACKEND={backend}')
+        report('  GET (200)', *run_concurrent(full, clients, requests_per_client))
+        report('  If-None-Match (304)', *run_concurrent(revalidate, clients, requests_per_client))
+        with webapp.app.test_request_context():
+            t0 = time.perf_counter()
+            for n in range(20000):
+                webapp.load_user(str(user_ids[n % sessions]))
+            per_call = (time.perf_counter() - t0) / 20000 * 1e6
+        print(f'  load_user alone: {per_call:.1f} µs per call')
+        stats = webapp.user_cache().stats()
+        print(f"  users queries run: {stats['misses']}   saved: {stats['hits']}   "
+              f"hit ratio: {stats['hit_ratio']}")
+
+    if webapp._pool is not None:
+        webapp._pool.close_all()
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    requests_per_client = int(sys.argv[3]) if len(sys.argv) > 3 else 250
+    main(sessions, clients, requests_per_client)
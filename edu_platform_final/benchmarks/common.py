@@ -0,0 +1,106 @@
+# أدوات مشتركة لسكربتات القياس (benchmarks)
+# التشغيل من مجلد المشروع:  python benchmarks/<script>.py
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+import app as webapp  # noqa: E402
+
+
+def make_db(**config):
+    """إنشاء قاعدة بيانات مؤقتة فارغة وتوجيه التطبيق إليها."""
+    fd, path = tempfile.mkstemp(suffix='.sqlite', prefix='bench-')
+    os.close(fd)
+    webapp.app.config.update(DATABASE=path, TESTING=True, WTF_CSRF_ENABLED=False, **config)
+    with webapp.app.app_context():
+        webapp.init_db()
+    return path
+
+
+def seed(path, users=10, courses=5, lessons=10, enroll=True):
+    """تعبئة بيانات اصطناعية بسيطة؛ يعيد (معرفات المستخدمين، معرفات الدورات، معرفات الدروس)."""
+    import sqlite3
+    conn = sqlite3.connect(path)
+    cur = conn.cursor()
+    user_ids, course_ids, lesson_ids = [], [], []
+    for i in range(users):
+        cur.execute('INSERT INTO users (username, password, fullname, email) VALUES (?, ?, ?, ?)',
+                    (f'user{i}@example.com', 'pass', f'User {i}', f'user{i}@example.com'))
+        user_ids.append(cur.lastrowid)
+    for c in range(courses):
+        cur.execute('INSERT INTO courses (title_ar, title_en, short_desc_ar, short_desc_en, full_desc_ar, full_desc_en, image) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (f'دورة {c}', f'Course {c}', 'وصف مختصر', 'Short description',
+                     '<p>وصف كامل</p>' * 20, '<p>Full description</p>' * 20, None))
+        course_ids.append(cur.lastrowid)
+        for p in range(lessons):
+            cur.execute('INSERT INTO lessons (course_id, title_ar, title_en, content_ar, content_en, position) '
+                        'VALUES (?, ?, ?, ?, ?, ?)',
+                        (course_ids[-1], f'درس {p}', f'Lesson {p}',
+                         '<p>محتوى</p>' * 50, '<p>content</p>' * 50, p))
+            lesson_ids.append(cur.lastrowid)
+    if enroll:
+        for u in user_ids:
+            for c in course_ids:
+                cur.execute('INSERT INTO enrollments (user_id, course_id, approved) VALUES (?, ?, 1)', (u, c))
+    conn.commit()
+    conn.close()
+    return user_ids, course_ids, lesson_ids
+
+
+def client_for(user_id=None):
+    client = webapp.app.test_client()
+    if user_id is not None:
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user_id)
+            sess['_fresh'] = True
+    return client
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[k]
+
+
+def run_concurrent(make_request, clients=8, requests_per_client=200):
+    """تشغيل make_request(client_index, i) من عدة خيوط؛ يعيد (طلبات/ثانية، زمن الاستجابة بالمللي ثانية)."""
+    latencies = []
+    lock = threading.Lock()
+    errors = []
+
+    def worker(idx):
+        local = []
+        for i in range(requests_per_client):
+            t0 = time.perf_counter()
+            try:
+                make_request(idx, i)
+            except Exception as e:  # نسجل الخطأ ونكمل القياس
+                errors.append(e)
+            local.append((time.perf_counter() - t0) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    if errors:
+        print(f'  ! {len(errors)} errors, first: {errors[0]!r}')
+    return len(latencies) / elapsed, latencies
+
+
+def report(label, rps, latencies):
+    print(f'{label:<40} {rps:9.1f} req/s   p50={percentile(latencies, 50):7.2f}ms   '
+          f'p99={percentile(latencies, 99):7.2f}ms')
@@ -0,0 +1,378 @@
+# حزمة اختبار حمل شاملة: سيناريو لكل مسار على قاعدة مولدة (datagen.py) وتقرير JSON للمقارنة
+#   python benchmarks/load_suite.py [--db PATH | --scale small|medium|large] [--mode inprocess|wsgi]
+#                                   [--url http://host:port --db PATH] [--clients N] [--duration S]
+#                                   [--scenarios landing,login,...] [--report out.json]
+#                                   [--baseline base.json] [--tolerance 0.25]
+# الأنماط:
+#   inprocess  عميل Flask داخل العملية (بدون شبكة؛ يقيس التطبيق وحده)
+#   wsgi       خادم Werkzeug متعدد الخيوط على منفذ محلي + عملاء HTTP حقيقيون (كوكيز الجلسة بتسجيل دخول فعلي)
+#   --url      خادم يعمل مسبقاً (gunicorn مثلاً) على نفس القاعدة المعطاة بـ --db؛ تحديد المعدل فيه يبقى كما هو
+# القاعدة تُنسخ إلى ملف مؤقت في النمطين الأولين (السيناريوهات تكتب: mark_watched وقبول الطلبات).
+# --baseline: مقارنة p95 والإنتاجية ونسبة الأخطاء بتقرير سابق؛ رمز الخروج 1 عند تراجع أكبر من --tolerance.
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+from common import client_for, percentile, webapp
+
+import datagen
+
+SCENARIOS = ('landing', 'login', 'profile', 'course', 'lesson', 'admin_accept')
+# الرمز المتوقع لكل طلب؛ غيره يُحسب خطأ
+EXPECTED = {'landing': 200, 'login': 302, 'profile': 200, 'course': 200, 'lesson': 200,
+            'mark_watched': 204, 'admin_list': 200, 'admin_accept': 302}
+ACCEPT_BATCH = 20
+
+
+# === الأهداف: نفس الواجهة للعميل داخل العملية ولعميل HTTP ===
+class InProcessSession:
+    def __init__(self, user_id=None):
+        self.client = client_for(user_id)
+
+    def request(self, method, url, data=None):
+        response = self.client.open(url, method=method, data=data)
+        response.get_data()
+        response.close()
+        return response.status_code
+
+
+class HttpSession:
+    def __init__(self, base_url):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.cookies = {}
+
+    def request(self, method, url, data=None):
+        body, headers = None, {}
+        if data is not None:
+            body = urllib.parse.urlencode(data, doseq=True)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            conn.request(method, url, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            for header, value in response.getheaders():
+                if header.lower() == 'set-cookie':
+                    name, _, rest = value.partition('=')
+                    self.cookies[name] = rest.split(';', 1)[0]
+            return response.status
+        finally:
+            conn.close()
+
+
+class InProcessTarget:
+    name = 'inprocess'
+
+    def session(self, user_id=None, email=None):
+        return InProcessSession(user_id)
+
+
+class HttpTarget:
+    name = 'http'
+
+    def __init__(self, base_url, password):
+        self.base_url = base_url
+        self.password = password
+
+    def session(self, user_id=None, email=None):
+        session = HttpSession(self.base_url)
+        if email is not None:
+            status = session.request('POST', '/login', {'email': email, 'password': self.password})
+            if status != 302:
+                raise RuntimeError(f'login as {email} failed with {status}')
+        return session
+
+
+# === بيانات السيناريوهات من القاعدة ===
+class Dataset:
+    def __init__(self, path, students, seed):
+        conn = sqlite3.connect(path)
+        rnd = random.Random(seed)
+        active = [r[0] for r in conn.execute('SELECT DISTINCT user_id FROM enrollments WHERE approved = 1')]
+        self.students = rnd.sample(active, min(students, len(active)))
+        placeholders = ','.join('?' * len(self.students))
+        self.emails = dict(conn.execute(f'SELECT id, email FROM users WHERE id IN ({placeholders})', self.students))
+        self.courses = {}
+        for user_id, course_id in conn.execute(
+                f'SELECT user_id, course_id FROM enrollments WHERE approved = 1 AND user_id IN ({placeholders})',
+                self.students):
+            self.courses.setdefault(user_id, []).append(course_id)
+        course_ids = sorted({c for cs in self.courses.values() for c in cs})
+        self.lessons = {}
+        for course_id, lesson_id in conn.execute(
+                f'SELECT course_id, id FROM lessons WHERE course_id IN ({",".join("?" * len(course_ids))})',
+                course_ids):
+            self.lessons.setdefault(course_id, []).append(lesson_id)
+        self.admin = conn.execute('SELECT id, email FROM users WHERE is_admin = 1 ORDER BY id LIMIT 1').fetchone()
+        self.pending = [r[0] for r in conn.execute("SELECT id FROM enroll_requests WHERE status = 'pending' ORDER BY id")]
+        self.summary = {
+            'users': conn.execute('SELECT COUNT(*) FROM users').fetchone()[0],
+            'courses': conn.execute('SELECT COUNT(*) FROM courses').fetchone()[0],
+            'lessons': conn.execute('SELECT COUNT(*) FROM lessons').fetchone()[0],
+            'enrollments': conn.execute('SELECT COUNT(*) FROM enrollments').fetchone()[0],
+            'progress_rows': conn.execute('SELECT COUNT(*) FROM user_progress').fetchone()[0],
+            'pending_requests': len(self.pending),
+            'bytes': os.path.getsize(path),
+        }
+        conn.close()
+
+
+# === تسجيل النتائج ===
+class Results:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.statuses = {}
+        self.errors = {}
+
+    def record(self, endpoint, status, ms):
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(ms)
+            counts = self.statuses.setdefault(endpoint, {})
+            counts[status] = counts.get(status, 0) + 1
+            if status != EXPECTED[endpoint]:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self, elapsed):
+        report = {}
+        for endpoint, values in self.latencies.items():
+            report[endpoint] = {
+                'requests': len(values),
+                'errors': self.errors.get(endpoint, 0),
+                'status': {str(k): v for k, v in sorted(self.statuses[endpoint].items())},
+                'rps': round(len(values) / elapsed[endpoint], 1),
+                'mean_ms': round(sum(values) / len(values), 2),
+                'p50_ms': round(percentile(values, 50), 2),
+                'p95_ms': round(percentile(values, 95), 2),
+                'p99_ms': round(percentile(values, 99), 2),
+                'max_ms': round(max(values), 2),
+            }
+        return report
+
+
+# === السيناريوهات: كل استدعاء = تكرار واحد لمستخدم افتراضي ===
+class Suite:
+    def __init__(self, target, data, results, password):
+        self.target = target
+        self.data = data
+        self.results = results
+        self.password = password
+        self._pending_lock = threading.Lock()
+
+    def timed(self, endpoint, session, method, url, data=None):
+        t0 = time.perf_counter()
+        try:
+            status = session.request(method, url, data)
+        except Exception:
+            status = 'exception'
+        self.results.record(endpoint, status, (time.perf_counter() - t0) * 1000)
+        return status
+
+    def setup(self, scenario, rnd, sessions):
+        """جلسات العامل قبل بدء القياس (تسجيل الدخول عبر HTTP يستغرق زمن scrypt)."""
+        if scenario in ('landing', 'login'):
+            return [self.target.session()]
+        if scenario == 'admin_accept':
+            return [self.target.session(self.data.admin[0], self.data.admin[1])]
+        users = rnd.sample(self.data.students, min(sessions, len(self.data.students)))
+        return [(u, self.target.session(u, self.data.emails[u])) for u in users]
+
+    def landing(self, rnd, sessions):
+        lang = '?lang=en' if rnd.random() < 0.3 else ''
+        self.timed('landing', sessions[0], 'GET', '/' + lang)
+
+    def login(self, rnd, sessions):
+        email = self.data.emails[rnd.choice(self.data.students)]
+        # جلسة جديدة لكل دخول (كمستخدم يفتح المتصفح)
+        self.timed('login', self.target.session(), 'POST', '/login', {'email': email, 'password': self.password})
+
+    def profile(self, rnd, sessions):
+        _, session = rnd.choice(sessions)
+        self.timed('profile', session, 'GET', '/profile')
+
+    def course(self, rnd, sessions):
+        user_id, session = rnd.choice(sessions)
+        self.timed('course', session, 'GET', f'/course/{rnd.choice(self.data.courses[user_id])}')
+
+    def lesson(self, rnd, sessions):
+        user_id, session = rnd.choice(sessions)
+        lesson_id = rnd.choice(self.data.lessons[rnd.choice(self.data.courses[user_id])])
+        if self.timed('lesson', session, 'GET', f'/lesson/{lesson_id}') == 200:
+            self.timed('mark_watched', session, 'POST', f'/lesson/{lesson_id}/mark_watched')
+
+    def admin_accept(self, rnd, sessions):
+        with self._pending_lock:
+            batch, self.data.pending = self.data.pending[:ACCEPT_BATCH], self.data.pending[ACCEPT_BATCH:]
+        if not batch:
+            raise StopIteration
+        self.timed('admin_list', sessions[0], 'GET', '/admin/enroll_requests')
+        self.timed('admin_accept', sessions[0], 'POST', '/admin/enroll_requests/accept_bulk', {'ids': batch})
+
+
+def run_scenario(suite, scenario, clients, duration, sessions, seed):
+    fn = getattr(suite, scenario)
+    prepared = [suite.setup(scenario, random.Random(seed + i), sessions) for i in range(clients)]
+    deadline = time.perf_counter() + duration
+
+    def worker(idx):
+        rnd = random.Random(seed * 1000 + idx)
+        while time.perf_counter() < deadline:
+            try:
+                fn(rnd, prepared[idx])
+            except StopIteration:
+                return
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - t0
+
+
+def compare(report, baseline, tolerance):
+    """قائمة التراجعات مقارنة بتقرير سابق (نفس المسارات فقط)."""
+    regressions = []
+    for endpoint, now in report['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(endpoint)
+        if before is None:
+            continue
+        if now['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(f'{endpoint}: p95 {before["p95_ms"]} → {now["p95_ms"]} ms')
+        if now['rps'] < before['rps'] * (1 - tolerance):
+            regressions.append(f'{endpoint}: throughput {before["rps"]} → {now["rps"]} req/s')
+        error_rate = now['errors'] / now['requests']
+        if error_rate > before['errors'] / before['requests'] + 0.01:
+            regressions.append(f'{endpoint}: errors {before["errors"]}/{before["requests"]} → '
+                               f'{now["errors"]}/{now["requests"]}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='End-to-end load suite.')
+    parser.add_argument('--db', help='database generated by datagen.py (copied unless --url)')
+    parser.add_argument('--scale', choices=sorted(datagen.SCALES), default='small',
+                        help='generate a temporary database when --db is not given')
+    parser.add_argument('--mode', choices=('inprocess', 'wsgi'), default='inprocess')
+    parser.add_argument('--url', help='drive an already running server instead (needs --db)')
+    parser.add_argument('--password', default='pass')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10, help='seconds per scenario')
+    parser.add_argument('--sessions', type=int, default=10, help='logged-in users per client')
+    parser.add_argument('--students', type=int, default=200, help='distinct students sampled from the database')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--report', help='write the JSON report here')
+    parser.add_argument('--baseline', help='JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+    if args.url and not args.db:
+        parser.error('--url needs --db (the database the server uses) to pick users and ids')
+
+    workdir = tempfile.mkdtemp(prefix='load-suite-')
+    server = None
+    try:
+        if args.url:
+            path = args.db
+        else:
+            path = os.path.join(workdir, 'db.sqlite')
+            if args.db:
+                shutil.copyfile(args.db, path)
+            else:
+                datagen.main([path, '--scale', args.scale, '--seed', str(args.seed), '--password', args.password])
+            # إعدادات التشغيل الافتراضية مع تعطيل تحديد المعدل (كل العملاء من 127.0.0.1)
+            webapp.app.config.update(DATABASE=path, RATE_LIMIT_BACKEND='none', JOB_WORKERS=0,
+                                     USER_CACHE_DIR=os.path.join(workdir, 'users'),
+                                     CACHE_DIR=os.path.join(workdir, 'cache'))
+        data = Dataset(path, args.students, args.seed)
+
+        if args.url:
+            target = HttpTarget(args.url.rstrip('/'), args.password)
+        elif args.mode == 'wsgi':
+            from werkzeug.serving import make_server
+            logging.getLogger('werkzeug').setLevel(logging.ERROR)
+            server = make_server('127.0.0.1', 0, webapp.app, threaded=True)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            target = HttpTarget(f'http://127.0.0.1:{server.server_port}', args.password)
+        else:
+            target = InProcessTarget()
+
+        results, elapsed = Results(), {}
+        suite = Suite(target, data, results, args.password)
+        print(f'{target.name} target, {args.clients} clients, {args.duration:g}s per scenario, '
+              f'database {data.summary}')
+        for scenario in scenarios:
+            seconds = run_scenario(suite, scenario, args.clients, args.duration, args.sessions, args.seed)
+            for endpoint in [scenario] + {'lesson': ['mark_watched'], 'admin_accept': ['admin_list']}.get(scenario, []):
+                elapsed[endpoint] = seconds
+        endpoints = results.summary(elapsed)
+        report = {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'target': args.url or target.name,
+            'clients': args.clients,
+            'duration_s': args.duration,
+            'seed': args.seed,
+            'environment': {
+                'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version,
+                'platform': platform.platform(), 'cpus': os.cpu_count(),
+            },
+            'database': data.summary,
+            'config': {k: webapp.app.config[k] for k in (
+                'DB_POOL_SIZE', 'PROGRESS_BACKEND', 'CACHE_BACKEND', 'USER_CACHE_BACKEND', 'PASSWORD_SCRYPT_N',
+                'PASSWORD_HASH_WORKERS', 'PROGRESS_FLUSH_INTERVAL', 'RATE_LIMIT_BACKEND')} if not args.url else None,
+            'endpoints': endpoints,
+        }
+
+        print(f'\n{"endpoint":<14} {"requests":>9} {"errors":>7} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} '
+              f'{"p99 ms":>8} {"max ms":>8}')
+        for endpoint, row in endpoints.items():
+            print(f'{endpoint:<14} {row["requests"]:9} {row["errors"]:7} {row["rps"]:8.1f} {row["p50_ms"]:8.2f} '
+                  f'{row["p95_ms"]:8.2f} {row["p99_ms"]:8.2f} {row["max_ms"]:8.2f}')
+
+        status = 0
+        if args.baseline:
+            with open(args.baseline, encoding='utf-8') as f:
+                report['regressions'] = compare(report, json.load(f), args.tolerance)
+            for line in report['regressions']:
+                print(f'❌ regression: {line}')
+            if report['regressions']:
+                status = 1
+            else:
+                print(f'✅ no regression beyond {args.tolerance:.0%} of {args.baseline}')
+        if args.report:
+            with open(args.report, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f'report written to {args.report}')
+        return status
+    finally:
+        if server is not None:
+            server.shutdown()
+        if webapp._progress_writer is not None:
+            webapp._progress_writer.stop()
+            webapp._progress_writer = None
+        if webapp._pool is not None:
+            webapp._pool.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+# === ذاكرة تخزين مؤقت على الخادم (Server-side cache) ===
+# واجهتان بنفس الدوال: get / set / delete / delete_namespace / clear / stats
+#   MemoryCache — LRU داخل العملية (عامل واحد)
+#   FileCache   — ملفات محلية مشتركة بين عمال gunicorn على نفس الجهاز
+# المفاتيح بصيغة "namespace:rest" ليمكن إبطال مجموعة كاملة دفعة واحدة.
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Stats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.invalidations = 0
+
+    def as_dict(self):
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'sets': self.sets,
+                'invalidations': self.invalidations,
+                'hit_ratio': round(self.hits / total, 3) if total else 0.0}
+
+
+class MemoryCache:
+    backend = 'memory'
+
+    def __init__(self, maxsize=256, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = _Stats()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self._stats.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self._stats.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            self._stats.sets += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self._stats.invalidations += 1
+
+    def delete_namespace(self, namespace):
+        prefix = namespace + ':'
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+            self._stats.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return dict(self._stats.as_dict(), backend=self.backend, entries=len(self._data))
+
+
+class FileCache:
+    """كل مفتاح في ملف pickle مستقل: <namespace>--<sha1>.pkl، يُكتب بملف مؤقت ثم rename."""
+    backend = 'file'
+
+    def __init__(self, directory, ttl=60):
+        self.directory = directory
+        self.ttl = ttl
+        self._stats = _Stats()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        namespace = key.split(':', 1)[0]
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f'{namespace}--{digest}.pkl')
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as fh:
+                expires, value = pickle.load(fh)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self._stats.misses += 1
+            return None
+        if expires < time.time():
+            self._stats.misses += 1
+            return None
+        self._stats.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                pickle.dump((time.time() + (ttl or self.ttl), value), fh, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        self._stats.sets += 1
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+        self._stats.invalidations += 1
+
+    def delete_namespace(self, namespace):
+        prefix = namespace + '--'
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+        self._stats.invalidations += 1
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        entries = sum(1 for n in os.listdir(self.directory) if n.endswith('.pkl'))
+        return dict(self._stats.as_dict(), backend=self.backend, entries=entries)
+
+
+class NullCache:
+    """تعطيل التخزين المؤقت مع الإبقاء على نفس الواجهة."""
+    backend = 'none'
+
+    def __init__(self):
+        self._stats = _Stats()
+
+    def get(self, key):
+        self._stats.misses += 1
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def delete_namespace(self, namespace):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return dict(self._stats.as_dict(), backend=self.backend, entries=0)
+
+
+def make_cache(backend, ttl=60, maxsize=256, directory=None):
+    if backend == 'memory':
+        return MemoryCache(maxsize=maxsize, ttl=ttl)
+    if backend == 'file':
+        return FileCache(directory, ttl=ttl)
+    if backend == 'none':
+        return NullCache()
+    raise ValueError(f'unknown cache backend: {backend!r}')
@@ -0,0 +1,170 @@
+# === كلمات المرور: تجزئة scrypt (تستهلك الذاكرة) بتكلفة قابلة للضبط وتحقق في مجمّع خيوط محدود ===
+# الصيغة المخزنة:  scrypt$<n>$<r>$<p>$<salt base64>$<hash base64>
+# التكلفة (n, r, p) محفوظة مع كل تجزئة؛ رفعها في الإعدادات يعيد التجزئة عند الدخول التالي.
+# القيم القديمة تُقبل ثم تُستبدل بعد أول دخول ناجح:
+#   - نص صريح (التسجيل سابقاً كان يخزن كلمة المرور كما هي)
+#   - تجزئة Werkzeug (pbkdf2:sha256:...$salt$hash) من reset_admin_password.py سابقاً
+# hashlib.scrypt يحرر الـ GIL أثناء الحساب؛ المجمّع يحدد عدد التجزئات المتزامنة
+# فلا تستهلك موجة تسجيلات دخول كل المعالج، والطلبات الزائدة تُرفض (Busy) بدل أن تتراكم.
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from werkzeug.security import check_password_hash
+
+SCHEME = 'scrypt'
+DEFAULT_N = 2 ** 14
+DEFAULT_R = 8
+DEFAULT_P = 1
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+class Busy(Exception):
+    """كل خيوط التجزئة مشغولة والطابور ممتلئ."""
+
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+
+def _unb64(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def _scrypt(password, salt, n, r, p):
+    # الذاكرة اللازمة 128 * n * r بايت؛ الحد الافتراضي في OpenSSL (32MB) أقل من بعض الإعدادات
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r + 1024 * 1024, dklen=KEY_BYTES)
+
+
+def hash_password(password, n=DEFAULT_N, r=DEFAULT_R, p=DEFAULT_P):
+    salt = os.urandom(SALT_BYTES)
+    return f'{SCHEME}${n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, n, r, p))}'
+
+
+def _is_werkzeug_hash(stored):
+    method = stored.split('$', 1)[0]
+    return stored.count('$') == 2 and method.split(':', 1)[0] in ('pbkdf2', 'scrypt', 'sha256', 'sha1', 'md5')
+
+
+def identify(stored):
+    """'scrypt' أو 'werkzeug' أو 'plaintext'."""
+    if stored.startswith(SCHEME + '$') and stored.count('$') == 5:
+        return 'scrypt'
+    if _is_werkzeug_hash(stored):
+        return 'werkzeug'
+    return 'plaintext'
+
+
+def verify_password(stored, password):
+    if not stored:
+        return False
+    kind = identify(stored)
+    if kind == 'scrypt':
+        _, n, r, p, salt, expected = stored.split('$')
+        actual = _scrypt(password, _unb64(salt), int(n), int(r), int(p))
+        return hmac.compare_digest(actual, _unb64(expected))
+    if kind == 'werkzeug':
+        return check_password_hash(stored, password)
+    return hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8'))
+
+
+def needs_rehash(stored, n=DEFAULT_N, r=DEFAULT_R, p=DEFAULT_P):
+    if identify(stored) != 'scrypt':
+        return True
+    return stored.split('$')[1:4] != [str(n), str(r), str(p)]
+
+
+def calibrate(target_ms=100, r=DEFAULT_R, p=DEFAULT_P):
+    """أكبر n (قوة 2) تبقى تجزئته على هذا الجهاز ضمن target_ms تقريباً."""
+    n = 2 ** 12
+    while True:
+        t0 = time.perf_counter()
+        _scrypt('calibration', b'\0' * SALT_BYTES, n * 2, r, p)
+        if (time.perf_counter() - t0) * 1000 > target_ms:
+            return n
+        n *= 2
+
+
+class Hasher:
+    """مجمّع خيوط محدود للتجزئة والتحقق؛ queue = طلبات تنتظر دورها فوق عدد الخيوط."""
+
+    def __init__(self, n=DEFAULT_N, r=DEFAULT_R, p=DEFAULT_P, workers=1, queue=16, timeout=10.0):
+        self.n, self.r, self.p = n, r, p
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='credentials')
+        self._slots = threading.BoundedSemaphore(workers + queue)
+        # تجزئة وهمية للتحقق من مستخدم غير موجود بنفس الزمن (لا يُكشف وجود البريد من زمن الرد)
+        self._dummy = hash_password(os.urandom(8).hex(), n, r, p)
+        self._lock = threading.Lock()
+        self.counters = {'verified': 0, 'rejected': 0, 'rehashed': 0, 'busy': 0}
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self._count('busy')
+            raise Busy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # الفتحة تُحرر عند انتهاء التجزئة نفسها لا عند توقف الانتظار: مهلة منتهية لا تسمح
+        # بتكديس عمل فوق workers + queue
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()  # ما زالت في الطابور: لا داعي لحسابها
+            self._count('busy')
+            raise Busy() from None
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def hash(self, password):
+        return self._run(hash_password, password, self.n, self.r, self.p)
+
+    def verify(self, stored, password):
+        """(صحيحة؟، تجزئة جديدة لتخزينها أو None).
+
+        stored=None (مستخدم غير موجود) يتحقق من تجزئة وهمية ويعيد False.
+        """
+        ok = self._run(verify_password, stored or self._dummy, password) and stored is not None
+        self._count('verified' if ok else 'rejected')
+        if not ok or not needs_rehash(stored, self.n, self.r, self.p):
+            return ok, None
+        try:
+            new_hash = self.hash(password)
+        except Busy:
+            return True, None  # كلمة المرور صحيحة؛ الترقية في الدخول التالي
+        self._count('rehashed')
+        return True, new_hash
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, n=self.n, r=self.r, p=self.p)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+if __name__ == '__main__':
+    import sys
+
+    args = sys.argv[1:]
+    if args[:1] != ['--calibrate']:
+        print('usage: python credentials.py --calibrate [target_ms]')
+        sys.exit(2)
+    target = float(args[1]) if len(args) > 1 else 100
+    n = calibrate(target)
+    t0 = time.perf_counter()
+    hash_password('calibration', n)
+    print(f'PASSWORD_SCRYPT_N={n}  ({(time.perf_counter() - t0) * 1000:.0f} ms, '
+          f'{128 * n * DEFAULT_R // 1024 // 1024} MB per hash)')
@@ -0,0 +1,279 @@
+# === مولّد بيانات اصطناعية قابلة للتكرار لتخطيط السعة والقياس ===
+#   python datagen.py [--scale small|medium|large] [--users N] [--courses N] [--lessons N]
+#                     [--seed S] [--password P] [--scrypt-n N] [--no-html] [--force] db_path
+# نفس البذرة = نفس القاعدة. التوزيعات منحرفة كما في منصة حقيقية:
+#   - شعبية الدورات Zipf: قلة من الدورات تجذب معظم الطلاب
+#   - عدد الدورات لكل طالب هندسي: أغلبهم في دورة أو دورتين وقلة في كثير
+#   - التقدم: جزء لم يبدأ، جزء توقف مبكراً، وجزء أكمل الدورة (دروس متتالية من البداية)
+#   - ~8% من الطلبات ما زالت pending (لسيناريو قبول المدير)
+# النصوص بالعربية والإنجليزية من مفردات حقيقية؛ كل المستخدمين بكلمة مرور واحدة (--password).
+import argparse
+import json
+import os
+import random
+import sqlite3
+import time
+
+import credentials
+import lesson_html
+import migrations
+import search
+
+SCALES = {
+    'small': {'users': 1000, 'courses': 50, 'lessons': 20},
+    'medium': {'users': 10000, 'courses': 300, 'lessons': 50},
+    'large': {'users': 100000, 'courses': 2000, 'lessons': 200},
+}
+ADMIN_EMAIL = 'admin@example.com'
+PENDING_RATIO = 0.08
+VIDEO_RATIO = 0.3
+
+FIRST_NAMES = [
+    ('محمد', 'Mohamed'), ('أحمد', 'Ahmed'), ('علي', 'Ali'), ('عمر', 'Omar'), ('يوسف', 'Youssef'),
+    ('خالد', 'Khaled'), ('مصطفى', 'Mostafa'), ('إبراهيم', 'Ibrahim'), ('حسن', 'Hassan'), ('كريم', 'Karim'),
+    ('فاطمة', 'Fatma'), ('مريم', 'Mariam'), ('نور', 'Nour'), ('سارة', 'Sara'), ('ليلى', 'Laila'),
+    ('آية', 'Aya'), ('هدى', 'Hoda'), ('منى', 'Mona'), ('ياسمين', 'Yasmin'), ('زينب', 'Zainab'),
+]
+LAST_NAMES = [
+    ('عبد الله', 'Abdullah'), ('السيد', 'El-Sayed'), ('حسين', 'Hussein'), ('إسماعيل', 'Ismail'),
+    ('منصور', 'Mansour'), ('الشريف', 'El-Sherif'), ('عثمان', 'Osman'), ('سليمان', 'Soliman'),
+    ('النجار', 'El-Naggar'), ('فوزي', 'Fawzy'), ('رمضان', 'Ramadan'), ('صالح', 'Saleh'),
+]
+TOPICS = [
+    ('البرمجة بلغة بايثون', 'Python Programming'), ('تطوير الويب', 'Web Development'),
+    ('قواعد البيانات', 'Databases'), ('الذكاء الاصطناعي', 'Artificial Intelligence'),
+    ('تعلم الآلة', 'Machine Learning'), ('تحليل البيانات', 'Data Analysis'), ('الرياضيات', 'Mathematics'),
+    ('الفيزياء', 'Physics'), ('الكيمياء', 'Chemistry'), ('اللغة الإنجليزية', 'English Language'),
+    ('النحو العربي', 'Arabic Grammar'), ('التصميم الجرافيكي', 'Graphic Design'), ('التسويق الرقمي', 'Digital Marketing'),
+    ('المحاسبة', 'Accounting'), ('إدارة المشاريع', 'Project Management'), ('أمن المعلومات', 'Information Security'),
+    ('الشبكات', 'Networking'), ('تطبيقات الجوال', 'Mobile Apps'), ('الإحصاء', 'Statistics'), ('ريادة الأعمال', 'Entrepreneurship'),
+]
+LEVELS = [
+    ('مقدمة في', 'Introduction to'), ('أساسيات', 'Fundamentals of'), ('احتراف', 'Mastering'),
+    ('مشاريع عملية في', 'Hands-on Projects in'), ('دليل المبتدئين إلى', "A Beginner's Guide to"),
+    ('المستوى المتقدم في', 'Advanced'),
+]
+LESSON_TOPICS = [
+    ('نظرة عامة', 'Overview'), ('المفاهيم الأساسية', 'Core Concepts'), ('إعداد بيئة العمل', 'Setting Up'),
+    ('المتغيرات والأنواع', 'Variables and Types'), ('الشروط والحلقات', 'Conditions and Loops'),
+    ('الدوال', 'Functions'), ('التعامل مع الملفات', 'Working with Files'), ('الأخطاء الشائعة', 'Common Mistakes'),
+    ('تمارين محلولة', 'Solved Exercises'), ('دراسة حالة', 'Case Study'), ('مشروع صغير', 'Mini Project'),
+    ('أفضل الممارسات', 'Best Practices'), ('الاختبار والتصحيح', 'Testing and Debugging'), ('مراجعة', 'Review'),
+    ('أسئلة وأجوبة', 'Q&A'), ('الخلاصة', 'Summary'),
+]
+WORDS_AR = (
+    'في هذا الدرس نتعلم كيف نستخدم الأدوات المناسبة لحل المشكلات خطوة بخطوة مع أمثلة عملية من الواقع '
+    'ونشرح الفكرة الأساسية ثم نطبقها على تمرين قصير يساعد الطالب على فهم المفهوم بعمق ويمكنك الرجوع إلى '
+    'الملاحظات في نهاية الفصل لمراجعة أهم النقاط قبل الانتقال إلى الدرس التالي حيث نبني على ما تعلمناه '
+    'ونضيف مهارات جديدة مثل التحليل والتنظيم وكتابة الحلول بطريقة واضحة ومرتبة وسهلة القراءة للآخرين'
+).split()
+WORDS_EN = (
+    'in this lesson we learn how to use the right tools to solve problems step by step with practical '
+    'examples from real life we explain the main idea and then apply it to a short exercise that helps '
+    'students understand the concept deeply you can return to the notes at the end of the chapter to '
+    'review the key points before moving on to the next lesson where we build on what we learned and add '
+    'new skills such as analysis organization and writing clear readable solutions for others'
+).split()
+
+
+def _sentence(rnd, words):
+    text = ' '.join(rnd.choice(words) for _ in range(rnd.randint(8, 16)))
+    return text[0].upper() + text[1:] + '.'
+
+
+def _paragraphs(rnd, words, count):
+    return [' '.join(_sentence(rnd, words) for _ in range(rnd.randint(3, 5))) for _ in range(count)]
+
+
+class TextPool:
+    """فقرات مولدة مسبقاً تُركَّب منها المحتويات (أسرع من توليد نص جديد لكل درس)."""
+
+    def __init__(self, rnd, size=400):
+        self.rnd = rnd
+        self.ar = _paragraphs(rnd, WORDS_AR, size)
+        self.en = _paragraphs(rnd, WORDS_EN, size)
+
+    def html(self, heading_ar, heading_en, paragraphs):
+        picks = [self.rnd.randrange(len(self.ar)) for _ in range(paragraphs)]
+        bullets = [self.rnd.randrange(len(self.ar)) for _ in range(3)]
+        ar = (f'<h3>{heading_ar}</h3>' + ''.join(f'<p>{self.ar[i]}</p>' for i in picks)
+              + '<ul>' + ''.join(f'<li>{self.ar[i].split(".")[0]}</li>' for i in bullets) + '</ul>')
+        en = (f'<h3>{heading_en}</h3>' + ''.join(f'<p>{self.en[i]}</p>' for i in picks)
+              + '<ul>' + ''.join(f'<li>{self.en[i].split(".")[0]}</li>' for i in bullets) + '</ul>')
+        return ar, en
+
+
+def _video_url(rnd):
+    alphabet = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_-'
+    return 'https://www.youtube.com/watch?v=' + ''.join(rnd.choice(alphabet) for _ in range(11))
+
+
+def _enrollment_count(rnd, courses):
+    # هندسي: P(k) ∝ 0.55^k ، بحد أقصى 12 دورة
+    k = 1
+    while k < min(12, courses) and rnd.random() < 0.45:
+        k += 1
+    return k
+
+
+def _completed_lessons(rnd, lessons):
+    roll = rnd.random()
+    if roll < 0.35:
+        return 0                                    # التحق ولم يبدأ
+    if roll < 0.8:
+        return int(lessons * rnd.betavariate(1, 3))  # توقف مبكراً غالباً
+    return lessons                                  # أكمل الدورة
+
+
+def generate(conn, users, courses, lessons, seed=1, password='pass', scrypt_n=credentials.DEFAULT_N,
+             compile_html=True, log=print):
+    """تعبئة قاعدة بعد الترحيل؛ يعيد ملخصاً (الأعداد وزمن كل مرحلة)."""
+    rnd = random.Random(seed)
+    pool = TextPool(rnd)
+    timings = {}
+
+    def stage(name):
+        timings[name] = round(time.perf_counter() - stage.t0, 2)
+        log(f'  {name:<14} {timings[name]:8.2f}s')
+        stage.t0 = time.perf_counter()
+    stage.t0 = time.perf_counter()
+
+    # --- الدورات والدروس (لا التحاقات بعد: triggers العدادات لا تجد ما تحدّثه) ---
+    course_rows = []
+    for c in range(courses):
+        level_ar, level_en = LEVELS[c % len(LEVELS)]
+        topic_ar, topic_en = TOPICS[(c // len(LEVELS)) % len(TOPICS)]
+        part = c // (len(LEVELS) * len(TOPICS))
+        title_ar = f'{level_ar} {topic_ar}' + (f' - الجزء {part + 1}' if part else '')
+        title_en = f'{level_en} {topic_en}' + (f' - Part {part + 1}' if part else '')
+        full_ar, full_en = pool.html(title_ar, title_en, 4)
+        course_rows.append((c + 1, title_ar, title_en, pool.ar[rnd.randrange(len(pool.ar))].split('.')[0],
+                            pool.en[rnd.randrange(len(pool.en))].split('.')[0], full_ar, full_en))
+    conn.executemany('INSERT INTO courses (id, title_ar, title_en, short_desc_ar, short_desc_en, full_desc_ar, '
+                     'full_desc_en) VALUES (?, ?, ?, ?, ?, ?, ?)', course_rows)
+
+    def lesson_rows():
+        lesson_id = 0
+        for course_id in range(1, courses + 1):
+            for p in range(lessons):
+                lesson_id += 1
+                topic_ar, topic_en = LESSON_TOPICS[p % len(LESSON_TOPICS)]
+                content_ar, content_en = pool.html(topic_ar, topic_en, rnd.randint(2, 4))
+                video = _video_url(rnd) if rnd.random() < VIDEO_RATIO else None
+                # progress_slot صريح: بدون trigger التعيين (MAX لكل درس)
+                yield (lesson_id, course_id, f'{p + 1}. {topic_ar}', f'{p + 1}. {topic_en}',
+                       content_ar, content_en, p, video, p)
+    conn.executemany('INSERT INTO lessons (id, course_id, title_ar, title_en, content_ar, content_en, '
+                     'position, video_url, progress_slot) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', lesson_rows())
+    stage('courses')
+
+    # --- المستخدمون: تجزئة واحدة لكلمة المرور المشتركة (scrypt لكل مستخدم يستغرق ساعات) ---
+    stored = credentials.hash_password(password, scrypt_n)
+    conn.execute('INSERT INTO users (id, username, password, fullname, email, is_admin) VALUES (1, ?, ?, ?, ?, 1)',
+                 (ADMIN_EMAIL, stored, 'المشرف', ADMIN_EMAIL))
+
+    def user_rows():
+        for u in range(2, users + 2):
+            first, last = rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES)
+            email = f'user{u}@example.com'
+            yield u, email, stored, f'{first[0]} {last[0]}', email
+    conn.executemany('INSERT INTO users (id, username, password, fullname, email) VALUES (?, ?, ?, ?, ?)',
+                     user_rows())
+    stage('users')
+
+    # --- الالتحاقات والتقدم ---
+    weights = [1 / (rank + 1) ** 1.1 for rank in range(courses)]
+    order = list(range(1, courses + 1))
+    rnd.shuffle(order)   # الدورات الأشهر ليست أولى المعرفات
+    cumulative, total = [], 0.0
+    for w in weights:
+        total += w
+        cumulative.append(total)
+    enrollments, requests, progress_rows = [], [], 0
+
+    def progress_for(user_id, course_id, done):
+        first = (course_id - 1) * lessons + 1
+        return ((user_id, lesson_id, 1) for lesson_id in range(first, first + done))
+
+    pending_progress = []
+    for u in range(2, users + 2):
+        chosen = set()
+        want = _enrollment_count(rnd, courses)
+        while len(chosen) < want:
+            chosen.update(rnd.choices(order, cum_weights=cumulative, k=want - len(chosen)))
+        for course_id in sorted(chosen):
+            if rnd.random() < PENDING_RATIO:
+                requests.append((u, course_id, 'pending'))
+                continue
+            requests.append((u, course_id, 'accepted'))
+            enrollments.append((u, course_id))
+            done = _completed_lessons(rnd, lessons)
+            if done:
+                pending_progress.append(progress_for(u, course_id, done))
+                progress_rows += done
+        if len(pending_progress) >= 1000:
+            conn.executemany('INSERT INTO user_progress (user_id, lesson_id, completed) VALUES (?, ?, ?)',
+                             (row for rows in pending_progress for row in rows))
+            pending_progress = []
+    conn.executemany('INSERT INTO user_progress (user_id, lesson_id, completed) VALUES (?, ?, ?)',
+                     (row for rows in pending_progress for row in rows))
+    stage('progress')
+    # التقدم قبل الالتحاق: trigger الإدراج يحسب completed_lessons / total_lessons مرة واحدة لكل التحاق
+    conn.executemany('INSERT INTO enrollments (user_id, course_id, approved) VALUES (?, ?, 1)', enrollments)
+    conn.executemany('INSERT INTO enroll_requests (user_id, course_id, status) VALUES (?, ?, ?)', requests)
+    stage('enrollments')
+
+    search.rebuild(conn)
+    stage('search index')
+    if compile_html:
+        lesson_html.rebuild(conn)
+        stage('lesson html')
+    conn.execute('ANALYZE')
+    stage('analyze')
+    return {
+        'seed': seed, 'users': users + 1, 'courses': courses, 'lessons': courses * lessons,
+        'enrollments': len(enrollments), 'pending_requests': len(requests) - len(enrollments),
+        'progress_rows': progress_rows, 'seconds': timings,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic database for capacity planning.')
+    parser.add_argument('db_path')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--users', type=int)
+    parser.add_argument('--courses', type=int)
+    parser.add_argument('--lessons', type=int, help='lessons per course')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--password', default='pass', help='password of every generated user')
+    parser.add_argument('--scrypt-n', type=int, default=credentials.DEFAULT_N)
+    parser.add_argument('--no-html', action='store_true', help='leave lesson HTML to be compiled on first view')
+    parser.add_argument('--force', action='store_true', help='overwrite an existing file')
+    args = parser.parse_args(argv)
+
+    scale = dict(SCALES[args.scale])
+    scale.update({k: getattr(args, k) for k in scale if getattr(args, k) is not None})
+    if os.path.exists(args.db_path):
+        if not args.force:
+            parser.error(f'{args.db_path} exists (use --force to overwrite)')
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.db_path + suffix):
+                os.remove(args.db_path + suffix)
+
+    print(f'generating {scale} (seed {args.seed}) into {args.db_path}')
+    conn = sqlite3.connect(args.db_path)
+    # تحميل بالجملة: بدون fsync ولا ملف journal على القرص؛ الملف يُعاد توليده إن انقطع
+    conn.execute('PRAGMA journal_mode=MEMORY')
+    conn.execute('PRAGMA synchronous=OFF')
+    migrations.migrate(conn)
+    with conn:
+        summary = generate(conn, scale['users'], scale['courses'], scale['lessons'], seed=args.seed,
+                           password=args.password, scrypt_n=args.scrypt_n, compile_html=not args.no_html)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.close()
+    summary['bytes'] = os.path.getsize(args.db_path)
+    print(json.dumps(summary, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
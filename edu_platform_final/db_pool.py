@@ -0,0 +1,88 @@
+import os
+import queue
+import sqlite3
+import threading
+
+# === إعدادات SQLite الافتراضية لكل اتصال ===
+# WAL يسمح للقرّاء بالعمل أثناء الكتابة (mark_watched / enroll) دون حجب
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',       # آمن مع WAL ويقلل fsync لكل commit
+    'cache_size': -16000,          # ~16MB ذاكرة صفحات لكل اتصال
+    'mmap_size': 128 * 1024 * 1024,
+    'busy_timeout': 5000,          # انتظار القفل بدل رمي "database is locked"
+    'temp_store': 'MEMORY',
+}
+
+
+def connect(path, pragmas=None, cached_statements=256, on_connect=None):
+    """فتح اتصال جديد مهيأ بالـ PRAGMA المطلوبة.
+
+    on_connect: دالة اختيارية تُستدعى مع الاتصال الجديد (تسجيل دوال SQL مثلاً).
+    """
+    conn = sqlite3.connect(path, check_same_thread=False,
+                           cached_statements=cached_statements)
+    conn.row_factory = sqlite3.Row
+    for name, value in (pragmas or DEFAULT_PRAGMAS).items():
+        conn.execute(f'PRAGMA {name}={value}')
+    if on_connect is not None:
+        on_connect(conn)
+    return conn
+
+
+class ConnectionPool:
+    """مجمّع اتصالات بسيط: يعيد استخدام الاتصالات بين الطلبات داخل نفس العملية.
+
+    كل عامل (process) يملك مجمّعه الخاص؛ بعد fork يتم تجاهل الاتصالات الموروثة.
+    """
+
+    def __init__(self, path, size=8, pragmas=None, cached_statements=256, on_connect=None):
+        self.path = path
+        self.on_connect = on_connect
+        self.size = size
+        self.pragmas = dict(pragmas or DEFAULT_PRAGMAS)
+        self.cached_statements = cached_statements
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue(maxsize=self.size)
+        self._created = 0
+
+    def acquire(self):
+        if self._pid != os.getpid():
+            # عملية ابنة بعد fork: لا نشارك اتصالات الأب
+            with self._lock:
+                self._reset()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                self._created += 1
+            return connect(self.path, self.pragmas, self.cached_statements, self.on_connect)
+
+    def release(self, conn):
+        if self._pid != os.getpid():
+            return
+        try:
+            # لا نعيد اتصالاً بمعاملة مفتوحة إلى المجمّع
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put_nowait(conn)
+        except (queue.Full, sqlite3.Error):
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+    def stats(self):
+        return {'size': self.size, 'created': self._created, 'idle': self._idle.qsize()}
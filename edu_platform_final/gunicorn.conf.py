@@ -0,0 +1,39 @@
+# إعداد gunicorn للإنتاج (يُقرأ تلقائياً من هذا المجلد):  gunicorn wsgi:app
+# كل قيمة قابلة للتغيير من البيئة؛ انظر قسم "Serving" في README.
+#   WEB_WORKERS       عمليات (افتراضياً عدد المعالجات، 2 على الأقل حتى لا يبقى الموقع بلا عامل أثناء الاستبدال)
+#   WEB_THREADS       خيوط لكل عملية (gthread): انتظار SQLite و scrypt وبث الفيديو لا يحجز العملية كلها
+#   PRELOAD_APP       1 = تحميل التطبيق وتهيئته مرة في الأم ثم fork (ذاكرة مشتركة copy-on-write)
+#   GRACEFUL_TIMEOUT  ثوانٍ ينتظرها العامل القديم عند HUP/TERM لإكمال الطلبات الجارية (بث الفيديو)
+import gc
+import os
+
+bind = os.environ.get('BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('WEB_WORKERS', max(2, os.cpu_count() or 1)))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 8))
+preload_app = os.environ.get('PRELOAD_APP', '1') == '1'
+keepalive = int(os.environ.get('KEEPALIVE', 5))
+timeout = int(os.environ.get('WEB_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', 120))
+backlog = int(os.environ.get('WEB_BACKLOG', 2048))
+# نبض العمال في tmpfs بدل القرص (يتجنب توقف العامل على fsync بطيء)
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+accesslog = os.environ.get('ACCESS_LOG') or None
+errorlog = '-'
+
+
+def when_ready(server):
+    if os.environ.get('RATE_LIMIT_BACKEND') == 'memory' and server.cfg.workers > 1:
+        # دلاء لكل عامل: الحد الفعلي يتضاعف بعدد العمال
+        server.log.warning('RATE_LIMIT_BACKEND=memory with %d workers multiplies every rate limit '
+                           'by %d; use RATE_LIMIT_BACKEND=sqlite', server.cfg.workers, server.cfg.workers)
+    # كائنات التطبيق المحمّل في الأم خارج جامع المهملات: لا يلمس صفحاتها في العمال فتبقى مشتركة
+    if preload_app:
+        gc.collect()
+        gc.freeze()
+
+
+def worker_exit(server, worker):
+    # خروج لطيف (HUP/TERM): أحداث التقدم المعلقة والمهام الجارية قبل انتهاء العملية
+    import app as webapp
+    webapp.stop_background()
@@ -0,0 +1,150 @@
+# === مشتقات الصور (صور الدورات وشرائح الصفحة الرئيسية) ===
+# لكل صورة في المخزن (media.py) نُولّد نسخاً بعدة عروض وبصيغ AVIF / WebP مع JPEG احتياطي:
+#   derived/ab/cd/<sha256>-<العرض>.<الصيغة>
+# - التوليد في طابور المهام (jobs.py) خارج خيط الطلب؛ الصفحة تعرض الأصل حتى يكتمل
+# - الاسم مبني على بصمة الأصل: نفس الصورة لا تُعالج مرتين، والملفات تُقدَّم كـ immutable
+# - اكتمال التوليد يُسجَّل في media_blobs.derivatives (JSON) فترفع triggers مراجعة الصفحات
+# Pillow اختياري: بدونه تبقى الصور الأصلية كما كانت.
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import media
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    Image = None
+
+WIDTHS = (320, 640, 1024, 1600)
+# الترتيب = ترتيب <source> في <picture>؛ jpg آخراً لأنه الاحتياطي في <img srcset>
+FORMATS = {
+    'avif': ('AVIF', 'image/avif', {'quality': 50, 'speed': 8}),
+    'webp': ('WEBP', 'image/webp', {'quality': 75, 'method': 4}),
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 80, 'optimize': True, 'progressive': True}),
+}
+
+
+def available_formats():
+    if Image is None:
+        return []
+    return [ext for ext in FORMATS if ext == 'jpg' or features.check(ext)]
+
+
+def target_widths(width):
+    """العروض الأصغر من الأصل، ثم الأصل نفسه (بحد أقصى WIDTHS[-1]) — لا تكبير أبداً."""
+    widths = [w for w in WIDTHS if w < width]
+    return widths + [min(width, WIDTHS[-1])]
+
+
+def _save(img, path, ext):
+    fmt, _, options = FORMATS[ext]
+    if fmt == 'JPEG' and img.mode != 'RGB':
+        img = img.convert('RGB')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=media.PART_SUFFIX)
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            img.save(fh, fmt, **options)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def generate(directory, name):
+    """توليد مشتقات name الناقصة؛ يعيد وصفها (للعمود derivatives) أو None إن لم تكن صورة."""
+    formats = available_formats()
+    if not formats:
+        return None
+    try:
+        src = Image.open(os.path.join(directory, name))
+        src = ImageOps.exif_transpose(src)
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        return None
+    if getattr(src, 'is_animated', False):
+        return None  # GIF متحرك: يبقى الأصل
+    with src:
+        if src.mode not in ('RGB', 'RGBA'):
+            src = src.convert('RGBA' if 'transparency' in src.info or src.mode in ('LA', 'PA') else 'RGB')
+        widths = target_widths(src.width)
+        for width in widths:
+            resized = None
+            for ext in formats:
+                path = os.path.join(directory, media.derived_name(name, width, ext))
+                if os.path.exists(path):
+                    continue
+                if resized is None:
+                    height = max(1, round(src.height * width / src.width))
+                    resized = src if width == src.width else src.resize((width, height), Image.LANCZOS,
+                                                                         reducing_gap=3.0)
+                _save(resized, path, ext)
+        return {'w': src.width, 'h': src.height, 'widths': widths, 'formats': formats}
+
+
+def record(conn, name, info):
+    conn.execute('UPDATE media_blobs SET derivatives = ? WHERE name = ?',
+                 (json.dumps(info, separators=(',', ':')), name))
+    conn.commit()
+
+
+def image_sources(name, derivatives, url):
+    """[(mime, srcset), ...] لعنصر <picture>؛ الأخير JPEG للـ <img>. قائمة فارغة = الأصل فقط.
+
+    url: دالة تحوّل اسم الملف في المخزن إلى رابط (url_for('uploaded_file', ...)).
+    """
+    if not name or not derivatives:
+        return []
+    info = json.loads(derivatives)
+    sources = []
+    for ext in info['formats']:
+        srcset = ', '.join(f'{url(media.derived_name(name, w, ext))} {w}w' for w in info['widths'])
+        sources.append((FORMATS[ext][1], srcset))
+    return sources
+
+
+def backfill(conn, directory, workers=2):
+    """توليد مشتقات كل صور الدورات والشرائح التي لم تُعالج بعد؛ يعيد عدد الصور."""
+    names = [row[0] for row in conn.execute("""
+        SELECT b.name FROM media_blobs b
+        WHERE b.derivatives IS NULL
+          AND (b.name IN (SELECT image FROM courses) OR b.name IN (SELECT image_path FROM hero_slides))
+    """)]
+    done = 0
+    with ThreadPoolExecutor(max(1, workers)) as pool:
+        for name, info in zip(names, pool.map(lambda n: generate(directory, n), names)):
+            if info is not None:
+                record(conn, name, info)
+                done += 1
+    return done
+
+
+if __name__ == '__main__':
+    import sqlite3
+    import sys
+
+    import migrations
+
+    usage = 'usage: python images.py --backfill [--workers N] [--uploads DIR] [db_path]'
+    args = sys.argv[1:]
+    upload_dir = migrations.upload_dir_arg(args)
+    workers = os.cpu_count() or 2
+    if '--workers' in args:
+        i = args.index('--workers')
+        workers = int(args[i + 1])
+        del args[i:i + 2]
+    if '--backfill' not in args:
+        print(usage)
+        sys.exit(2)
+    if Image is None:
+        print('❌ Pillow is not installed (pip install Pillow)')
+        sys.exit(1)
+    paths = [a for a in args if not a.startswith('--')]
+    conn = sqlite3.connect(paths[0] if paths else migrations.DEFAULT_DB_PATH)
+    conn.row_factory = sqlite3.Row
+    migrations.migrate(conn, upload_dir)
+    print(f'✅ generated derivatives for {backfill(conn, upload_dir, workers)} images '
+          f'({", ".join(available_formats())})')
+    conn.close()
@@ -0,0 +1,272 @@
+# === طابور مهام محلي فوق SQLite (بدون وسيط خارجي) ===
+# للأعمال البطيئة في لوحة الإدارة: حذف ملفات الدورات، توليد مشتقات الصور، تنظيف الملفات.
+#   enqueue()  يُدرج المهمة ضمن معاملة المستدعي: تُنفَّذ فقط إن نجح التعديل نفسه
+#   lease()    يحجز مهمة لعامل لمدة محددة (BEGIN IMMEDIATE: عامل واحد لكل مهمة)
+#   Worker     خيوط بعدد محدود تحجز وتنفّذ؛ داخل عملية التطبيق أو مستقلة: python jobs.py --work
+# التسليم "مرة على الأقل": عامل مات أثناء التنفيذ ← ينتهي الحجز وتعود المهمة لعامل آخر،
+# لذا يجب أن تكون المعالجات قابلة للتكرار دون ضرر (idempotent).
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+LEASE_SECONDS = 300
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 3600
+STATUSES = ('queued', 'running', 'done', 'failed')
+
+# kind → handler(conn, payload)؛ تُسجَّل في app.py عبر @jobs.task('kind')
+HANDLERS = {}
+
+
+def task(kind):
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def enqueue(conn, kind, payload=None, delay=0, max_attempts=5, unique=False, now=None):
+    """إضافة مهمة (بدون commit). unique: لا تُكرر مهمة مماثلة ما زالت في الانتظار."""
+    now = time.time() if now is None else now
+    payload = json.dumps(payload or {}, sort_keys=True, separators=(',', ':'))
+    if unique:
+        row = conn.execute("SELECT id FROM jobs WHERE kind = ? AND payload = ? AND status = 'queued'",
+                           (kind, payload)).fetchone()
+        if row:
+            return row[0]
+    return conn.execute("""
+        INSERT INTO jobs (kind, payload, run_after, max_attempts, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (kind, payload, now + delay, max_attempts, now, now)).lastrowid
+
+
+def get(conn, job_id):
+    return conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+
+
+def lease(conn, owner, lease_seconds=LEASE_SECONDS, now=None):
+    """حجز أقدم مهمة جاهزة (أو حجز منتهٍ لعامل توقف)؛ يعيد الصف أو None."""
+    now = time.time() if now is None else now
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # حجز منتهٍ بعد آخر محاولة مسموحة: العامل مات أثناء التنفيذ في كل المحاولات
+        conn.execute("""
+            UPDATE jobs SET status = 'failed', last_error = 'lease expired', finished_at = ?,
+                            updated_at = ?, leased_until = NULL
+            WHERE status = 'running' AND leased_until < ? AND attempts >= max_attempts
+        """, (now, now, now))
+        job = conn.execute("""
+            SELECT id FROM jobs WHERE status = 'queued' AND run_after <= ?
+            UNION ALL
+            SELECT id FROM jobs WHERE status = 'running' AND leased_until < ?
+            ORDER BY id LIMIT 1
+        """, (now, now)).fetchone()
+        if job is not None:
+            conn.execute("""
+                UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_owner = ?,
+                                leased_until = ?, updated_at = ?
+                WHERE id = ?
+            """, (owner, now + lease_seconds, now, job[0]))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return get(conn, job[0]) if job is not None else None
+
+
+def complete(conn, job, now=None):
+    now = time.time() if now is None else now
+    # شرط المالك: إن انتهى حجزنا وأخذ المهمة عامل آخر فالنتيجة له
+    cur = conn.execute("""
+        UPDATE jobs SET status = 'done', finished_at = ?, updated_at = ?, leased_until = NULL,
+                        last_error = NULL
+        WHERE id = ? AND status = 'running' AND lease_owner = ?
+    """, (now, now, job['id'], job['lease_owner']))
+    conn.commit()
+    return cur.rowcount == 1
+
+
+def fail(conn, job, error, now=None):
+    """إعادة المهمة للطابور بتأخير أُسّي، أو failed بعد آخر محاولة."""
+    now = time.time() if now is None else now
+    if job['attempts'] >= job['max_attempts']:
+        status, run_after = 'failed', job['run_after']
+    else:
+        status = 'queued'
+        run_after = now + min(RETRY_BASE_SECONDS * 2 ** (job['attempts'] - 1), RETRY_MAX_SECONDS)
+    conn.execute("""
+        UPDATE jobs SET status = ?, run_after = ?, last_error = ?, updated_at = ?, leased_until = NULL,
+                        finished_at = CASE WHEN ? = 'failed' THEN ? END
+        WHERE id = ? AND status = 'running' AND lease_owner = ?
+    """, (status, run_after, str(error)[:2000], now, status, now, job['id'], job['lease_owner']))
+    conn.commit()
+
+
+def retry(conn, job_id, now=None):
+    """إعادة مهمة فاشلة يدوياً (من صفحة المهام) بمحاولات جديدة."""
+    now = time.time() if now is None else now
+    cur = conn.execute("""
+        UPDATE jobs SET status = 'queued', attempts = 0, run_after = ?, updated_at = ?,
+                        finished_at = NULL
+        WHERE id = ? AND status = 'failed'
+    """, (now, now, job_id))
+    conn.commit()
+    return cur.rowcount == 1
+
+
+def run_job(conn, job):
+    """تنفيذ مهمة محجوزة وتسجيل نتيجتها؛ يعيد True إن نجحت."""
+    handler = HANDLERS.get(job['kind'])
+    try:
+        if handler is None:
+            raise LookupError(f"no handler for job kind {job['kind']!r}")
+        handler(conn, json.loads(job['payload']))
+    except Exception as e:
+        if conn.in_transaction:
+            conn.rollback()
+        log.exception('job %s (%s) failed', job['id'], job['kind'])
+        fail(conn, job, f'{type(e).__name__}: {e}')
+        return False
+    complete(conn, job)
+    return True
+
+
+def run_pending(conn, owner=None, limit=None):
+    """تنفيذ المهام الجاهزة في هذا الخيط حتى يفرغ الطابور (للأوامر والقياس)؛ يعيد عددها."""
+    owner = owner or default_owner()
+    done = 0
+    while limit is None or done < limit:
+        job = lease(conn, owner)
+        if job is None:
+            break
+        run_job(conn, job)
+        done += 1
+    return done
+
+
+def stats(conn):
+    counts = dict.fromkeys(STATUSES, 0)
+    counts.update(conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+    return counts
+
+
+def prune(conn, days=7, now=None):
+    """حذف المهام المنتهية بنجاح الأقدم من days يوماً."""
+    now = time.time() if now is None else now
+    cur = conn.execute("DELETE FROM jobs WHERE status = 'done' AND finished_at < ?", (now - days * 86400,))
+    conn.commit()
+    return cur.rowcount
+
+
+def default_owner():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+class Worker:
+    """عدد محدود من الخيوط، لكل منها اتصال SQLite خاص؛ notify() يوقظها فوراً بعد enqueue."""
+
+    def __init__(self, connect, concurrency=2, poll_interval=2.0, lease_seconds=LEASE_SECONDS):
+        self.connect = connect
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.concurrency):
+            t = threading.Thread(target=self._loop, name=f'jobs-{i}', daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def notify(self):
+        self._wake.set()
+
+    def stop(self, wait=True):
+        self._stop.set()
+        self._wake.set()
+        if wait:
+            for t in self._threads:
+                t.join()
+
+    def join(self):
+        for t in self._threads:
+            while t.is_alive():
+                t.join(0.5)  # مهلة قصيرة ليصل KeyboardInterrupt
+
+    def _loop(self):
+        conn = self.connect()
+        owner = default_owner()
+        try:
+            while not self._stop.is_set():
+                try:
+                    job = lease(conn, owner, self.lease_seconds)
+                except Exception:
+                    log.exception('job lease failed')
+                    job = None
+                if job is not None:
+                    # complete()/fail() قد يفشلان (قاعدة مقفلة...): لا يموت الخيط، والحجز ينتهي فتعود المهمة
+                    try:
+                        run_job(conn, job)
+                    except Exception:
+                        if conn.in_transaction:
+                            conn.rollback()
+                        log.exception('job %s (%s) could not be recorded', job['id'], job['kind'])
+                    continue
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    import signal
+    import sys
+
+    import app as webapp  # تسجيل المعالجات (@jobs.task) وإعدادات قاعدة البيانات
+    import jobs  # نسخة الوحدة التي سُجّلت فيها المعالجات (هذا الملف يعمل كـ __main__)
+
+    usage = ('usage: python jobs.py --work [--concurrency N] [db_path]\n'
+             '       python jobs.py --drain | --status | --prune [--days N] [db_path]')
+    args = sys.argv[1:]
+
+    def option(name, default):
+        if name in args:
+            i = args.index(name)
+            value = int(args[i + 1])
+            del args[i:i + 2]
+            return value
+        return default
+
+    concurrency = option('--concurrency', webapp.app.config['JOB_WORKERS'] or 2)
+    days = option('--days', 7)
+    paths = [a for a in args if not a.startswith('--')]
+    if paths:
+        webapp.app.config['DATABASE'] = paths[0]
+    webapp.app.config['JOB_WORKERS'] = 0  # لا عمال داخليين في هذه العملية غير المطلوب صراحة
+    if not {'--work', '--drain', '--status', '--prune'} & set(args):
+        print(usage)
+        sys.exit(2)
+    with webapp.app.app_context():
+        conn = webapp.get_db()  # يطبّق الترحيلات المعلقة
+        if '--work' in args:
+            worker = webapp.make_job_worker(concurrency).start()
+            print(f'✅ job worker running with {concurrency} threads (Ctrl+C to stop)')
+            signal.signal(signal.SIGTERM, lambda *_: worker.stop(wait=False))
+            try:
+                worker.join()
+            except KeyboardInterrupt:
+                worker.stop()
+        elif '--drain' in args:
+            print(f'✅ ran {jobs.run_pending(conn)} jobs')
+        elif '--status' in args:
+            print(jobs.stats(conn))
+        else:
+            print(f'✅ removed {jobs.prune(conn, days)} finished jobs older than {days} days')
@@ -0,0 +1,109 @@
+# === نسخة مُترجمة جاهزة من نصوص الدورات والدروس (Localized read model) ===
+# بدل CASE WHEN ?='en' THEN title_en ELSE title_ar END في كل استعلام للطالب:
+#   course_text (lang, course_id, title, short_desc, full_desc)
+#   lesson_text (lang, lesson_id, course_id, position, title, content)
+# صف لكل لغة، والاستعلامات تختار بالمساواة lang = ? على المفتاح (نفس نص SQL لكل اللغات).
+# الجداول تُحدَّث عند الكتابة بـ triggers على courses / lessons (مسارات الإدارة، seed، الاستيراد).
+# الترجمة الناقصة (NULL أو نص فارغ) تُملأ من اللغات الأخرى بترتيب LANGUAGES.
+#
+# إضافة لغة ثالثة: أضفها إلى LANGUAGES، وأضف أعمدة المصدر (title_fr ...) إن وُجدت،
+# ثم ترحيل جديد يستدعي install(conn). جداول الإسقاط والاستعلامات لا تتغير.
+
+# الأولى هي اللغة الافتراضية (لقيم ?lang= غير المعروفة)
+LANGUAGES = ('ar', 'en')
+
+# الجدول المصدر → (جدول الإسقاط، عمود المعرف، أعمدة منسوخة كما هي، الحقول المترجمة <field>_<lang>)
+PROJECTIONS = {
+    'courses': ('course_text', 'course_id', (), ('title', 'short_desc', 'full_desc')),
+    'lessons': ('lesson_text', 'lesson_id', ('course_id', 'position'), ('title', 'content')),
+}
+
+
+def resolve(lang):
+    return lang if lang in LANGUAGES else LANGUAGES[0]
+
+
+def fallbacks(lang):
+    """ترتيب البحث عن الترجمة: اللغة المطلوبة ثم البقية بترتيب LANGUAGES."""
+    return (lang,) + tuple(other for other in LANGUAGES if other != lang)
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+
+
+def _value_sql(prefix, field, lang, columns):
+    """COALESCE(NULLIF(NEW.title_en, ''), NULLIF(NEW.title_ar, ''), '')"""
+    parts = [f"NULLIF({prefix}{field}_{other}, '')" for other in fallbacks(lang)
+             if f'{field}_{other}' in columns]
+    return f"COALESCE({', '.join(parts + [repr('')])})"
+
+
+def _select_sql(conn, source, prefix, lang):
+    target, key, copied, fields = PROJECTIONS[source]
+    columns = _columns(conn, source)
+    values = [repr(lang), f'{prefix}id'] + [f'{prefix}{c}' for c in copied] + \
+             [_value_sql(prefix, f, lang, columns) for f in fields]
+    return ', '.join(values)
+
+
+def _insert_sql(conn, source, prefix, from_clause=''):
+    target, key, copied, fields = PROJECTIONS[source]
+    names = ', '.join(('lang', key) + copied + fields)
+    rows = ' UNION ALL '.join(f'SELECT {_select_sql(conn, source, prefix, lang)}{from_clause}'
+                              for lang in LANGUAGES)
+    return f'INSERT OR REPLACE INTO {target} ({names}) {rows};'
+
+
+def triggers(conn):
+    """triggers الإسقاط لكل جدول مصدر (تُولَّد من LANGUAGES وأعمدة المصدر الموجودة)."""
+    for source, (target, key, copied, fields) in PROJECTIONS.items():
+        columns = _columns(conn, source)
+        watched = ', '.join(sorted(copied + tuple(f'{f}_{lang}' for f in fields for lang in LANGUAGES
+                                                  if f'{f}_{lang}' in columns)))
+        upsert = _insert_sql(conn, source, 'NEW.')
+        # lang IN (...) ليستخدم المفتاح (lang, id) بدل مسح الجدول لكل صف محذوف
+        languages = ', '.join(map(repr, LANGUAGES))
+        delete = f'DELETE FROM {target} WHERE lang IN ({languages}) AND {key} = OLD.id;'
+        yield f'trg_{target}_insert', f"""CREATE TRIGGER trg_{target}_insert AFTER INSERT ON {source}
+                                           BEGIN {upsert} END"""
+        yield f'trg_{target}_update', f"""CREATE TRIGGER trg_{target}_update AFTER UPDATE OF {watched} ON {source}
+                                           BEGIN {upsert} END"""
+        yield f'trg_{target}_delete', f"""CREATE TRIGGER trg_{target}_delete AFTER DELETE ON {source}
+                                           BEGIN {delete} END"""
+
+
+def rebuild(conn):
+    """ملء جداول الإسقاط من الصفر (الترحيل، أو إصلاح بعد تعديل يدوي تجاوز triggers)."""
+    for source, (target, key, copied, fields) in PROJECTIONS.items():
+        conn.execute(f'DELETE FROM {target}')
+        conn.execute(_insert_sql(conn, source, '', f' FROM {source}'))
+
+
+def install(conn):
+    """(إعادة) إنشاء triggers من LANGUAGES الحالية ثم إعادة البناء — بعد إضافة لغة أو عمود ترجمة."""
+    for name, sql in triggers(conn):
+        conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+        conn.execute(sql)
+    rebuild(conn)
+
+
+if __name__ == '__main__':
+    import sqlite3
+    import sys
+
+    import migrations
+
+    args = sys.argv[1:]
+    if '--rebuild' not in args:
+        print('usage: python l10n.py --rebuild [db_path]')
+        sys.exit(2)
+    paths = [a for a in args if not a.startswith('--')]
+    conn = sqlite3.connect(paths[0] if paths else migrations.DEFAULT_DB_PATH)
+    migrations.migrate(conn)
+    with conn:
+        install(conn)
+    print('✅ localized projections rebuilt:',
+          {lang: conn.execute('SELECT COUNT(*) FROM course_text WHERE lang = ?', (lang,)).fetchone()[0]
+           for lang in LANGUAGES}, 'courses per language')
+    conn.close()
@@ -0,0 +1,256 @@
+# === محتوى الدروس مُجهَّز مسبقاً (HTML منقّى + رابط تضمين الفيديو) ===
+# content_ar / content_en نص HTML من نموذج الإدارة؛ بدل تمريره خاماً للقالب في كل زيارة
+# يُجهَّز مرة واحدة عند الحفظ (admin_lesson_new / admin_lesson_edit) لكل لغة:
+#   lesson_html (lang, lesson_id, title, html, embed_url, content_hash, version, compiled_at)
+#   - html: المحتوى بعد التنقية بقائمة سماح للوسوم والسمات (بدون script / style / on*= / javascript:)
+#   - embed_url: رابط youtube-nocookie الجاهز من video_url (بدل split() في القالب)
+#   - content_hash: بصمة كل ما يعرضه الدرس؛ جزء من ETag صفحة الدرس
+# العنوان والمحتوى من الإسقاط المترجم lesson_text (مع بديل اللغة الأخرى، l10n.py).
+# أي تعديل على الدرس خارج مسارات الإدارة يحذف صفوفه (trigger)، فيُجهَّز من جديد عند أول زيارة؛
+# وكذلك الصفوف المجهزة بنسخة أقدم من VERSION (بعد تغيير قواعد التنقية).
+import hashlib
+import html
+import re
+import time
+from html.parser import HTMLParser
+from urllib.parse import parse_qs, urlsplit
+
+import l10n
+
+# ارفعها عند تغيير التنقية أو صيغة التضمين: الصفوف الأقدم تُعامل كغير موجودة
+VERSION = 1
+
+ALLOWED_TAGS = {
+    'p', 'br', 'hr', 'div', 'span', 'strong', 'b', 'em', 'i', 'u', 's', 'sub', 'sup', 'small', 'mark',
+    'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'li', 'blockquote', 'pre', 'code',
+    'a', 'img', 'table', 'thead', 'tbody', 'tr', 'th', 'td', 'figure', 'figcaption',
+}
+VOID_TAGS = {'br', 'hr', 'img'}
+# وسوم يُحذف محتواها أيضاً (لا نص منها يظهر في الصفحة)
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'template', 'noscript', 'textarea', 'select'}
+ALLOWED_ATTRS = {
+    'a': {'href', 'title'},
+    'img': {'src', 'alt', 'title', 'width', 'height'},
+    'th': {'colspan', 'rowspan'},
+    'td': {'colspan', 'rowspan'},
+    '*': {'dir', 'lang'},
+}
+URL_ATTRS = {'href', 'src'}
+SAFE_URL_SCHEMES = {'', 'http', 'https', 'mailto'}
+
+YOUTUBE_ID_RE = re.compile(r'^[A-Za-z0-9_-]{6,20}$')
+YOUTUBE_HOSTS = {'youtube.com', 'www.youtube.com', 'm.youtube.com', 'youtu.be', 'www.youtube-nocookie.com'}
+# modestbranding / rel=0 / showinfo=0 / iv_load_policy=3 / disablekb=1: أقل قدر من واجهة يوتيوب
+EMBED_URL = ('https://www.youtube-nocookie.com/embed/{}'
+             '?modestbranding=1&rel=0&showinfo=0&iv_load_policy=3&disablekb=1')
+
+
+def _safe_url(value):
+    value = value.strip()
+    # المتصفحات تتجاهل المسافات والأسطر داخل المخطط (java\nscript:)
+    scheme = urlsplit(re.sub(r'[\x00-\x20]', '', value)).scheme.lower()
+    return value if scheme in SAFE_URL_SCHEMES else None
+
+
+class _Sanitizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self.open = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.skipping += 1
+            return
+        if self.skipping or tag not in ALLOWED_TAGS:
+            return
+        allowed = ALLOWED_ATTRS.get(tag, set()) | ALLOWED_ATTRS['*']
+        parts = [tag]
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRS:
+                value = _safe_url(value)
+                if value is None:
+                    continue
+            parts.append(f'{name}="{html.escape(value)}"')
+        if tag == 'a':
+            parts.append('rel="noopener noreferrer" target="_blank"')
+        self.out.append(f"<{' '.join(parts)}>")
+        if tag not in VOID_TAGS:
+            self.open.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open and self.open[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.skipping = max(self.skipping - 1, 0)
+            return
+        if self.skipping or tag not in self.open:
+            return
+        # إغلاق الوسوم المفتوحة داخله أيضاً لتبقى القطعة متوازنة
+        while self.open:
+            name = self.open.pop()
+            self.out.append(f'</{name}>')
+            if name == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.out.append(html.escape(data, quote=False))
+
+    def result(self):
+        self.close()
+        return ''.join(self.out) + ''.join(f'</{t}>' for t in reversed(self.open))
+
+
+def sanitize(text):
+    """HTML من المحرر → HTML آمن للعرض كما هو (|safe)."""
+    if not text:
+        return ''
+    parser = _Sanitizer()
+    parser.feed(text)
+    return parser.result()
+
+
+def youtube_id(url):
+    """معرف الفيديو من watch?v= أو youtu.be/ أو embed/؛ None لغير ذلك."""
+    if not url:
+        return None
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host not in YOUTUBE_HOSTS:
+        return None
+    if host == 'youtu.be':
+        candidate = parts.path.strip('/').split('/')[0]
+    elif parts.path.startswith(('/embed/', '/shorts/', '/live/')):
+        candidate = parts.path.split('/')[2]
+    else:
+        candidate = (parse_qs(parts.query).get('v') or [''])[0]
+    return candidate if YOUTUBE_ID_RE.match(candidate) else None
+
+
+def embed_url(url):
+    video_id = youtube_id(url)
+    return EMBED_URL.format(video_id) if video_id else None
+
+
+def content_hash(*parts):
+    return hashlib.sha1(repr((VERSION,) + parts).encode('utf-8')).hexdigest()[:20]
+
+
+SOURCE_SQL = """
+    SELECT t.lang, t.lesson_id, t.title, t.content, l.video, l.video_url
+    FROM lesson_text t JOIN lessons l ON l.id = t.lesson_id
+"""
+STORE_SQL = """
+    INSERT OR REPLACE INTO lesson_html
+        (lang, lesson_id, title, html, embed_url, content_hash, version, compiled_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+# صفحة الدرس: البصمة قبل فحص 304 (NULL = غير مجهز أو بنسخة أقدم)، ثم القطعة المجهزة
+HEAD_SQL = """
+    SELECT l.course_id, h.content_hash, h.compiled_at
+    FROM lessons l
+    LEFT JOIN lesson_html h ON h.lang = ? AND h.lesson_id = l.id AND h.version = ?
+    WHERE l.id = ?
+"""
+PAGE_SQL = """
+    SELECT l.id, l.course_id, l.video, h.title, h.html, h.embed_url
+    FROM lesson_html h JOIN lessons l ON l.id = h.lesson_id
+    WHERE h.lang = ? AND h.lesson_id = ?
+"""
+
+
+def _compiled(row, now):
+    lang, lesson_id, title, content, video, video_url = row
+    body = sanitize(content)
+    embed = embed_url(video_url)
+    return (lang, lesson_id, title, body, embed, content_hash(title, body, embed, video), VERSION, now)
+
+
+def compile_lesson(conn, lesson_id, lang=None):
+    """تجهيز الدرس (لكل اللغات أو لغة واحدة) داخل معاملة المستدعي."""
+    langs = (l10n.resolve(lang),) if lang else l10n.LANGUAGES
+    rows = conn.execute(SOURCE_SQL + f" WHERE t.lang IN ({', '.join('?' * len(langs))}) AND t.lesson_id = ?",
+                        (*langs, lesson_id))
+    now = int(time.time())
+    conn.executemany(STORE_SQL, [_compiled(row, now) for row in rows])
+
+
+def rebuild(conn, batch=500):
+    """تجهيز كل الدروس من جديد (الترحيل وأمر --rebuild)."""
+    conn.execute('DELETE FROM lesson_html')
+    now = int(time.time())
+    cur = conn.execute(SOURCE_SQL)
+    while True:
+        rows = cur.fetchmany(batch)
+        if not rows:
+            break
+        conn.executemany(STORE_SQL, [_compiled(row, now) for row in rows])
+
+
+def compile_missing(conn, batch=500):
+    """تجهيز الدروس التي لا نسخة لها بالإصدار الحالي فقط (تسخين الكاش عند تشغيل الخادم)؛ يعيد عددها."""
+    cur = conn.execute(SOURCE_SQL + """
+        WHERE NOT EXISTS (SELECT 1 FROM lesson_html h
+                          WHERE h.lang = t.lang AND h.lesson_id = t.lesson_id AND h.version = ?)
+    """, (VERSION,))
+    now, count = int(time.time()), 0
+    while True:
+        rows = cur.fetchmany(batch)
+        if not rows:
+            return count
+        conn.executemany(STORE_SQL, [_compiled(row, now) for row in rows])
+        count += len(rows)
+
+
+def invalidation_triggers(conn):
+    """تعديل الدرس خارج مسارات الإدارة أو حذفه يحذف نسخه المجهزة (تُجهَّز عند الزيارة التالية)."""
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(lessons)')}
+    watched = ', '.join([f'{field}_{lang}' for field in ('title', 'content') for lang in l10n.LANGUAGES
+                         if f'{field}_{lang}' in columns] + ['video', 'video_url'])
+    languages = ', '.join(map(repr, l10n.LANGUAGES))
+    delete = f'DELETE FROM lesson_html WHERE lang IN ({languages}) AND lesson_id = OLD.id;'
+    yield 'trg_lesson_html_update', f"""CREATE TRIGGER trg_lesson_html_update
+        AFTER UPDATE OF {watched} ON lessons
+        BEGIN {delete} END"""
+    yield 'trg_lesson_html_delete', f"""CREATE TRIGGER trg_lesson_html_delete
+        AFTER DELETE ON lessons
+        BEGIN {delete} END"""
+
+
+def install(conn):
+    """(إعادة) إنشاء triggers الإبطال من LANGUAGES الحالية ثم التجهيز الكامل."""
+    for name, sql in invalidation_triggers(conn):
+        conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+        conn.execute(sql)
+    rebuild(conn)
+
+
+if __name__ == '__main__':
+    import sqlite3
+    import sys
+
+    import migrations
+
+    args = sys.argv[1:]
+    if '--rebuild' not in args:
+        print('usage: python lesson_html.py --rebuild [db_path]')
+        sys.exit(2)
+    paths = [a for a in args if not a.startswith('--')]
+    conn = sqlite3.connect(paths[0] if paths else migrations.DEFAULT_DB_PATH)
+    conn.row_factory = sqlite3.Row
+    migrations.migrate(conn)
+    t0 = time.perf_counter()
+    with conn:
+        rebuild(conn)
+    print('✅ lesson HTML rebuilt:', conn.execute('SELECT COUNT(*) FROM lesson_html').fetchone()[0],
+          f'fragments in {time.perf_counter() - t0:.1f}s')
+    conn.close()
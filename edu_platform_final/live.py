@@ -0,0 +1,386 @@
+# === الواجهة الحية (ASGI): اتصالات طويلة بجانب تطبيق Flask ===
+# gunicorn يحجز خيطاً لكل طلب جارٍ؛ هنا كل اتصال coroutine في حلقة asyncio واحدة، فآلاف الاتصالات
+# الخاملة في عملية واحدة لا تكلف إلا ذاكرتها.
+#   GET  {LIVE_URL}/admin/enroll_requests     SSE للمدير: طلبات التسجيل المعلقة الجديدة (Last-Event-ID للاستئناف)
+#   POST {LIVE_URL}/lessons/<id>/heartbeat    موضع المشاهدة من lesson_page.html كل LIVE_HEARTBEAT_INTERVAL ثانية
+#   GET  {LIVE_URL}/lessons/<id>/position     آخر موضع محفوظ (استئناف الفيديو)
+# - الهوية من كوكي جلسة Flask نفسها (نفس SECRET_KEY)، فلا تسجيل دخول ثانٍ
+# - SQLite متزامن: الاستعلامات في asyncio.to_thread؛ استطلاع واحد لكل عملية كل LIVE_POLL_INTERVAL مهما كان
+#   عدد المشتركين، و PRAGMA data_version يتخطى الاستعلام إن لم يكتب أحد في القاعدة
+# - النبضات تُدمج في الذاكرة (آخر موضع لكل طالب ودرس) وتُكتب كل LIVE_FLUSH_INTERVAL في معاملة واحدة بإعادة
+#   التحقق من الالتحاق؛ بلوغ LIVE_COMPLETE_RATIO من المدة يسجل الإكمال عبر ProgressWriter مثل mark_watched
+# التشغيل: python live.py [port] (أو uvicorn live:app --port 8001 --timeout-graceful-shutdown 5)، وخلف nginx:
+#   location /live/ { proxy_pass http://127.0.0.1:8001; proxy_buffering off; proxy_read_timeout 1h; }
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+import sys
+import time
+from http.cookies import CookieError, SimpleCookie
+
+from itsdangerous import BadSignature
+
+import app as webapp
+import migrations
+import pagination
+import progress
+from db_pool import ConnectionPool, connect as connect_db
+from progress_writer import ProgressWriter
+
+log = logging.getLogger(__name__)
+config = webapp.app.config
+
+PREFIX = config['LIVE_URL'] or '/live'
+MAX_BODY = 1024
+# أحداث بانتظار مشترك لا يقرأ؛ بعدها يُغلق اتصاله ويستأنف المتصفح بـ Last-Event-ID
+MAX_QUEUED = 64
+BACKLOG_LIMIT = 500
+
+
+# === الهوية من كوكي جلسة Flask ===
+def session_user(scope):
+    """معرّف المستخدم من كوكي الجلسة الموقّع، أو None."""
+    raw = b'; '.join(v for k, v in scope['headers'] if k == b'cookie').decode('latin-1')
+    try:
+        morsel = SimpleCookie(raw).get(config['SESSION_COOKIE_NAME'])
+    except CookieError:
+        return None
+    if morsel is None:
+        return None
+    serializer = webapp.app.session_interface.get_signing_serializer(webapp.app)
+    try:
+        data = serializer.loads(morsel.value, max_age=int(webapp.app.permanent_session_lifetime.total_seconds()))
+        return int(data['_user_id'])
+    except (BadSignature, KeyError, TypeError, ValueError):
+        return None
+
+
+def header(scope, name):
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+async def respond(send, status, body=b'', content_type=b'application/json'):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', content_type), (b'cache-control', b'no-store')]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        body += message.get('body', b'')
+        if len(body) > MAX_BODY:
+            return False
+        if not message.get('more_body'):
+            return body
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+# === طلبات التسجيل الجديدة: استطلاع واحد يُوزَّع على كل المشتركين ===
+class EnrollRequestFeed:
+    def __init__(self, path, pool, interval):
+        self.path = path
+        self.pool = pool
+        self.interval = interval
+        self.subscribers = set()
+        self.last_id = 0
+        self._conn = None  # اتصال خاص: data_version يُقارن على نفس الاتصال فقط
+        self._version = None
+        self._rows = webapp.app.jinja_env.get_template('admin/_request_rows.html')
+        self.counters = {'polls': 0, 'queries': 0, 'events': 0, 'dropped': 0}
+
+    def _events(self, conn, after):
+        # (id, bytes) جاهزة للإرسال: تُبنى مرة للدفعة وتُشارك بين كل المشتركين
+        events = []
+        while True:
+            rows, more = pagination.fetch(conn, pagination.PENDING_REQUESTS_SQL, (), pagination.PENDING_REQUESTS_KEY,
+                                          (after,), BACKLOG_LIMIT)
+            for row in rows:
+                data = json.dumps({'id': row['id'], 'user_id': row['user_id'], 'course_id': row['course_id'],
+                                   'html': self._rows.render(requests=[row])}, ensure_ascii=False)
+                events.append((row['id'], f'id: {row["id"]}\nevent: enroll_request\ndata: {data}\n\n'.encode()))
+                after = row['id']
+            if more is None or len(events) >= BACKLOG_LIMIT:
+                return events
+
+    def _poll(self):
+        if self._conn is None:
+            self._conn = connect_db(self.path)
+            self.last_id = self._conn.execute('SELECT COALESCE(MAX(id), 0) FROM enroll_requests').fetchone()[0]
+        self.counters['polls'] += 1
+        version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+        if version == self._version:
+            return []
+        self._version = version
+        self.counters['queries'] += 1
+        events = self._events(self._conn, self.last_id)
+        if events:
+            self.last_id = events[-1][0]
+        return events
+
+    def since(self, after):
+        """الأحداث بعد Last-Event-ID لمشترك عاد بعد انقطاع."""
+        conn = self.pool.acquire()
+        try:
+            return self._events(conn, after)
+        finally:
+            self.pool.release(conn)
+
+    async def run(self):
+        await asyncio.to_thread(self._poll)
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                events = await asyncio.to_thread(self._poll)
+            except Exception:
+                log.exception('enroll request poll failed')
+                continue
+            if not events:
+                continue
+            self.counters['events'] += len(events)
+            for queue in list(self.subscribers):
+                if queue.qsize() >= MAX_QUEUED:
+                    self.subscribers.discard(queue)
+                    self.counters['dropped'] += 1
+                    queue.put_nowait(None)
+                else:
+                    queue.put_nowait(events)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+
+
+# === مواضع المشاهدة: آخر نبضة لكل (طالب، درس) ثم كتابة مجمّعة ===
+class PositionBuffer:
+    def __init__(self, pool, interval):
+        self.pool = pool
+        self.interval = interval
+        self._pending = {}
+        self.counters = {'heartbeats': 0, 'written': 0, 'batches': 0, 'errors': 0}
+
+    def add(self, user_id, lesson_id, position, duration):
+        self._pending[(user_id, lesson_id)] = (position, duration, int(time.time()))
+        self.counters['heartbeats'] += 1
+
+    def get(self, user_id, lesson_id):
+        return self._pending.get((user_id, lesson_id))
+
+    def _write(self, batch):
+        conn = self.pool.acquire()
+        try:
+            with conn:
+                conn.executemany(progress.SAVE_POSITION_CHECKED_SQL,
+                                 [(u, l, p, d, t) for (u, l), (p, d, t) in batch.items()])
+        finally:
+            self.pool.release(conn)
+
+    async def flush(self):
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except Exception:
+            # نبضة أحدث وصلت أثناء الكتابة تبقى؛ الأقدم تعود للمحاولة التالية
+            log.exception('watch position flush failed (%d rows)', len(batch))
+            self.counters['errors'] += 1
+            for key, value in batch.items():
+                self._pending.setdefault(key, value)
+            return
+        self.counters['written'] += len(batch)
+        self.counters['batches'] += 1
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+
+# === التطبيق ===
+class LiveApp:
+    def __init__(self):
+        self.pool = None
+        self.feed = None
+        self.positions = None
+        self.completions = None
+        self._tasks = []
+
+    def start(self):
+        if self._tasks:
+            return
+        path = config['DATABASE']
+        conn = connect_db(path)
+        try:
+            migrations.migrate(conn, config['UPLOAD_FOLDER'])
+        finally:
+            conn.close()
+        self.pool = ConnectionPool(path, size=4, on_connect=progress.register_functions)
+        self.feed = EnrollRequestFeed(path, self.pool, config['LIVE_POLL_INTERVAL'])
+        self.positions = PositionBuffer(self.pool, config['LIVE_FLUSH_INTERVAL'])
+        self.completions = ProgressWriter(lambda: connect_db(path, on_connect=progress.register_functions),
+                                          progress.get_store(config['PROGRESS_BACKEND']),
+                                          interval=config['LIVE_FLUSH_INTERVAL']).start()
+        self._tasks = [asyncio.ensure_future(self.feed.run()), asyncio.ensure_future(self.positions.run())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        if self.positions is not None:
+            await self.positions.flush()
+            self.completions.stop()
+            self.feed.close()
+            self.pool.close_all()
+
+    def stats(self):
+        return {'subscribers': len(self.feed.subscribers), 'feed': dict(self.feed.counters),
+                'positions': dict(self.positions.counters), 'completions': self.completions.stats()}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    self.start()
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await self.stop()
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+        self.start()  # خوادم بلا lifespan
+        path, method = scope['path'], scope['method']
+        if not path.startswith(PREFIX + '/'):
+            return await respond(send, 404, b'{"error": "not found"}')
+        path = path[len(PREFIX):]
+        if path == '/admin/enroll_requests' and method == 'GET':
+            return await self.enroll_requests(scope, receive, send)
+        match = re.fullmatch(r'/lessons/(\d+)/(heartbeat|position)', path)
+        if match and match[2] == 'heartbeat' and method == 'POST':
+            return await self.heartbeat(scope, receive, send, int(match[1]))
+        if match and match[2] == 'position' and method == 'GET':
+            return await self.position(scope, receive, send, int(match[1]))
+        return await respond(send, 404, b'{"error": "not found"}')
+
+    async def run_db(self, fn, *args):
+        def call():
+            conn = self.pool.acquire()
+            try:
+                return fn(conn, *args)
+            finally:
+                self.pool.release(conn)
+        return await asyncio.to_thread(call)
+
+    async def enroll_requests(self, scope, receive, send):
+        user_id = session_user(scope)
+        is_admin = user_id is not None and await self.run_db(
+            lambda conn: conn.execute('SELECT is_admin FROM users WHERE id = ?', (user_id,)).fetchone())
+        if not is_admin or not is_admin[0]:
+            return await respond(send, 403, b'{"error": "forbidden"}')
+        try:
+            sent = int(header(scope, b'last-event-id') or 0)
+        except ValueError:
+            sent = 0
+        queue = asyncio.Queue()
+        self.feed.subscribers.add(queue)
+        disconnect = asyncio.ensure_future(wait_disconnect(receive))
+        getter = None
+        try:
+            await send({'type': 'http.response.start', 'status': 200,
+                        'headers': [(b'content-type', b'text/event-stream; charset=utf-8'),
+                                    (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')]})
+            await send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+            events = await asyncio.to_thread(self.feed.since, sent) if sent else []
+            while True:
+                body = b''.join(data for event_id, data in events if event_id > sent)
+                if body:
+                    sent = events[-1][0]
+                    await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({getter, disconnect}, timeout=config['LIVE_PING_INTERVAL'],
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if disconnect in done:
+                    getter.cancel()
+                    return
+                if getter in done:
+                    events = getter.result()
+                    if events is None:
+                        break
+                else:
+                    getter.cancel()
+                    events = []
+                    await send({'type': 'http.response.body', 'body': b': ping\n\n', 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        except asyncio.CancelledError:
+            # إيقاف الخادم بعد timeout_graceful_shutdown: إنهاء البث فيعيد المتصفح الاتصال بعملية أخرى
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            self.feed.subscribers.discard(queue)
+            disconnect.cancel()
+            if getter is not None:
+                getter.cancel()
+
+    async def heartbeat(self, scope, receive, send, lesson_id):
+        user_id = session_user(scope)
+        if user_id is None:
+            return await respond(send, 401, b'{"error": "login required"}')
+        # JSON فقط: نموذج من موقع آخر لا يستطيع إرسال هذا النوع بدون CORS
+        if not (header(scope, b'content-type') or '').startswith('application/json'):
+            return await respond(send, 415, b'{"error": "expected application/json"}')
+        body = await read_body(receive)
+        if body is None:
+            return
+        if body is False:
+            return await respond(send, 413, b'{"error": "too large"}')
+        try:
+            data = json.loads(body)
+            position = float(data['position'])
+            duration = float(data['duration']) if data.get('duration') else None
+        except (ValueError, TypeError, KeyError):
+            return await respond(send, 400, b'{"error": "position required"}')
+        if not math.isfinite(position) or position < 0 or (duration is not None and not math.isfinite(duration)):
+            return await respond(send, 400, b'{"error": "invalid position"}')
+        self.positions.add(user_id, lesson_id, position, duration)
+        if duration and position >= duration * config['LIVE_COMPLETE_RATIO']:
+            self.completions.add(user_id, lesson_id)
+        await respond(send, 204)
+
+    async def position(self, scope, receive, send, lesson_id):
+        user_id = session_user(scope)
+        if user_id is None:
+            return await respond(send, 401, b'{"error": "login required"}')
+        pending = self.positions.get(user_id, lesson_id)
+        if pending is not None:
+            position, duration = pending[0], pending[1]
+        else:
+            row = await self.run_db(
+                lambda conn: conn.execute(progress.WATCH_POSITION_SQL, (user_id, lesson_id)).fetchone())
+            position, duration = (row[0], row[1]) if row else (None, None)
+        await respond(send, 200, json.dumps({'position': position, 'duration': duration}).encode())
+
+
+app = LiveApp()
+
+
+if __name__ == '__main__':
+    import uvicorn
+    args = sys.argv[1:]
+    port = int(args[0]) if args else int(os.environ.get('LIVE_PORT', 8001))
+    # اتصالات SSE لا تنتهي وحدها: عند الإيقاف تُقطع بعد 5 ثوانٍ ويعيد المتصفح الاتصال بـ Last-Event-ID
+    uvicorn.run('live:app', host=os.environ.get('LIVE_HOST', '127.0.0.1'), port=port,
+                log_level='warning', access_log=False, timeout_graceful_shutdown=5)
@@ -0,0 +1,286 @@
+# === مخزن الملفات المرفوعة وتقديمها (فيديو الدروس والصور) ===
+# التخزين: مخزن معنون بالمحتوى — ab/cd/<sha256>.<الامتداد> داخل مجلد الرفع
+#   - الكتابة في ملف مؤقت ثم rename ذري؛ رفع نفس المحتوى مرتين لا يكرر التخزين
+#   - جدول media_blobs يعدّ المراجع (triggers على lessons / courses / hero_slides / uploads)
+#     ولا يُحذف من القرص إلا ما لم يعد له مرجع (collect_garbage)
+#   - مشتقات الصور (images.py) في derived/ab/cd/<sha256>-<العرض>.<الصيغة> وتُحذف مع أصلها
+# التقديم:
+#   - Range / 206 حتى لا يعيد التقديم في الفيديو التحميل من البايت 0
+#   - Cache-Control طويل و immutable للأسماء المبنية على بصمة المحتوى
+#   - wsgi.file_wrapper: إرسال بدون نسخ (sendfile) على gunicorn
+#   - تفويض اختياري للإرسال إلى nginx (X-Accel-Redirect) أو Apache/lighttpd (X-Sendfile)
+import glob
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+import urllib.parse
+
+from flask import abort, current_app, request
+from werkzeug.security import safe_join
+from werkzeug.wsgi import wrap_file
+
+CHUNK_SIZE = 256 * 1024
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# محتوى الملف لا يتغير أبداً تحت هذا الاسم
+BLOB_NAME_RE = re.compile(r'^(derived/)?[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(-\d{1,5})?(\.[a-z0-9]{1,8})?$')
+DERIVED_DIR = 'derived'
+# ملفات قيد الكتابة (save_upload، و uploads.PARTIAL_DIR) لا تُقدَّم أبداً
+PART_SUFFIX = '.part'
+# مهلة قبل حذف ملف بلا مراجع: رفع جديد لنفس المحتوى قد يكون في طريقه لربطه بسجل
+GC_GRACE_SECONDS = 15 * 60
+# الأعمدة التي تشير إلى ملفات في المخزن (تستخدمها triggers العدّ وإعادة البناء)
+MEDIA_REFERENCES = [
+    ('lessons', 'video'),
+    ('courses', 'image'),
+    ('hero_slides', 'image_path'),
+    ('uploads', 'stored_name'),
+]
+
+
+def blob_name(filename, hexdigest):
+    """ab/cd/<sha256>.<الامتداد> — الامتداد من الاسم الأصلي ليبقى نوع المحتوى معروفاً."""
+    ext = os.path.splitext(filename or '')[1].lower()
+    ext = ext if re.fullmatch(r'\.[a-z0-9]{1,8}', ext) else ''
+    return f'{hexdigest[:2]}/{hexdigest[2:4]}/{hexdigest}{ext}'
+
+
+def derived_name(name, width, ext):
+    """derived/ab/cd/<sha256>-<width>.<ext> — نسخة مصغرة من ملف في المخزن."""
+    stem = os.path.splitext(name)[0]
+    return f'{DERIVED_DIR}/{stem}-{width}.{ext}'
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def register_blob(conn, name, size):
+    conn.execute("""
+        INSERT INTO media_blobs (name, size) VALUES (?, ?)
+        ON CONFLICT(name) DO UPDATE SET touched_at = CURRENT_TIMESTAMP
+    """, (name, size))
+
+
+def store_file(conn, directory, tmp_path, filename, hexdigest=None):
+    """نقل ملف مؤقت مكتمل (داخل directory) إلى المخزن وتسجيله؛ يعيد اسم الملف في المخزن."""
+    name = blob_name(filename, hexdigest or file_sha256(tmp_path))
+    final = os.path.join(directory, name)
+    os.makedirs(os.path.dirname(final), exist_ok=True)
+    size = os.path.getsize(tmp_path)
+    # التسجيل (touched_at) يسبق ظهور الملف فلا يحذفه collect_garbage متزامن
+    register_blob(conn, name, size)
+    conn.commit()
+    os.replace(tmp_path, final)
+    return name
+
+
+def save_upload(storage, directory, conn):
+    """حفظ ملف مرفوع (FileStorage) في المخزن دون تحميله كاملاً في الذاكرة؛ يعيد اسمه."""
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=PART_SUFFIX)
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: storage.stream.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                out.write(chunk)
+        return store_file(conn, directory, tmp, storage.filename, digest.hexdigest())
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def rebuild_refcounts(conn):
+    """إعادة حساب media_blobs.refcount من الأعمدة المرجعية."""
+    refs = ' UNION ALL '.join(f'SELECT {column} AS name FROM {table} WHERE {column} IS NOT NULL'
+                              for table, column in MEDIA_REFERENCES)
+    conn.execute(f"""
+        UPDATE media_blobs SET refcount = (
+            SELECT COUNT(*) FROM ({refs}) r WHERE r.name = media_blobs.name)
+    """)
+
+
+def _remove(directory, name):
+    stem = os.path.splitext(name)[0]
+    derived = glob.glob(os.path.join(directory, DERIVED_DIR, glob.escape(stem) + '-*'))
+    for path in [os.path.join(directory, name)] + derived:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def collect_garbage(conn, directory, grace=GC_GRACE_SECONDS):
+    """حذف الملفات التي لم يعد لها أي مرجع؛ يُستدعى بعد commit الحذف/الاستبدال."""
+    cutoff = f'-{int(grace)} seconds'
+    names = [row[0] for row in conn.execute(
+        "SELECT name FROM media_blobs WHERE refcount <= 0 AND touched_at <= datetime('now', ?)",
+        (cutoff,))]
+    if not names:
+        return 0
+    # الحذف من الجدول أولاً: رفعٌ متزامن لنفس المحتوى يجدد touched_at أو يعيد إدراج السجل
+    conn.executemany("DELETE FROM media_blobs WHERE name = ? AND refcount <= 0 "
+                     "AND touched_at <= datetime('now', ?)", [(n, cutoff) for n in names])
+    conn.commit()
+    removed = 0
+    for name in names:
+        if not conn.execute('SELECT 1 FROM media_blobs WHERE name = ?', (name,)).fetchone():
+            _remove(directory, name)
+            removed += 1
+    return removed
+
+
+def next_collection(conn, grace=GC_GRACE_SECONDS):
+    """ثوانٍ حتى تنتهي مهلة أقرب ملف بلا مراجع (None إن لم يوجد)."""
+    row = conn.execute("""
+        SELECT CAST(strftime('%s', MIN(touched_at)) AS INTEGER) - CAST(strftime('%s', 'now') AS INTEGER)
+        FROM media_blobs WHERE refcount <= 0
+    """).fetchone()
+    return None if row[0] is None else max(0, row[0] + int(grace))
+
+
+def collect_legacy_files(conn, directory):
+    """حذف الملفات القديمة المسطحة (قبل المخزن المعنون) التي لم يعد يشير إليها أي سجل."""
+    referenced = set()
+    for table, column in MEDIA_REFERENCES:
+        referenced.update(row[0] for row in conn.execute(
+            f'SELECT {column} FROM {table} WHERE {column} IS NOT NULL'))
+    removed = 0
+    for entry in os.scandir(directory):
+        # الملفات المخفية والمؤقتة (.part لرفع جارٍ) ليست ملفات قديمة
+        if entry.is_file() and not entry.name.startswith('.') and not entry.name.endswith(PART_SUFFIX) \
+                and entry.name not in referenced:
+            os.remove(entry.path)
+            removed += 1
+    return removed
+
+
+def _read_range(fh, length):
+    try:
+        while length > 0:
+            chunk = fh.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        fh.close()
+
+
+def _file_body(fh, length, partial):
+    # gunicorn يحدّ sendfile بطول Content-Length فيصلح file_wrapper للمقاطع أيضاً؛
+    # الخوادم الأخرى قد تقرأ حتى نهاية الملف، فنقرأ المقطع بأنفسنا
+    server = request.environ.get('SERVER_SOFTWARE', '')
+    if not partial or server.startswith('gunicorn/'):
+        return wrap_file(request.environ, fh, CHUNK_SIZE)
+    return _read_range(fh, length)
+
+
+def send_media(directory, filename):
+    """استجابة لملف داخل directory مع ETag و Range و Cache-Control."""
+    config = current_app.config
+    # الرفع المجزأ غير المكتمل (.partial/) والملفات المؤقتة: 404 كأنها غير موجودة
+    if filename.endswith(PART_SUFFIX) or any(part.startswith('.') for part in filename.split('/')):
+        abort(404)
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    st = os.stat(path)
+    size = st.st_size
+
+    response = current_app.response_class(
+        mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+        direct_passthrough=True)
+    response.accept_ranges = 'bytes'
+    etag = f'{st.st_mtime_ns:x}-{size:x}'
+    response.set_etag(etag)
+    response.last_modified = int(st.st_mtime)
+    response.cache_control.public = True
+    if BLOB_NAME_RE.match(filename):
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    elif config['MEDIA_MAX_AGE']:
+        response.cache_control.max_age = config['MEDIA_MAX_AGE']
+    else:
+        # اسم قد يُعاد استخدامه لمحتوى جديد: يتحقق المتصفح عبر ETag قبل كل استخدام
+        response.cache_control.no_cache = True
+
+    # ✅ التفويض: الخادم الأمامي يقرأ الملف ويتولى Range و 304 بنفسه
+    offload = config['MEDIA_OFFLOAD']
+    if offload == 'x-accel':
+        prefix = config['MEDIA_ACCEL_PREFIX'].rstrip('/')
+        response.headers['X-Accel-Redirect'] = f'{prefix}/{urllib.parse.quote(filename)}'
+        return response
+    if offload == 'x-sendfile':
+        response.headers['X-Sendfile'] = os.path.abspath(path)
+        return response
+
+    # ✅ 304: نسخة المتصفح ما زالت صالحة
+    if request.if_none_match:
+        fresh = request.if_none_match.contains(etag)
+    else:
+        fresh = bool(request.if_modified_since) and int(st.st_mtime) <= request.if_modified_since.timestamp()
+    if fresh and not request.range:
+        response.status_code = 304
+        return response
+
+    # ✅ Range: مقطع واحد فقط؛ المقاطع المتعددة تُخدم كملف كامل (مسموح في المواصفة)
+    start, stop = 0, size
+    rng = request.range
+    if_range = request.if_range
+    if rng and if_range and (if_range.etag or if_range.date):
+        # If-Range لا يطابق النسخة الحالية ← الملف كاملاً
+        if (if_range.etag != etag if if_range.etag
+                else int(st.st_mtime) > if_range.date.timestamp()):
+            rng = None
+    if rng and rng.units == 'bytes' and len(rng.ranges) == 1:
+        span = rng.range_for_length(size)
+        if span is None:
+            response.status_code = 416
+            response.headers['Content-Range'] = f'bytes */{size}'
+            return response
+        start, stop = span
+        response.status_code = 206
+        response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+
+    fh = open(path, 'rb')
+    fh.seek(start)
+    response.response = _file_body(fh, stop - start, response.status_code == 206)
+    response.content_length = stop - start
+    return response
+
+
+if __name__ == '__main__':
+    import sqlite3
+    import sys
+
+    import migrations
+
+    usage = ('usage: python media.py --gc [--legacy] [--uploads DIR] [db_path]\n'
+             '       python media.py --rebuild-refcounts [db_path]')
+    args = sys.argv[1:]
+    upload_dir = migrations.upload_dir_arg(args)
+    paths = [a for a in args if not a.startswith('--')]
+    conn = sqlite3.connect(paths[0] if paths else migrations.DEFAULT_DB_PATH)
+    conn.row_factory = sqlite3.Row
+    migrations.migrate(conn, upload_dir)
+    if '--rebuild-refcounts' in args:
+        with conn:
+            rebuild_refcounts(conn)
+        print('✅ media refcounts rebuilt for',
+              conn.execute('SELECT COUNT(*) FROM media_blobs').fetchone()[0], 'blobs')
+    elif '--gc' in args:
+        removed = collect_garbage(conn, upload_dir)
+        print(f'✅ removed {removed} unreferenced blobs')
+        if '--legacy' in args:
+            print(f'✅ removed {collect_legacy_files(conn, upload_dir)} unreferenced legacy files')
+    else:
+        print(usage)
+        sys.exit(2)
+    conn.close()
@@ -0,0 +1,360 @@
+# === قياس الطلبات واستعلامات SQL ومحلل العينات للطلبات البطيئة ===
+# اختياري (METRICS_ENABLED / PROFILE_SLOW_MS في app.py)؛ لكل عامل إحصاءاته الخاصة.
+#   InstrumentedConnection  يغلّف اتصال get_db(): كل عبارة تُسجَّل بنصها المُطبَّع وزمنها
+#                           (التنفيذ + جلب الصفوف) وعدد صفوفها ضمن طلبها
+#   TimedTemplate           زمن عرض القوالب منفصلاً عن زمن قاعدة البيانات أثناء العرض
+#   Registry                لكل مسار: مدرجات تراكمية (Prometheus) وعينة أخيرة لـ p50/p95/p99
+#   Sampler                 محلل بالعينات: خيط يقرأ مكدس خيوط الطلبات كل interval ثانية؛
+#                           مكدسات الطلب الأبطأ من الحد تُكتب بصيغة "folded" (flamegraph.pl / speedscope)
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from functools import lru_cache
+
+import jinja2
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SAMPLES = 1024          # آخر الطلبات لكل مسار لحساب النسب المئوية
+MAX_STATEMENTS = 500    # حد لعدد العبارات المختلفة (الباقي تحت 'other')
+PROFILES_KEEP = 50      # أحدث ملفات المكدسات المحفوظة
+
+_local = threading.local()
+
+
+# === تطبيع نص SQL: نفس العبارة بقيم مختلفة = مفتاح واحد ===
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAMS_RE = re.compile(r'\?\d*|:\w+')
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql):
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _PARAMS_RE.sub('?', sql)
+    sql = _SPACE_RE.sub(' ', sql).strip()
+    return _IN_LIST_RE.sub('(?)', sql)
+
+
+# === تسجيل طلب واحد ===
+class RequestRecorder:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = []     # [sql, ms, rows]
+        self.db_ms = 0.0
+        self.render_ms = 0.0
+
+    def add(self, sql, ms, rows):
+        entry = [sql, ms, rows]
+        self.statements.append(entry)
+        self.db_ms += ms
+        return entry
+
+    def fetched(self, entry, ms, rows):
+        entry[1] += ms
+        entry[2] += rows
+        self.db_ms += ms
+
+
+def start():
+    _local.recorder = RequestRecorder()
+    return _local.recorder
+
+
+def current():
+    return getattr(_local, 'recorder', None)
+
+
+def stop():
+    recorder = current()
+    _local.recorder = None
+    return recorder
+
+
+class InstrumentedCursor:
+    """المؤشر الأصلي مع احتساب زمن جلب الصفوف وعددها لعبارته."""
+
+    def __init__(self, cursor, recorder, entry):
+        self._cursor = cursor
+        self._recorder = recorder
+        self._entry = entry
+
+    def _timed(self, fn, *args):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        rows = len(result) if isinstance(result, list) else int(result is not None)
+        self._recorder.fetched(self._entry, (time.perf_counter() - t0) * 1000, rows)
+        return result
+
+    def fetchone(self):
+        return self._timed(self._cursor.fetchone)
+
+    def fetchall(self):
+        return self._timed(self._cursor.fetchall)
+
+    def fetchmany(self, size=None):
+        return self._timed(self._cursor.fetchmany, size or self._cursor.arraysize)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = self._timed(self._cursor.fetchone)
+        if row is None:
+            raise StopIteration
+        return row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    """يغلّف sqlite3.Connection لطلب واحد؛ raw هو الاتصال الأصلي (يعود إلى المجمّع)."""
+
+    def __init__(self, conn, recorder):
+        self.raw = conn
+        self._recorder = recorder
+
+    def _run(self, method, sql, *args):
+        t0 = time.perf_counter()
+        cursor = method(sql, *args)
+        # rowcount لعبارات التعديل؛ صفوف SELECT تُعد عند جلبها
+        rows = max(cursor.rowcount, 0)
+        entry = self._recorder.add(sql, (time.perf_counter() - t0) * 1000, rows)
+        return InstrumentedCursor(cursor, self._recorder, entry)
+
+    def execute(self, sql, params=()):
+        return self._run(self.raw.execute, sql, params)
+
+    def executemany(self, sql, seq):
+        return self._run(self.raw.executemany, sql, seq)
+
+    def executescript(self, script):
+        return self._run(self.raw.executescript, script)
+
+    def __enter__(self):
+        self.raw.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self.raw.__exit__(*exc)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+def unwrap(conn):
+    return getattr(conn, 'raw', conn)
+
+
+class TimedTemplate(jinja2.Template):
+    """زمن render() للقالب الرئيسي ناقصاً زمن الاستعلامات التي نُفذت أثناءه."""
+
+    def render(self, *args, **kwargs):
+        recorder = current()
+        if recorder is None:
+            return super().render(*args, **kwargs)
+        t0, db0 = time.perf_counter(), recorder.db_ms
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            recorder.render_ms += (time.perf_counter() - t0) * 1000 - (recorder.db_ms - db0)
+
+
+# === التجميع لكل مسار ===
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class _Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.total += value
+        self.count += 1
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self):
+        running = 0
+        for bound, count in zip(self.bounds, self.counts):
+            running += count
+            yield bound, running
+
+
+class _RouteStats:
+    def __init__(self):
+        self.duration = _Histogram(DURATION_BUCKETS)
+        self.db = _Histogram(DURATION_BUCKETS)
+        self.render = _Histogram(DURATION_BUCKETS)
+        self.queries = _Histogram(QUERY_BUCKETS)
+        self.recent = deque(maxlen=SAMPLES)   # (total_ms, db_ms, render_ms, queries)
+
+
+class Registry:
+    def __init__(self):
+        self._routes = {}
+        self._statements = {}   # sql مُطبَّع → [calls, ms, rows]
+        self._lock = threading.Lock()
+
+    def record(self, method, route, recorder, total_ms):
+        queries = len(recorder.statements)
+        with self._lock:
+            stats = self._routes.get((method, route))
+            if stats is None:
+                stats = self._routes[method, route] = _RouteStats()
+            stats.duration.observe(total_ms / 1000)
+            stats.db.observe(recorder.db_ms / 1000)
+            stats.render.observe(recorder.render_ms / 1000)
+            stats.queries.observe(queries)
+            stats.recent.append((total_ms, recorder.db_ms, recorder.render_ms, queries))
+            for sql, ms, rows in recorder.statements:
+                key = normalize_sql(sql)
+                totals = self._statements.get(key)
+                if totals is None:
+                    if len(self._statements) >= MAX_STATEMENTS:
+                        key = 'other'
+                    totals = self._statements.setdefault(key, [0, 0.0, 0])
+                totals[0] += 1
+                totals[1] += ms
+                totals[2] += rows
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self._statements.clear()
+
+    def snapshot(self, top=20):
+        """ملخص JSON: لكل مسار النسب المئوية للأزمنة وعدد الاستعلامات، وأثقل العبارات زمناً."""
+        with self._lock:
+            routes = {}
+            for (method, route), stats in sorted(self._routes.items(), key=lambda item: item[0][1]):
+                recent = list(stats.recent)
+                summary = {'count': stats.duration.count}
+                for i, name in enumerate(('total_ms', 'db_ms', 'render_ms', 'queries')):
+                    values = [sample[i] for sample in recent]
+                    summary[name] = {f'p{p}': round(percentile(values, p), 3) for p in (50, 95, 99)}
+                routes[f'{method} {route}'] = summary
+            statements = [
+                {'sql': sql, 'calls': calls, 'total_ms': round(ms, 3),
+                 'avg_ms': round(ms / calls, 3), 'rows': rows}
+                for sql, (calls, ms, rows) in sorted(self._statements.items(), key=lambda item: -item[1][1])[:top]
+            ]
+        return {'routes': routes, 'statements': statements}
+
+    def prometheus(self, prefix='edu'):
+        """نفس البيانات بصيغة Prometheus النصية (text/plain; version=0.0.4)."""
+        lines = []
+        with self._lock:
+            for name, attr, help_text in (
+                    ('request_duration_seconds', 'duration', 'Request wall time'),
+                    ('request_db_seconds', 'db', 'Time spent in SQLite per request'),
+                    ('request_render_seconds', 'render', 'Template render time per request (excluding SQL)'),
+                    ('request_queries', 'queries', 'SQL statements per request')):
+                lines.append(f'# HELP {prefix}_{name} {help_text}')
+                lines.append(f'# TYPE {prefix}_{name} histogram')
+                for (method, route), stats in sorted(self._routes.items()):
+                    hist = getattr(stats, attr)
+                    labels = f'method="{_label(method)}",route="{_label(route)}"'
+                    for bound, count in hist.cumulative():
+                        lines.append(f'{prefix}_{name}_bucket{{{labels},le="{bound:g}"}} {count}')
+                    lines.append(f'{prefix}_{name}_bucket{{{labels},le="+Inf"}} {hist.count}')
+                    lines.append(f'{prefix}_{name}_sum{{{labels}}} {hist.total:.6f}')
+                    lines.append(f'{prefix}_{name}_count{{{labels}}} {hist.count}')
+            for name, index, help_text, fmt in (
+                    ('sql_statement_calls_total', 0, 'Executions per normalized statement', '{:d}'),
+                    ('sql_statement_seconds_total', 1, 'Time per normalized statement', '{:.6f}'),
+                    ('sql_statement_rows_total', 2, 'Rows returned or changed per normalized statement', '{:d}')):
+                lines.append(f'# HELP {prefix}_{name} {help_text}')
+                lines.append(f'# TYPE {prefix}_{name} counter')
+                for sql, totals in sorted(self._statements.items()):
+                    value = totals[index] / 1000 if index == 1 else totals[index]
+                    lines.append(f'{prefix}_{name}{{sql="{_label(sql)}"}} {fmt.format(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# === محلل العينات ===
+def fold(frame):
+    """المكدس من الجذر إلى الإطار الحالي: 'func (file:line);...' (سطر بداية الدالة ليتجمع)."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Sampler:
+    """خيط واحد يأخذ عينة من مكدس كل طلب نشط كل interval ثانية؛ ينام حين لا توجد طلبات."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def begin(self):
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='metrics-sampler', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def end(self):
+        with self._lock:
+            return self._active.pop(threading.get_ident(), Counter())
+
+    def _loop(self):
+        while True:
+            if not self._active:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, stacks in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        stacks[fold(frame)] += 1
+
+
+def dump_stacks(stacks, directory, label, total_ms):
+    """كتابة المكدسات بصيغة folded ('a;b;c count' لكل سطر)؛ يعيد اسم الملف."""
+    os.makedirs(directory, exist_ok=True)
+    safe = re.sub(r'[^A-Za-z0-9_.-]+', '_', label).strip('_') or 'request'
+    name = f'{time.strftime("%Y%m%d-%H%M%S")}-{int(time.time() * 1000) % 1000:03d}-{safe}-{total_ms:.0f}ms.folded'
+    with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+        for stack, count in stacks.most_common():
+            f.write(f'{stack} {count}\n')
+    for old in list_profiles(directory)[PROFILES_KEEP:]:
+        os.remove(os.path.join(directory, old))
+    return name
+
+
+def list_profiles(directory):
+    """أسماء ملفات المكدسات، الأحدث أولاً."""
+    if not os.path.isdir(directory):
+        return []
+    return sorted((n for n in os.listdir(directory) if n.endswith('.folded')), reverse=True)
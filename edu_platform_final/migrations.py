@@ -0,0 +1,779 @@
+# === محرك ترحيل مخطط قاعدة البيانات (Schema migrations) ===
+# المصدر الوحيد لتعريف الجداول: app.py و init_db.py و seed_db.py تستدعي migrate().
+# كل ترحيل له رقم إصدار تصاعدي ويُطبَّق مرة واحدة داخل معاملة مستقلة،
+# ويُسجَّل في جدول schema_migrations.
+#
+#   python migrations.py [db_path]               تطبيق الترحيلات المعلقة
+#   python migrations.py --check-plans [db_path] فحص خطط الاستعلامات الساخنة
+import inspect
+import os
+import shutil
+import sqlite3
+import sys
+
+import l10n
+import lesson_html
+import media
+import pagination
+import progress
+import search
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+DEFAULT_DB_PATH = os.path.join(BASE_DIR, 'instance', 'db.sqlite')
+UPLOAD_DIR = os.path.join(BASE_DIR, 'instance', 'uploads')
+
+
+def upload_dir_arg(args):
+    """يزيل '--uploads DIR' من وسائط سطر الأوامر ويعيده؛ وإلا UPLOAD_FOLDER من البيئة كما في app.py."""
+    if '--uploads' in args:
+        i = args.index('--uploads')
+        path = args[i + 1]
+        del args[i:i + 2]
+        return path
+    return os.environ.get('UPLOAD_FOLDER', UPLOAD_DIR)
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+
+
+def _add_column(conn, table, column, decl):
+    if column not in _columns(conn, table):
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {decl}')
+
+
+# --- 1. المخطط الأساسي (كما في init_db() القديمة + جدول likes) ---
+def _m001_base_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            fullname TEXT,
+            email TEXT UNIQUE,
+            is_admin BOOLEAN DEFAULT 0
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS hero_slides (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            image_path TEXT NOT NULL,
+            title_ar TEXT NOT NULL,
+            title_en TEXT NOT NULL,
+            desc_ar TEXT,
+            desc_en TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS courses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title_ar TEXT NOT NULL,
+            title_en TEXT NOT NULL,
+            short_desc_ar TEXT,
+            short_desc_en TEXT,
+            full_desc_ar TEXT,
+            full_desc_en TEXT,
+            image TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS lessons (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course_id INTEGER NOT NULL,
+            title_ar TEXT NOT NULL,
+            title_en TEXT NOT NULL,
+            content_ar TEXT,
+            content_en TEXT,
+            position INTEGER DEFAULT 0,
+            video TEXT,
+            FOREIGN KEY(course_id) REFERENCES courses(id)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS enroll_requests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            course_id INTEGER NOT NULL,
+            status TEXT DEFAULT 'pending', -- accepted, rejected
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(user_id) REFERENCES users(id),
+            FOREIGN KEY(course_id) REFERENCES courses(id),
+            UNIQUE(user_id, course_id)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS enrollments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            course_id INTEGER NOT NULL,
+            approved BOOLEAN DEFAULT 0,
+            UNIQUE(user_id, course_id),
+            FOREIGN KEY(user_id) REFERENCES users(id),
+            FOREIGN KEY(course_id) REFERENCES courses(id)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS user_progress (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            lesson_id INTEGER NOT NULL,
+            completed BOOLEAN DEFAULT 0,
+            UNIQUE(user_id, lesson_id),
+            FOREIGN KEY(user_id) REFERENCES users(id),
+            FOREIGN KEY(lesson_id) REFERENCES lessons(id)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS likes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            course_id INTEGER,
+            FOREIGN KEY(user_id) REFERENCES users(id),
+            FOREIGN KEY(course_id) REFERENCES courses(id)
+        )
+    """)
+
+
+# --- 2. توحيد القواعد القديمة (init_db.py / seed_db.py) مع الأعمدة التي يستخدمها app.py ---
+def _m002_reconcile_columns(conn):
+    _add_column(conn, 'lessons', 'video_url', 'TEXT')
+    _add_column(conn, 'enrollments', 'approved', 'BOOLEAN DEFAULT 0')
+    _add_column(conn, 'enroll_requests', 'status', "TEXT DEFAULT 'pending'")
+    _add_column(conn, 'user_progress', 'completed', 'BOOLEAN DEFAULT 0')
+
+
+# --- 3. قيود التفرد التي تعتمد عليها ON CONFLICT في mark_watched و accept ---
+def _m003_unique_keys(conn):
+    # إزالة التكرارات (إن وُجدت في القواعد القديمة) قبل إنشاء الفهارس الفريدة
+    conn.execute("""
+        DELETE FROM user_progress WHERE id NOT IN (
+            SELECT MAX(id) FROM user_progress GROUP BY user_id, lesson_id)
+    """)
+    conn.execute("""
+        DELETE FROM enrollments WHERE id NOT IN (
+            SELECT MAX(id) FROM enrollments GROUP BY user_id, course_id)
+    """)
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS ux_user_progress_user_lesson '
+                 'ON user_progress(user_id, lesson_id)')
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS ux_enrollments_user_course '
+                 'ON enrollments(user_id, course_id)')
+
+
+# --- 4. فهارس الاستعلامات الساخنة (landing, profile, course_page, request_certificate, admin) ---
+def _m004_hot_indexes(conn):
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_lessons_course_position '
+                 'ON lessons(course_id, position)')
+    # (user_id, course_id) مغطى بالفهرس الفريد ux_enrollments_user_course
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_enrollments_user_approved '
+                 'ON enrollments(user_id, approved, course_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_user_progress_user_lesson_completed '
+                 'ON user_progress(user_id, lesson_id, completed)')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_enroll_requests_status_id '
+                 'ON enroll_requests(status, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_enroll_requests_user_course '
+                 'ON enroll_requests(user_id, course_id)')
+
+
+# --- 5. عدادات التقدم على كل التحاق (completed_lessons / total_lessons) ---
+# تُحدَّث عبر triggers داخل نفس معاملة الكتابة، فتبقى صحيحة مهما كان المسار
+# (mark_watched، إضافة/حذف درس، قبول طلب). إعادة البناء: python progress.py --rebuild-counters
+COUNTER_TRIGGERS = [
+    # التحاق جديد: تهيئة العدادات من الوضع الحالي
+    """CREATE TRIGGER IF NOT EXISTS trg_enrollments_init_counters
+       AFTER INSERT ON enrollments
+       BEGIN
+           UPDATE enrollments SET
+               total_lessons = (SELECT COUNT(*) FROM lessons WHERE course_id = NEW.course_id),
+               completed_lessons = (SELECT COUNT(*) FROM user_progress up
+                                    JOIN lessons l ON l.id = up.lesson_id
+                                    WHERE up.user_id = NEW.user_id AND l.course_id = NEW.course_id
+                                      AND up.completed = 1)
+           WHERE id = NEW.id;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_lessons_insert_counters
+       AFTER INSERT ON lessons
+       BEGIN
+           UPDATE enrollments SET total_lessons = total_lessons + 1
+           WHERE course_id = NEW.course_id;
+       END""",
+    # قبل حذف الدرس: حذف تقدمه (فيُنقص completed_lessons) ثم إنقاص الإجمالي
+    """CREATE TRIGGER IF NOT EXISTS trg_lessons_delete_counters
+       BEFORE DELETE ON lessons
+       BEGIN
+           DELETE FROM user_progress WHERE lesson_id = OLD.id;
+           UPDATE enrollments SET total_lessons = total_lessons - 1
+           WHERE course_id = OLD.course_id;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_progress_insert_counters
+       AFTER INSERT ON user_progress WHEN NEW.completed = 1
+       BEGIN
+           UPDATE enrollments SET completed_lessons = completed_lessons + 1
+           WHERE user_id = NEW.user_id
+             AND course_id = (SELECT course_id FROM lessons WHERE id = NEW.lesson_id);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_progress_update_counters
+       AFTER UPDATE OF completed ON user_progress WHEN OLD.completed IS NOT NEW.completed
+       BEGIN
+           UPDATE enrollments
+           SET completed_lessons = completed_lessons
+               + (CASE WHEN NEW.completed = 1 THEN 1 ELSE 0 END)
+               - (CASE WHEN OLD.completed = 1 THEN 1 ELSE 0 END)
+           WHERE user_id = NEW.user_id
+             AND course_id = (SELECT course_id FROM lessons WHERE id = NEW.lesson_id);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_progress_delete_counters
+       AFTER DELETE ON user_progress WHEN OLD.completed = 1
+       BEGIN
+           UPDATE enrollments SET completed_lessons = completed_lessons - 1
+           WHERE user_id = OLD.user_id
+             AND course_id = (SELECT course_id FROM lessons WHERE id = OLD.lesson_id);
+       END""",
+]
+
+
+def _m005_progress_counters(conn):
+    _add_column(conn, 'enrollments', 'completed_lessons', 'INTEGER NOT NULL DEFAULT 0')
+    _add_column(conn, 'enrollments', 'total_lessons', 'INTEGER NOT NULL DEFAULT 0')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_enrollments_course_approved '
+                 'ON enrollments(course_id, approved)')
+    for sql in COUNTER_TRIGGERS:
+        conn.execute(sql)
+    progress.rebuild_counters(conn)
+
+
+# --- 6. تخزين تقدم متناثر: غياب الصف يعني "لم يكتمل"؛ حذف صفوف completed=0 القديمة ---
+def _m006_compact_progress(conn):
+    conn.execute('DELETE FROM user_progress WHERE completed IS NULL OR completed = 0')
+
+
+# --- 7. مخزن التقدم بالبتات: خانة ثابتة لكل درس داخل دورته + جدول الخرائط ---
+def _m007_progress_bitsets(conn):
+    _add_column(conn, 'lessons', 'progress_slot', 'INTEGER')
+    # الخانات القائمة بترتيب العرض؛ الدروس الجديدة تأخذ max+1 (استُبدل بعداد في الترحيل 19)
+    conn.execute("""
+        UPDATE lessons SET progress_slot = (
+            SELECT COUNT(*) FROM lessons l2
+            WHERE l2.course_id = lessons.course_id
+              AND (COALESCE(l2.position, 0) < COALESCE(lessons.position, 0)
+                   OR (COALESCE(l2.position, 0) = COALESCE(lessons.position, 0) AND l2.id < lessons.id)))
+        WHERE progress_slot IS NULL
+    """)
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_lessons_course_slot ON lessons(course_id, progress_slot)')
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_lessons_assign_slot
+        AFTER INSERT ON lessons WHEN NEW.progress_slot IS NULL
+        BEGIN
+            UPDATE lessons SET progress_slot = (
+                SELECT COALESCE(MAX(progress_slot), -1) + 1 FROM lessons WHERE course_id = NEW.course_id)
+            WHERE id = NEW.id;
+        END
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS progress_bitsets (
+            user_id INTEGER NOT NULL,
+            course_id INTEGER NOT NULL,
+            bits BLOB NOT NULL,
+            PRIMARY KEY(user_id, course_id)
+        ) WITHOUT ROWID
+    """)
+
+
+# --- 8. أرقام مراجعة للمحتوى (ETag / Last-Modified) ---
+# updated_at هنا بثواني unix ليُستخدم مباشرة في ترويسة Last-Modified
+_NOW = "CAST(strftime('%s', 'now') AS INTEGER)"
+_BUMP_LANDING = (f"UPDATE site_revisions SET revision = revision + 1, updated_at = {_NOW} "
+                 "WHERE name = 'landing';")
+
+REVISION_TRIGGERS = [
+    # أي تعديل على الدورة يرفع رقم مراجعتها (الشرط يمنع إعادة التنفيذ على تحديثنا نحن)
+    f"""CREATE TRIGGER IF NOT EXISTS trg_courses_revision
+       AFTER UPDATE ON courses WHEN NEW.revision = OLD.revision
+       BEGIN
+           UPDATE courses SET revision = OLD.revision + 1, updated_at = {_NOW} WHERE id = NEW.id;
+           {_BUMP_LANDING}
+       END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_courses_insert_revision
+       AFTER INSERT ON courses
+       BEGIN
+           UPDATE courses SET revision = NEW.revision + 1, updated_at = {_NOW} WHERE id = NEW.id;
+           {_BUMP_LANDING}
+       END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_courses_delete_revision
+       AFTER DELETE ON courses
+       BEGIN
+           {_BUMP_LANDING}
+       END""",
+    # الدروس جزء من صفحة الدورة وصفحة الدرس: تغييرها يرفع مراجعة الدورة
+    f"""CREATE TRIGGER IF NOT EXISTS trg_lessons_insert_revision
+       AFTER INSERT ON lessons
+       BEGIN
+           UPDATE courses SET revision = revision + 1, updated_at = {_NOW} WHERE id = NEW.course_id;
+       END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_lessons_update_revision
+       AFTER UPDATE ON lessons
+       BEGIN
+           UPDATE courses SET revision = revision + 1, updated_at = {_NOW}
+           WHERE id IN (OLD.course_id, NEW.course_id);
+       END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_lessons_delete_revision
+       AFTER DELETE ON lessons
+       BEGIN
+           UPDATE courses SET revision = revision + 1, updated_at = {_NOW} WHERE id = OLD.course_id;
+       END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_hero_slides_insert_revision
+       AFTER INSERT ON hero_slides BEGIN {_BUMP_LANDING} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_hero_slides_update_revision
+       AFTER UPDATE ON hero_slides BEGIN {_BUMP_LANDING} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_hero_slides_delete_revision
+       AFTER DELETE ON hero_slides BEGIN {_BUMP_LANDING} END""",
+    # تقدم الطالب وقبوله يغيّران صف الالتحاق (العدادات) — نكتفي بختم وقت التغيير
+    f"""CREATE TRIGGER IF NOT EXISTS trg_enrollments_touch
+       AFTER UPDATE ON enrollments WHEN NEW.updated_at IS OLD.updated_at
+       BEGIN
+           UPDATE enrollments SET updated_at = {_NOW} WHERE id = NEW.id;
+       END""",
+]
+
+
+def _m008_content_revisions(conn):
+    _add_column(conn, 'courses', 'revision', 'INTEGER NOT NULL DEFAULT 1')
+    _add_column(conn, 'courses', 'updated_at', 'INTEGER')
+    _add_column(conn, 'enrollments', 'updated_at', 'INTEGER')
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS site_revisions (
+            name TEXT PRIMARY KEY,
+            revision INTEGER NOT NULL DEFAULT 1,
+            updated_at INTEGER
+        )
+    """)
+    conn.execute(f"INSERT OR IGNORE INTO site_revisions (name, updated_at) VALUES ('landing', {_NOW})")
+    conn.execute(f'UPDATE courses SET updated_at = {_NOW} WHERE updated_at IS NULL')
+    conn.execute(f'UPDATE enrollments SET updated_at = {_NOW} WHERE updated_at IS NULL')
+    for sql in REVISION_TRIGGERS:
+        conn.execute(sql)
+
+
+# --- 9. الرفع المجزأ القابل للاستئناف (uploads.py) ---
+def _m009_resumable_uploads(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS uploads (
+            id TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            received INTEGER NOT NULL DEFAULT 0,
+            stored_name TEXT,
+            created_by INTEGER,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+# --- 10. مخزن الملفات المعنون بالمحتوى مع عدّ المراجع (media.py) ---
+def _media_ref_triggers():
+    for table, column in media.MEDIA_REFERENCES:
+        inc = 'UPDATE media_blobs SET refcount = refcount + 1 WHERE name = NEW.{0};'.format(column)
+        dec = 'UPDATE media_blobs SET refcount = refcount - 1, touched_at = CURRENT_TIMESTAMP ' \
+              'WHERE name = OLD.{0};'.format(column)
+        yield f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_{column}_ref_insert
+                  AFTER INSERT ON {table} WHEN NEW.{column} IS NOT NULL
+                  BEGIN {inc} END"""
+        yield f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_{column}_ref_update
+                  AFTER UPDATE OF {column} ON {table} WHEN OLD.{column} IS NOT NEW.{column}
+                  BEGIN {dec} {inc} END"""
+        yield f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_{column}_ref_delete
+                  AFTER DELETE ON {table} WHEN OLD.{column} IS NOT NULL
+                  BEGIN {dec} END"""
+
+
+def _m010_media_store(conn, upload_dir):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS media_blobs (
+            name TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            refcount INTEGER NOT NULL DEFAULT 0,
+            touched_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_media_blobs_unreferenced '
+                 'ON media_blobs(touched_at) WHERE refcount <= 0')
+    # إعادة تسمية الملفات القائمة بالبصمة: ربط صلب (أو نسخ) إلى المخزن دون حذف الأصل،
+    # فإن فشلت المعاملة تبقى المراجع القديمة صالحة. الأصول تُحذف لاحقاً: media.py --gc --legacy
+    renamed = {}
+    for table, column in media.MEDIA_REFERENCES:
+        for (old,) in conn.execute(f'SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL').fetchall():
+            if old in renamed or media.BLOB_NAME_RE.match(old):
+                continue
+            path = os.path.join(upload_dir, old)
+            if not os.path.isfile(path):
+                continue  # مرجع لملف مفقود: يبقى كما هو
+            name = media.blob_name(old, media.file_sha256(path))
+            target = os.path.join(upload_dir, name)
+            if not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                try:
+                    os.link(path, target)
+                except OSError:
+                    shutil.copy2(path, target)
+            media.register_blob(conn, name, os.path.getsize(target))
+            renamed[old] = name
+    for table, column in media.MEDIA_REFERENCES:
+        conn.executemany(f'UPDATE {table} SET {column} = ? WHERE {column} = ?',
+                         [(new, old) for old, new in renamed.items()])
+    for sql in _media_ref_triggers():
+        conn.execute(sql)
+    media.rebuild_refcounts(conn)
+
+
+# --- 11. مشتقات الصور (images.py): وصفها على سجل الملف الأصلي ---
+def _m011_image_derivatives(conn):
+    _add_column(conn, 'media_blobs', 'derivatives', 'TEXT')
+    # اكتمال المشتقات يغيّر srcset في الصفحة الرئيسية وصفحة الدورة
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_media_blobs_derivatives
+        AFTER UPDATE OF derivatives ON media_blobs WHEN NEW.derivatives IS NOT OLD.derivatives
+        BEGIN
+            UPDATE courses SET revision = revision + 1, updated_at = {_NOW} WHERE image = NEW.name;
+            {_BUMP_LANDING}
+        END
+    """)
+
+
+# --- 12. طابور المهام (jobs.py): الأوقات بثواني unix (REAL) ---
+def _m012_jobs(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL DEFAULT '{}',
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 5,
+            run_after REAL NOT NULL,
+            lease_owner TEXT,
+            leased_until REAL,
+            last_error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            finished_at REAL
+        )
+    """)
+    # الحجز: المهام الجاهزة بالترتيب، والحجوزات المنتهية (عامل توقف)
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_jobs_status_run_after ON jobs(status, run_after)')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_jobs_status_leased_until ON jobs(status, leased_until)')
+
+
+# --- 13. فهرس البحث النصي الكامل (search.py) ---
+def _m013_search_index(conn):
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+            title, body,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    """)
+    search.rebuild(conn)
+
+
+# --- 14. حالة طلبات التسجيل القديمة: NULL → 'pending' ---
+# شرط "status IS NULL OR status = 'pending'" يجعل SQLite يجمع فرعين من الفهرس ثم يفرز كل
+# الطلبات المعلقة في كل صفحة؛ بعد التوحيد يكفي status = 'pending' على الفهرس (status, id) بالترتيب.
+def _m014_pending_request_status(conn):
+    conn.execute("UPDATE enroll_requests SET status = 'pending' WHERE status IS NULL")
+
+
+# --- 15. نسخة مُترجمة من نصوص الدورات والدروس (l10n.py) ---
+def _m015_localized_text(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS course_text (
+            lang TEXT NOT NULL,
+            course_id INTEGER NOT NULL,
+            title TEXT,
+            short_desc TEXT,
+            full_desc TEXT,
+            PRIMARY KEY (lang, course_id)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS lesson_text (
+            lang TEXT NOT NULL,
+            lesson_id INTEGER NOT NULL,
+            course_id INTEGER NOT NULL,
+            position INTEGER,
+            title TEXT,
+            content TEXT,
+            PRIMARY KEY (lang, lesson_id)
+        )
+    """)
+    # قوائم الدروس (صفحة الدورة، الملف الشخصي) من الفهرس وحده دون قراءة المحتوى
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_lesson_text_course '
+                 'ON lesson_text(lang, course_id, position, lesson_id, title)')
+    l10n.install(conn)
+
+
+# --- 16. محتوى الدروس مُجهَّز عند الحفظ (lesson_html.py) ---
+# HTML منقّى ورابط تضمين الفيديو وبصمة المحتوى لكل لغة؛ صفحة الدرس تعرضه كما هو
+def _m016_lesson_html(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS lesson_html (
+            lang TEXT NOT NULL,
+            lesson_id INTEGER NOT NULL,
+            title TEXT,
+            html TEXT NOT NULL,
+            embed_url TEXT,
+            content_hash TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            compiled_at INTEGER NOT NULL,
+            PRIMARY KEY (lang, lesson_id)
+        )
+    """)
+    lesson_html.install(conn)
+
+
+# --- 17. موضع المشاهدة من نبضات live.py (صف لكل طالب ودرس، آخر موضع فقط) ---
+def _m017_watch_positions(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS watch_positions (
+            user_id INTEGER NOT NULL,
+            lesson_id INTEGER NOT NULL,
+            position REAL NOT NULL,
+            duration REAL,
+            updated_at INTEGER NOT NULL,
+            PRIMARY KEY (user_id, lesson_id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_watch_positions_lesson ON watch_positions(lesson_id)')
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS watch_positions_lesson_delete
+        AFTER DELETE ON lessons
+        BEGIN DELETE FROM watch_positions WHERE lesson_id = OLD.id; END
+    """)
+
+
+# --- 18. حجز كتابة المقطع في الرفع المجزأ (uploads.write_chunk): كاتب واحد لكل رفع ---
+def _m018_upload_writer_lease(conn):
+    _add_column(conn, 'uploads', 'writer', 'TEXT')
+    _add_column(conn, 'uploads', 'writer_until', 'REAL')
+
+
+# --- 19. خانات التقدم من عداد لكل دورة لا ينقص أبداً ---
+# MAX(progress_slot)+1 كان يعيد خانة آخر درس محذوف لدرس جديد، وبتّه ما زال في progress_bitsets
+# (مسحه يعتمد على lesson_deleted في المخزن المفعّل وقتها) فيظهر الدرس الجديد مكتملاً.
+def _m019_progress_slot_counters(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS progress_slot_counters (
+            course_id INTEGER PRIMARY KEY,
+            next_slot INTEGER NOT NULL
+        )
+    """)
+    conn.execute("""
+        INSERT OR IGNORE INTO progress_slot_counters (course_id, next_slot)
+        SELECT course_id, MAX(progress_slot) + 1 FROM lessons
+        WHERE progress_slot IS NOT NULL GROUP BY course_id
+    """)
+    conn.execute('DROP TRIGGER IF EXISTS trg_lessons_assign_slot')
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_lessons_assign_slot
+        AFTER INSERT ON lessons WHEN NEW.progress_slot IS NULL
+        BEGIN
+            INSERT INTO progress_slot_counters (course_id, next_slot) VALUES (NEW.course_id, 0)
+            ON CONFLICT(course_id) DO NOTHING;
+            UPDATE lessons SET progress_slot = (
+                SELECT next_slot FROM progress_slot_counters WHERE course_id = NEW.course_id)
+            WHERE id = NEW.id;
+            UPDATE progress_slot_counters SET next_slot = next_slot + 1 WHERE course_id = NEW.course_id;
+        END
+    """)
+    # خانة صريحة (datagen.py، الاستيراد): العداد يتجاوزها
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_lessons_explicit_slot
+        AFTER INSERT ON lessons WHEN NEW.progress_slot IS NOT NULL
+        BEGIN
+            INSERT INTO progress_slot_counters (course_id, next_slot) VALUES (NEW.course_id, NEW.progress_slot + 1)
+            ON CONFLICT(course_id) DO UPDATE SET next_slot = MAX(next_slot, excluded.next_slot);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_courses_delete_slot_counter
+        AFTER DELETE ON courses
+        BEGIN DELETE FROM progress_slot_counters WHERE course_id = OLD.id; END
+    """)
+    # بتات خانات لم يعد لها درس (حُذف الدرس دون lesson_deleted في مخزن البتات) تُمسح الآن
+    slots = {}
+    for course_id, slot in conn.execute('SELECT course_id, progress_slot FROM lessons '
+                                        'WHERE progress_slot IS NOT NULL'):
+        slots.setdefault(course_id, set()).add(slot)
+    stale = []
+    for user_id, course_id, bits in conn.execute('SELECT user_id, course_id, bits FROM progress_bitsets').fetchall():
+        live = slots.get(course_id, set())
+        kept = bits
+        for slot in range(len(bits or b'') * 8):
+            if slot not in live and progress.bitset_test(kept, slot):
+                kept = progress.bitset_clear(kept, slot)
+        if kept != bits:
+            stale.append((kept, user_id, course_id))
+    conn.executemany('UPDATE progress_bitsets SET bits = ? WHERE user_id = ? AND course_id = ?', stale)
+
+
+# قائمة الترحيلات المرتبة — أضف الجديد في النهاية فقط ولا تعدّل ترحيلاً مطبقاً
+MIGRATIONS = [
+    (1, 'base schema', _m001_base_schema),
+    (2, 'reconcile legacy columns', _m002_reconcile_columns),
+    (3, 'unique keys for upserts', _m003_unique_keys),
+    (4, 'hot query indexes', _m004_hot_indexes),
+    (5, 'enrollment progress counters', _m005_progress_counters),
+    (6, 'compact zero progress rows', _m006_compact_progress),
+    (7, 'bitset progress store', _m007_progress_bitsets),
+    (8, 'content revisions for conditional GET', _m008_content_revisions),
+    (9, 'resumable uploads', _m009_resumable_uploads),
+    (10, 'content-addressed media store', _m010_media_store),
+    (11, 'image derivatives', _m011_image_derivatives),
+    (12, 'job queue', _m012_jobs),
+    (13, 'full-text search index', _m013_search_index),
+    (14, 'pending enroll request status', _m014_pending_request_status),
+    (15, 'localized text projections', _m015_localized_text),
+    (16, 'pre-rendered lesson HTML', _m016_lesson_html),
+    (17, 'watch positions', _m017_watch_positions),
+    (18, 'upload writer lease', _m018_upload_writer_lease),
+    (19, 'progress slot counters', _m019_progress_slot_counters),
+]
+
+
+def current_version(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    return conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_migrations').fetchone()[0]
+
+
+def migrate(conn, upload_dir=UPLOAD_DIR):
+    """تطبيق الترحيلات المعلقة بالترتيب؛ يعيد قائمة الإصدارات المطبقة.
+
+    upload_dir: مجلد ملفات الرفع لهذه القاعدة (app.config['UPLOAD_FOLDER'])، تأخذه
+    الترحيلات التي تلمس الملفات (تعلن upload_dir في توقيعها).
+    """
+    applied = []
+    old_isolation = conn.isolation_level
+    conn.isolation_level = None  # نتحكم بالمعاملات يدوياً
+    try:
+        if current_version(conn) >= MIGRATIONS[-1][0]:
+            return applied
+        for version, name, fn in MIGRATIONS:
+            # BEGIN IMMEDIATE يمنع عاملين من تطبيق نفس الترحيل في آن واحد
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if current_version(conn) >= version:
+                    conn.execute('ROLLBACK')
+                    continue
+                if 'upload_dir' in inspect.signature(fn).parameters:
+                    fn(conn, upload_dir=upload_dir)
+                else:
+                    fn(conn)
+                conn.execute('INSERT INTO schema_migrations (version, name) VALUES (?, ?)',
+                             (version, name))
+                conn.execute('COMMIT')
+                applied.append(version)
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+    finally:
+        conn.isolation_level = old_isolation
+    return applied
+
+
+# === فحص خطط الاستعلامات (EXPLAIN QUERY PLAN) ===
+# نسخ من الاستعلامات الساخنة في app.py؛ حدّثها عند تعديل الاستعلام الأصلي.
+# allow: الجداول التي يُسمح بمسحها كاملاً لأن الاستعلام يعرضها كلها عمداً.
+HOT_QUERIES = {
+    'landing courses': (
+        pagination.keyset_sql(pagination.LANDING_COURSES_SQL, pagination.LANDING_COURSES_KEY, (1,)),
+        ('ar', 0, 1, 12), set()),
+    'landing slides': (
+        """SELECT s.*, b.derivatives FROM hero_slides s
+           LEFT JOIN media_blobs b ON b.name = s.image_path
+           ORDER BY s.id ASC""",
+        (), {'s'}),
+    'landing enrolled ids': (
+        'SELECT course_id FROM enrollments WHERE user_id=? AND approved=1', (1,), set()),
+    'profile courses': (progress.PROFILE_COURSES_SQL, ('ar', 1), set()),
+    'profile lessons': (progress.PROFILE_LESSONS_SQL, ('ar', 1), set()),
+    'completion summary': (progress.COMPLETION_SUMMARY_SQL, (1,), set()),
+    'course_page lessons': (progress.COURSE_LESSONS_SQL, (1, 'ar', 1), set()),
+    'resume lesson': (progress.RESUME_LESSON_SQL, (1, 1), set()),
+    'mark completed (checked)': (progress.MARK_COMPLETED_CHECKED_SQL, (1, 1), set()),
+    'save watch position (checked)': (progress.SAVE_POSITION_CHECKED_SQL, (1, 1, 0.0, 0.0, 0), set()),
+    'watch position': (progress.WATCH_POSITION_SQL, (1, 1), set()),
+    'profile lessons (bitset)': (progress.BITSET_PROFILE_LESSONS_SQL, ('ar', 1), set()),
+    'course_page lessons (bitset)': (progress.BITSET_COURSE_LESSONS_SQL, ('ar', 1), set()),
+    'job lease': (
+        """SELECT id FROM jobs WHERE status = 'queued' AND run_after <= ?
+           UNION ALL
+           SELECT id FROM jobs WHERE status = 'running' AND leased_until < ?
+           ORDER BY id LIMIT 1""",
+        (0, 0), set()),
+    'lesson head': (lesson_html.HEAD_SQL, ('ar', lesson_html.VERSION, 1), set()),
+    'lesson page': (lesson_html.PAGE_SQL, ('ar', 1), set()),
+    'enrollment check': (
+        """SELECT * FROM enrollments
+           WHERE user_id=? AND course_id=? AND approved=1""",
+        (1, 1), set()),
+    'admin_index courses': (
+        pagination.keyset_sql(pagination.ADMIN_COURSES_SQL, pagination.ADMIN_COURSES_KEY, (1,), True),
+        (1, 50), set()),
+    'admin lessons': (
+        pagination.keyset_sql(pagination.ADMIN_LESSONS_SQL, pagination.ADMIN_LESSONS_KEY, (1, 1)),
+        (1, 1, 1, 100), set()),
+    'admin lessons start': (
+        'SELECT COUNT(*) FROM lessons l WHERE l.course_id = ? AND (l.position, l.id) <= (?, ?)',
+        (1, 1, 1), set()),
+    'admin_enroll_requests': (
+        pagination.keyset_sql(pagination.PENDING_REQUESTS_SQL, pagination.PENDING_REQUESTS_KEY, (1,), True),
+        (1, 50), set()),
+    'live enroll requests': (
+        pagination.keyset_sql(pagination.PENDING_REQUESTS_SQL, pagination.PENDING_REQUESTS_KEY, (1,)),
+        (1, 100), set()),
+}
+
+
+def full_scans(conn, sql, params=()):
+    """أسماء الجداول التي تُمسح كاملاً (SCAN بدون فهرس) في خطة الاستعلام."""
+    scans = set()
+    for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params):
+        detail = row[3]
+        if detail.startswith('SCAN ') and ' USING ' not in detail:
+            scans.add(detail.split()[1])
+    return scans
+
+
+def check_query_plans(conn):
+    """يعيد قائمة (اسم الاستعلام، الجداول الممسوحة) للاستعلامات التي تتراجع إلى مسح كامل."""
+    violations = []
+    for name, (sql, params, allowed) in HOT_QUERIES.items():
+        # الأسماء المستعارة (l, up, er...) تظهر في الخطة بدل اسم الجدول
+        bad = {t for t in full_scans(conn, sql, params) if t not in allowed}
+        if bad:
+            violations.append((name, sorted(bad)))
+    return violations
+
+
+if __name__ == '__main__':
+    # python migrations.py [--uploads DIR] [db_path]
+    args = sys.argv[1:]
+    upload_dir = upload_dir_arg(args)
+    args = [a for a in args if not a.startswith('--')]
+    path = args[0] if args else DEFAULT_DB_PATH
+    conn = sqlite3.connect(path)
+    applied = migrate(conn, upload_dir)
+    print(f'schema version {current_version(conn)} (applied: {applied or "none"})')
+    if '--check-plans' in sys.argv:
+        problems = check_query_plans(conn)
+        for name, tables in problems:
+            print(f'❌ full table scan in {name}: {", ".join(tables)}')
+        if problems:
+            sys.exit(1)
+        print('✅ all hot queries use indexes')
+    conn.close()
@@ -0,0 +1,113 @@
+# === ترقيم صفحات القوائم بالمفتاح (keyset) بدل OFFSET ===
+# الصفحة التالية تبدأ بعد آخر صف معروض: WHERE (مفتاح الترتيب) > (قيمته في آخر صف)
+# فتكلفة الصفحة رقم 1000 مثل الأولى (OFFSET يقرأ كل الصفوف السابقة ثم يرميها).
+# المؤشر (cursor) في الرابط هو قيم المفتاح لآخر صف: "123" أو "4.123" لمفتاح مركب.
+#
+# استعلامات القوائم أدناه تختار الأعمدة المعروضة فقط (بدون SELECT *)؛
+# أعمدة HTML الكبيرة (full_desc_* / content_*) لا تُقرأ في صفحات القوائم.
+# {keyset} يجب أن يكون آخر شرط في WHERE: معاملاته تُضاف بعد معاملات المستدعي.
+import search
+
+LANDING_PAGE_SIZE = 12
+ADMIN_PAGE_SIZE = 50
+LESSONS_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 200
+
+
+def parse_cursor(value, size=1):
+    """'123' → (123,) و '4.123' → (4, 123)؛ None للصفحة الأولى. ValueError لمؤشر غير صالح."""
+    if not value:
+        return None
+    parts = tuple(int(p) for p in value.split('.'))
+    if len(parts) != size:
+        raise ValueError(f'cursor {value!r} should have {size} parts')
+    return parts
+
+
+def make_cursor(row, key):
+    return '.'.join(str(row[k.split('.')[-1]]) for k in key)
+
+
+def page_size(value, default, maximum=MAX_PAGE_SIZE):
+    """حجم الصفحة من ?limit= ضمن [1, maximum]."""
+    try:
+        return min(max(int(value), 1), maximum)
+    except (TypeError, ValueError):
+        return default
+
+
+def keyset_sql(sql, key, after, descending=False):
+    """sql مع شرط المؤشر (إن وُجد) و ORDER BY / LIMIT على أعمدة المفتاح."""
+    direction = 'DESC' if descending else 'ASC'
+    condition = '1'
+    if after:
+        condition = f"({', '.join(key)}) {'<' if descending else '>'} ({', '.join('?' * len(key))})"
+    order = ', '.join(f'{k} {direction}' for k in key)
+    return sql.format(keyset=condition) + f' ORDER BY {order} LIMIT ?'
+
+
+def fetch(conn, sql, params=(), key=('id',), after=None, limit=ADMIN_PAGE_SIZE, descending=False):
+    """(الصفوف، مؤشر الصفحة التالية أو None).
+
+    key: أعمدة الترتيب كما تُكتب في SQL، آخرها فريد (id)؛ يجب أن تكون ضمن الأعمدة المختارة.
+    يُقرأ صف إضافي واحد لمعرفة وجود صفحة تالية دون COUNT(*).
+    """
+    rows = conn.execute(keyset_sql(sql, key, after, descending),
+                        (*params, *(after or ()), limit + 1)).fetchall()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, make_cursor(rows[-1], key)
+
+
+# --- بطاقات الدورات في الصفحة الرئيسية (المفتاح: t.course_id تصاعدياً على مفتاح course_text) ---
+# المعاملات: اللغة، ثم المستخدم الحالي (0 للزائر) لاستبعاد الدورات المقبول فيها
+LANDING_COURSES_KEY = ('t.course_id',)
+LANDING_COURSES_SQL = """
+    SELECT t.course_id, c.id, t.title, t.short_desc, c.image, b.derivatives
+    FROM course_text t
+    JOIN courses c ON c.id = t.course_id
+    LEFT JOIN media_blobs b ON b.name = c.image
+    WHERE t.lang = ?
+      AND t.course_id NOT IN (SELECT course_id FROM enrollments WHERE user_id = ? AND approved = 1)
+      AND {keyset}
+"""
+
+# --- دورات لوحة الإدارة (الأحدث أولاً) مع عدد الطلاب والمكملين من عدادات الالتحاق ---
+ADMIN_COURSES_KEY = ('c.id',)
+_ADMIN_COURSES_SELECT = """
+    SELECT c.id, c.title_ar, c.title_en,
+           (SELECT COUNT(*) FROM enrollments e
+             WHERE e.course_id = c.id AND e.approved = 1) AS students,
+           (SELECT COUNT(*) FROM enrollments e
+             WHERE e.course_id = c.id AND e.approved = 1
+               AND e.total_lessons > 0 AND e.completed_lessons >= e.total_lessons) AS graduates
+    FROM courses c
+"""
+ADMIN_COURSES_SQL = _ADMIN_COURSES_SELECT + 'WHERE {keyset}'
+# نفسه مع تصفية البحث؛ المعاملات: (تعبير MATCH، تعبير MATCH)
+ADMIN_COURSES_MATCHING_SQL = _ADMIN_COURSES_SELECT + f"""
+    WHERE c.id IN ({search.MATCHING_COURSES_SQL})
+      AND {{keyset}}
+"""
+
+# --- دروس دورة في لوحة الإدارة (المفتاح: الترتيب ثم id لأن position غير فريد) ---
+ADMIN_LESSONS_KEY = ('l.position', 'l.id')
+ADMIN_LESSONS_SQL = """
+    SELECT l.id, l.title_ar, l.title_en, l.position, l.video
+    FROM lessons l
+    WHERE l.course_id = ?
+      AND {keyset}
+"""
+
+# --- طلبات التسجيل المعلقة (الأحدث أولاً) على الفهرس (status, id) ---
+PENDING_REQUESTS_KEY = ('er.id',)
+PENDING_REQUESTS_SQL = """
+    SELECT er.id, u.id AS user_id, u.fullname, u.username,
+           c.id AS course_id, c.title_ar, c.title_en
+    FROM enroll_requests er
+    JOIN users u ON er.user_id = u.id
+    JOIN courses c ON er.course_id = c.id
+    WHERE er.status = 'pending'
+      AND {keyset}
+"""
@@ -0,0 +1,403 @@
+# === طبقة الوصول لبيانات تقدم الطالب (Progress data access) ===
+# استعلامات مجمّعة بدل استعلام لكل دورة (N+1) في صفحة الملف الشخصي.
+#
+# مخزنان للتقدم خلف نفس الواجهة (يُختار عبر app.config['PROGRESS_BACKEND']):
+#   rows   — صف في user_progress لكل درس مكتمل (الافتراضي)
+#   bitset — خريطة بتات مضغوطة لكل (مستخدم، دورة) في progress_bitsets،
+#            البت رقم lessons.progress_slot يعني أن الدرس مكتمل
+# النصوص من الإسقاط المترجم course_text / lesson_text (l10n.py): المعامل الأول lang.
+import l10n
+
+# الدورات المقبولة مع ملخص الإكمال (done/total) من عدادات الالتحاق
+PROFILE_COURSES_SQL = """
+    SELECT c.id,
+           t.title,
+           c.image,
+           t.short_desc,
+           e.total_lessons AS total,
+           e.completed_lessons AS done
+    FROM enrollments e
+    JOIN course_text t ON t.lang = ? AND t.course_id = e.course_id
+    JOIN courses c ON e.course_id = c.id
+    WHERE e.user_id = ?
+      AND e.approved = 1
+    ORDER BY e.course_id
+"""
+
+# ملخص الإكمال فقط (بدون نصوص الدورات)
+COMPLETION_SUMMARY_SQL = """
+    SELECT course_id, total_lessons AS total, completed_lessons AS done
+    FROM enrollments
+    WHERE user_id = ?
+      AND approved = 1
+"""
+
+# كل دروس الدورات المقبولة مع حالة الإكمال في استعلام واحد
+PROFILE_LESSONS_SQL = """
+    SELECT t.course_id,
+           t.lesson_id AS id,
+           t.title,
+           t.position,
+           up.completed
+    FROM enrollments e
+    JOIN lesson_text t ON t.lang = ? AND t.course_id = e.course_id
+    LEFT JOIN user_progress up ON up.lesson_id = t.lesson_id AND up.user_id = e.user_id
+    WHERE e.user_id = ?
+      AND e.approved = 1
+    ORDER BY e.course_id, t.position
+"""
+
+# دروس دورة واحدة مع حالة الإكمال (صفحة الدورة)
+COURSE_LESSONS_SQL = """
+    SELECT t.lesson_id AS id,
+           t.title,
+           t.position,
+           up.completed
+    FROM lesson_text t
+    LEFT JOIN user_progress up ON up.lesson_id = t.lesson_id AND up.user_id = ?
+    WHERE t.lang = ?
+      AND t.course_id = ?
+    ORDER BY t.position ASC
+"""
+
+# تسجيل إكمال درس مع إعادة التحقق من الالتحاق المقبول وقت الكتابة (الكتابة المجمّعة: progress_writer.py)؛
+# درس حُذف أو التحاق أُلغي بعد قبول الطلب لا يُكتب، ودرس مكتمل مسبقاً لا يُعاد كتابته
+MARK_COMPLETED_CHECKED_SQL = """
+    INSERT INTO user_progress (user_id, lesson_id, completed)
+    SELECT e.user_id, l.id, 1
+    FROM lessons l
+    JOIN enrollments e ON e.course_id = l.course_id AND e.user_id = ?1 AND e.approved = 1
+    WHERE l.id = ?2
+    ON CONFLICT(user_id, lesson_id) DO UPDATE SET completed = 1
+    WHERE user_progress.completed IS NOT 1
+"""
+
+# موضع المشاهدة من نبضات live.py: آخر موضع فقط، بنفس إعادة التحقق من الالتحاق وقت الكتابة المجمّعة
+SAVE_POSITION_CHECKED_SQL = """
+    INSERT INTO watch_positions (user_id, lesson_id, position, duration, updated_at)
+    SELECT e.user_id, l.id, ?3, ?4, ?5
+    FROM lessons l
+    JOIN enrollments e ON e.course_id = l.course_id AND e.user_id = ?1 AND e.approved = 1
+    WHERE l.id = ?2
+    ON CONFLICT(user_id, lesson_id) DO UPDATE SET
+        position = excluded.position, duration = excluded.duration, updated_at = excluded.updated_at
+"""
+WATCH_POSITION_SQL = 'SELECT position, duration FROM watch_positions WHERE user_id = ? AND lesson_id = ?'
+
+# أول درس لم يكتمل بعد (زر "متابعة")
+RESUME_LESSON_SQL = """
+    SELECT l.id FROM lessons l
+    WHERE l.course_id = ?
+      AND NOT EXISTS (SELECT 1 FROM user_progress up
+                      WHERE up.user_id = ? AND up.lesson_id = l.id AND up.completed = 1)
+    ORDER BY l.position, l.id
+    LIMIT 1
+"""
+
+# نفس الاستعلامات لمخزن البتات: رقم الخانة بدل الانضمام إلى user_progress
+BITSET_PROFILE_LESSONS_SQL = """
+    SELECT t.course_id,
+           t.lesson_id AS id,
+           t.title,
+           t.position,
+           l.progress_slot
+    FROM enrollments e
+    JOIN lesson_text t ON t.lang = ? AND t.course_id = e.course_id
+    JOIN lessons l ON l.id = t.lesson_id
+    WHERE e.user_id = ?
+      AND e.approved = 1
+    ORDER BY e.course_id, t.position
+"""
+
+BITSET_COURSE_LESSONS_SQL = """
+    SELECT t.lesson_id AS id,
+           t.title,
+           t.position,
+           l.progress_slot
+    FROM lesson_text t
+    JOIN lessons l ON l.id = t.lesson_id
+    WHERE t.lang = ?
+      AND t.course_id = ?
+    ORDER BY t.position ASC
+"""
+
+
+def completion_summary(conn, user_id):
+    """ملخص الإكمال لكل دورة مقبولة: {course_id: (done, total)}."""
+    rows = conn.execute(COMPLETION_SUMMARY_SQL, (user_id,)).fetchall()
+    return {row['course_id']: (row['done'], row['total']) for row in rows}
+
+
+def is_course_complete(enrollment):
+    """أهلية الشهادة من عدادات صف الالتحاق مباشرة (O(1))."""
+    return enrollment['completed_lessons'] >= enrollment['total_lessons']
+
+
+def percent_complete(enrollment):
+    total = enrollment['total_lessons']
+    return int(100 * enrollment['completed_lessons'] / total) if total else 0
+
+
+# === إعادة بناء العدادات من الصفر (إصلاح) ===
+def rebuild_counters(conn, course_id=None):
+    """إعادة حساب completed_lessons / total_lessons لكل الالتحاقات (أو لدورة واحدة)."""
+    where, params = ('WHERE course_id = ?', (course_id,)) if course_id is not None else ('', ())
+    conn.execute(f"""
+        UPDATE enrollments SET
+            total_lessons = (SELECT COUNT(*) FROM lessons l WHERE l.course_id = enrollments.course_id),
+            completed_lessons = (SELECT COUNT(*) FROM user_progress up
+                                 WHERE up.user_id = enrollments.user_id
+                                   AND up.lesson_id IN (SELECT id FROM lessons
+                                                        WHERE course_id = enrollments.course_id)
+                                   AND up.completed = 1)
+        {where}
+    """, params)
+
+
+def _group_profile(courses, lessons):
+    tree = []
+    by_course = {}
+    for course in courses:
+        item = {'course': course, 'lessons': [], 'done': course['done'], 'total': course['total']}
+        tree.append(item)
+        by_course[course['id']] = item['lessons']
+
+    # تجميع الدروس في تمريرة واحدة
+    for lesson in lessons:
+        bucket = by_course.get(lesson['course_id'])
+        if bucket is not None:
+            bucket.append(lesson)
+    return tree
+
+
+# === مخزن الصفوف (user_progress) ===
+class RowProgressStore:
+    name = 'rows'
+
+    def profile_tree(self, conn, user_id, lang):
+        """شجرة الملف الشخصي: دورات → دروس مرتبة → حالة الإكمال، باستعلامين فقط.
+
+        تعيد قائمة من {'course', 'lessons', 'done', 'total'} بنفس ترتيب الدورات.
+        """
+        lang = l10n.resolve(lang)
+        courses = conn.execute(PROFILE_COURSES_SQL, (lang, user_id)).fetchall()
+        return _group_profile(courses, conn.execute(PROFILE_LESSONS_SQL, (lang, user_id)))
+
+    def course_lessons(self, conn, user_id, course_id, lang):
+        return conn.execute(COURSE_LESSONS_SQL, (user_id, l10n.resolve(lang), course_id)).fetchall()
+
+    def is_completed(self, conn, user_id, lesson_id):
+        row = conn.execute('SELECT completed FROM user_progress WHERE user_id=? AND lesson_id=?',
+                           (user_id, lesson_id)).fetchone()
+        return bool(row and row['completed'])
+
+    def mark_completed(self, conn, user_id, lesson_id, course_id):
+        # العدادات تُحدَّث عبر triggers على user_progress
+        conn.execute('''
+            INSERT INTO user_progress (user_id, lesson_id, completed)
+            VALUES (?, ?, 1)
+            ON CONFLICT(user_id, lesson_id) DO UPDATE SET completed=1
+        ''', (user_id, lesson_id))
+
+    def mark_completed_many(self, conn, events):
+        """events: [(user_id, lesson_id), ...] مع إعادة التحقق من الالتحاق؛ بلا commit."""
+        conn.executemany(MARK_COMPLETED_CHECKED_SQL, events)
+
+    def resume_lesson(self, conn, user_id, course_id):
+        row = conn.execute(RESUME_LESSON_SQL, (course_id, user_id)).fetchone()
+        return row['id'] if row else None
+
+    def lesson_deleted(self, conn, lesson):
+        # trigger trg_lessons_delete_counters يحذف صفوف التقدم ويصحح العدادات
+        pass
+
+    def rebuild_counters(self, conn, course_id=None):
+        rebuild_counters(conn, course_id)
+
+
+# === مخزن البتات (progress_bitsets) ===
+def bitset_set(bits, slot):
+    data = bytearray(bits or b'')
+    byte = slot >> 3
+    if len(data) <= byte:
+        data.extend(b'\0' * (byte + 1 - len(data)))
+    data[byte] |= 1 << (slot & 7)
+    return bytes(data)
+
+
+def bitset_clear(bits, slot):
+    data = bytearray(bits or b'')
+    byte = slot >> 3
+    if byte < len(data):
+        data[byte] &= ~(1 << (slot & 7)) & 0xFF
+    return bytes(data)
+
+
+def bitset_test(bits, slot):
+    if slot is None:
+        return False
+    byte = slot >> 3
+    return bool(bits) and byte < len(bits) and bool(bits[byte] >> (slot & 7) & 1)
+
+
+def bitset_count(bits):
+    return int.from_bytes(bits, 'little').bit_count() if bits else 0
+
+
+def register_functions(conn):
+    """تسجيل دوال البتات في SQLite (تُستدعى لكل اتصال جديد عبر on_connect في المجمّع)."""
+    conn.create_function('bitset_set', 2, bitset_set, deterministic=True)
+    conn.create_function('bitset_clear', 2, bitset_clear, deterministic=True)
+    conn.create_function('bitset_count', 1, bitset_count, deterministic=True)
+
+
+class BitsetProgressStore:
+    name = 'bitset'
+
+    def _bits(self, conn, user_id, course_id):
+        row = conn.execute('SELECT bits FROM progress_bitsets WHERE user_id=? AND course_id=?',
+                           (user_id, course_id)).fetchone()
+        return row['bits'] if row else None
+
+    def _with_completed(self, lessons, bits_for):
+        # bits_for(lesson) تعيد خريطة البتات الخاصة بدورة الدرس
+        result = []
+        for lesson in lessons:
+            item = dict(lesson)
+            item['completed'] = 1 if bitset_test(bits_for(item), item.pop('progress_slot')) else None
+            result.append(item)
+        return result
+
+    def profile_tree(self, conn, user_id, lang):
+        lang = l10n.resolve(lang)
+        courses = conn.execute(PROFILE_COURSES_SQL, (lang, user_id)).fetchall()
+        bits = dict(conn.execute('SELECT course_id, bits FROM progress_bitsets WHERE user_id=?',
+                                 (user_id,)).fetchall())
+        lessons = conn.execute(BITSET_PROFILE_LESSONS_SQL, (lang, user_id)).fetchall()
+        return _group_profile(courses, self._with_completed(lessons, lambda l: bits.get(l['course_id'])))
+
+    def course_lessons(self, conn, user_id, course_id, lang):
+        lessons = conn.execute(BITSET_COURSE_LESSONS_SQL, (l10n.resolve(lang), course_id)).fetchall()
+        bits = self._bits(conn, user_id, course_id)
+        return self._with_completed(lessons, lambda l: bits)
+
+    def is_completed(self, conn, user_id, lesson_id):
+        row = conn.execute("""
+            SELECT b.bits, l.progress_slot FROM lessons l
+            JOIN progress_bitsets b ON b.course_id = l.course_id AND b.user_id = ?
+            WHERE l.id = ?
+        """, (user_id, lesson_id)).fetchone()
+        return bool(row) and bitset_test(row['bits'], row['progress_slot'])
+
+    def mark_completed(self, conn, user_id, lesson_id, course_id):
+        # تعيين البت في عبارة واحدة (ذرّية) ثم تحديث العداد بعدّ البتات
+        slot = conn.execute('SELECT progress_slot FROM lessons WHERE id=?', (lesson_id,)).fetchone()[0]
+        conn.execute("""
+            INSERT INTO progress_bitsets (user_id, course_id, bits)
+            VALUES (?, ?, bitset_set(NULL, ?))
+            ON CONFLICT(user_id, course_id) DO UPDATE SET bits = bitset_set(progress_bitsets.bits, ?)
+        """, (user_id, course_id, slot, slot))
+        conn.execute("""
+            UPDATE enrollments SET completed_lessons = (
+                SELECT bitset_count(bits) FROM progress_bitsets WHERE user_id = ? AND course_id = ?)
+            WHERE user_id = ? AND course_id = ?
+        """, (user_id, course_id, user_id, course_id))
+
+    def mark_completed_many(self, conn, events):
+        for user_id, lesson_id in events:
+            row = conn.execute("""
+                SELECT l.course_id FROM lessons l
+                JOIN enrollments e ON e.course_id = l.course_id AND e.user_id = ? AND e.approved = 1
+                WHERE l.id = ?
+            """, (user_id, lesson_id)).fetchone()
+            if row is not None:
+                self.mark_completed(conn, user_id, lesson_id, row[0])
+
+    def resume_lesson(self, conn, user_id, course_id):
+        bits = self._bits(conn, user_id, course_id)
+        for row in conn.execute('SELECT id, progress_slot FROM lessons WHERE course_id=? '
+                                'ORDER BY position, id', (course_id,)):
+            if not bitset_test(bits, row['progress_slot']):
+                return row['id']
+        return None
+
+    def lesson_deleted(self, conn, lesson):
+        # مسح خانة الدرس المحذوف من كل خرائط الدورة وإعادة عدّ المكتمل
+        conn.execute('UPDATE progress_bitsets SET bits = bitset_clear(bits, ?) WHERE course_id = ?',
+                     (lesson['progress_slot'], lesson['course_id']))
+        self.rebuild_counters(conn, lesson['course_id'], total=False)
+
+    def rebuild_counters(self, conn, course_id=None, total=True):
+        where, params = ('WHERE course_id = ?', (course_id,)) if course_id is not None else ('', ())
+        total_sql = ('total_lessons = (SELECT COUNT(*) FROM lessons l '
+                     'WHERE l.course_id = enrollments.course_id),') if total else ''
+        conn.execute(f"""
+            UPDATE enrollments SET {total_sql}
+                completed_lessons = COALESCE((SELECT bitset_count(b.bits) FROM progress_bitsets b
+                                              WHERE b.user_id = enrollments.user_id
+                                                AND b.course_id = enrollments.course_id), 0)
+            {where}
+        """, params)
+
+
+STORES = {store.name: store for store in (RowProgressStore(), BitsetProgressStore())}
+
+
+def get_store(name='rows'):
+    try:
+        return STORES[name]
+    except KeyError:
+        raise ValueError(f'unknown progress backend: {name!r} (expected one of {sorted(STORES)})')
+
+
+# === التحويل من صفوف user_progress إلى خرائط البتات ===
+def migrate_rows_to_bitsets(conn):
+    """بناء progress_bitsets من user_progress (الصفوف تبقى كما هي)؛ يعيد عدد الخرائط."""
+    bits = {}
+    for row in conn.execute("""
+        SELECT up.user_id, l.course_id, l.progress_slot
+        FROM user_progress up JOIN lessons l ON l.id = up.lesson_id
+        WHERE up.completed = 1
+    """):
+        key = (row[0], row[1])
+        bits[key] = bitset_set(bits.get(key), row[2])
+    conn.executemany("""
+        INSERT INTO progress_bitsets (user_id, course_id, bits) VALUES (?, ?, ?)
+        ON CONFLICT(user_id, course_id) DO UPDATE SET bits = excluded.bits
+    """, [(u, c, b) for (u, c), b in bits.items()])
+    STORES['bitset'].rebuild_counters(conn)
+    return len(bits)
+
+
+if __name__ == '__main__':
+    import sqlite3
+    import sys
+
+    import migrations
+
+    usage = ('usage: python progress.py --rebuild-counters [--backend rows|bitset] [db_path]\n'
+             '       python progress.py --to-bitset [db_path]')
+    args = sys.argv[1:]
+    backend = 'rows'
+    if '--backend' in args:
+        i = args.index('--backend')
+        backend = args[i + 1]
+        del args[i:i + 2]
+    paths = [a for a in args if not a.startswith('--')]
+    conn = sqlite3.connect(paths[0] if paths else migrations.DEFAULT_DB_PATH)
+    conn.row_factory = sqlite3.Row
+    register_functions(conn)
+    migrations.migrate(conn)
+    if '--rebuild-counters' in args:
+        with conn:
+            get_store(backend).rebuild_counters(conn)
+        print(f'✅ progress counters rebuilt ({backend}) for',
+              conn.execute('SELECT COUNT(*) FROM enrollments').fetchone()[0], 'enrollments')
+    elif '--to-bitset' in args:
+        with conn:
+            count = migrate_rows_to_bitsets(conn)
+        print(f'✅ converted user_progress rows into {count} progress bitsets')
+    else:
+        print(usage)
+        sys.exit(2)
+    conn.close()
@@ -0,0 +1,107 @@
+# === كتابة التقدم المجمّعة لـ mark_watched ===
+# بدل معاملة (و fsync) لكل نقرة: الطلب يضيف الحدث إلى مخزن مؤقت في الذاكرة ويرد 204 فوراً،
+# وخيط واحد يكتب كل ما تجمّع في معاملة واحدة كل interval ثانية أو عند بلوغ max_batch حدثاً.
+#   - الأحداث مفتاحها (user_id, lesson_id): تكرار النقر قبل الكتابة يُدمج في حدث واحد
+#   - الكتابة idempotent وتعيد التحقق من الالتحاق (progress.MARK_COMPLETED_CHECKED_SQL)
+#   - "مرة على الأقل": دفعة فشلت تعود إلى المخزن المؤقت، و stop() يكتب الباقي عند الإغلاق
+#   - "اقرأ ما كتبت": pending(user_id) يخبر المسار أن للمستخدم أحداثاً لم تُكتب فيستدعي flush()
+# الضمان الأخير داخل العملية فقط: مع عدة عمال قد يقرأ عامل آخر قبل الكتابة (بتأخير ≤ interval).
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class ProgressWriter:
+    def __init__(self, connect, store, interval=0.05, max_batch=500):
+        self.connect = connect
+        self.store = store
+        self.interval = interval
+        self.max_batch = max_batch
+        self._pending = set()
+        self._users = set()
+        # مستخدمو الدفعة الجارية كتابتها: pending() صحيحة لهم حتى commit
+        self._inflight = set()
+        self._lock = threading.Lock()
+        # flush() من خيط الكتابة أو من طلب يحتاج قراءة ما كتبه: كاتب واحد في كل مرة
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._conn = None
+        self.counters = {'queued': 0, 'coalesced': 0, 'written': 0, 'batches': 0, 'errors': 0}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name='progress-writer', daemon=True)
+        self._thread.start()
+        return self
+
+    def add(self, user_id, lesson_id):
+        with self._lock:
+            key = (user_id, lesson_id)
+            if key in self._pending:
+                self.counters['coalesced'] += 1
+                return
+            self._pending.add(key)
+            self._users.add(user_id)
+            self.counters['queued'] += 1
+            full = len(self._pending) >= self.max_batch
+        if full:
+            self._wake.set()
+
+    def pending(self, user_id):
+        return user_id in self._users or user_id in self._inflight
+
+    def flush(self):
+        """كتابة كل الأحداث المعلقة في معاملة واحدة؛ يعيد عددها."""
+        with self._flush_lock:
+            with self._lock:
+                events, self._pending = list(self._pending), set()
+                self._inflight, self._users = self._users, set()
+            if not events:
+                return 0
+            try:
+                if self._conn is None:
+                    self._conn = self.connect()
+                with self._conn:
+                    self.store.mark_completed_many(self._conn, events)
+            except Exception:
+                # إعادة الأحداث للمحاولة التالية (الكتابة idempotent فلا ضرر من تكرارها)
+                log.exception('progress flush failed (%d events)', len(events))
+                with self._lock:
+                    self.counters['errors'] += 1
+                    self._pending.update(events)
+                    self._users.update(user_id for user_id, _ in events)
+                    self._inflight = set()
+                raise
+            with self._lock:
+                self._inflight = set()
+                self.counters['written'] += len(events)
+                self.counters['batches'] += 1
+            return len(events)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                time.sleep(self.interval)
+
+    def stop(self):
+        """إيقاف الخيط وكتابة ما تبقى (يُستدعى عند إغلاق العملية)."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, pending=len(self._pending), interval=self.interval,
+                        max_batch=self.max_batch)
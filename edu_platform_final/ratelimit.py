@@ -0,0 +1,210 @@
+# === تحديد معدل الطلبات (token bucket) لمسارات الدخول والتسجيل وطلب الالتحاق ===
+# لكل مفتاح "<endpoint>:<scope>:<value>" دلو بسعة capacity يمتلئ بمعدل rate رمز/ثانية؛
+# كل طلب يأخذ رمزاً، وعند نفاد الرموز يُرد 429 مع Retry-After (الثواني حتى الرمز التالي).
+# الدلو يُحسب عند الطلب فقط (tokens + المنقضي × rate) فالتحديث O(1) بلا مؤقتات.
+# الدلو الخامل حتى يمتلئ مثل غير الموجود، فيُحذف (expires) ولا تنمو الذاكرة مع عناوين المهاجم.
+# المخزن بنفس الواجهة (take / stats / clear):
+#   MemoryStore — داخل العملية (عامل واحد)
+#   SQLiteStore — ملف SQLite محلي مشترك بين العمال على نفس الجهاز (منفصل عن قاعدة التطبيق)
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+RULE_RE = re.compile(r'^\s*(\w+)\s*:\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$')
+
+
+class Limit:
+    """count طلب لكل period ثانية، مع سماح بدفعة حتى count دفعة واحدة."""
+
+    def __init__(self, count, period):
+        self.capacity = float(count)
+        self.rate = count / period
+        # زمن امتلاء الدلو الفارغ: بعده لا فرق بين الدلو وغيابه
+        self.idle = period
+
+    def __repr__(self):
+        return f'Limit({self.capacity:g}/{self.idle:g}s)'
+
+
+def parse_rules(text):
+    """'ip:20/minute, user:10/5minutes' → {'ip': Limit, 'user': Limit}."""
+    rules = {}
+    for part in filter(None, (p.strip() for p in text.split(','))):
+        match = RULE_RE.match(part)
+        if not match:
+            raise ValueError(f'bad rate limit rule {part!r} (expected scope:count/period)')
+        scope, count, multiplier, period = match.groups()
+        rules[scope] = Limit(int(count), int(multiplier or 1) * PERIODS[period])
+    return rules
+
+
+class _Stats:
+    def __init__(self):
+        self.allowed = 0
+        self.limited = 0
+
+    def as_dict(self):
+        return {'allowed': self.allowed, 'limited': self.limited}
+
+
+class MemoryStore:
+    backend = 'memory'
+
+    def __init__(self):
+        # المفتاح → [tokens, updated, expires]؛ الترتيب حسب آخر استخدام فأقدمها في البداية
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = _Stats()
+
+    def take(self, key, limit, now=None):
+        """(مسموح؟، ثوانٍ حتى الرمز التالي)."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._expire(now)
+            bucket = self._buckets.pop(key, None)
+            tokens = limit.capacity if bucket is None else min(
+                limit.capacity, bucket[0] + (now - bucket[1]) * limit.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = [tokens, now, now + limit.idle]
+            self._count(allowed)
+        return allowed, 0.0 if allowed else (1 - tokens) / limit.rate
+
+    def _expire(self, now):
+        # الأقدم استخداماً أولاً؛ يكفي التوقف عند أول دلو لم ينتهِ (تقريب: الحدود متقاربة)
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if bucket[2] > now:
+                break
+            del self._buckets[key]
+
+    def _count(self, allowed):
+        if allowed:
+            self._stats.allowed += 1
+        else:
+            self._stats.limited += 1
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def stats(self):
+        return dict(self._stats.as_dict(), backend=self.backend, keys=len(self._buckets))
+
+
+class SQLiteStore:
+    """الدلو صف واحد يُحدَّث بعبارة UPSERT واحدة (قراءة + إعادة ملء + أخذ رمز دون سباق بين العمال)."""
+    backend = 'sqlite'
+
+    TAKE_SQL = """
+        INSERT INTO buckets (key, tokens, updated, expires, allowed)
+        VALUES (:key, :capacity - 1, :now, :now + :idle, 1)
+        ON CONFLICT(key) DO UPDATE SET
+            allowed = MIN(:capacity, tokens + (:now - updated) * :rate) >= 1,
+            tokens = MIN(:capacity, tokens + (:now - updated) * :rate)
+                     - (MIN(:capacity, tokens + (:now - updated) * :rate) >= 1),
+            updated = :now,
+            expires = :now + :idle
+        RETURNING allowed, tokens
+    """
+
+    def __init__(self, path, sweep_every=1000):
+        self.path = path
+        self.sweep_every = sweep_every
+        self._local = threading.local()
+        self._stats = _Stats()
+        self._lock = threading.Lock()
+        self._calls = 0
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL,
+                expires REAL NOT NULL,
+                allowed INTEGER NOT NULL
+            ) WITHOUT ROWID
+        """)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # autocommit: كل UPSERT معاملة قصيرة؛ الحالة قابلة للفقد فلا داعي لـ fsync
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, limit, now=None):
+        # الوقت الحقيقي لا monotonic: العمال عمليات مختلفة
+        now = time.time() if now is None else now
+        conn = self._conn()
+        allowed, tokens = conn.execute(self.TAKE_SQL, {
+            'key': key, 'capacity': limit.capacity, 'rate': limit.rate, 'now': now, 'idle': limit.idle,
+        }).fetchone()
+        with self._lock:
+            self._count(bool(allowed))
+            self._calls += 1
+            sweep = self._calls % self.sweep_every == 0
+        if sweep:
+            conn.execute('DELETE FROM buckets WHERE expires < ?', (now,))
+        return bool(allowed), 0.0 if allowed else (1 - tokens) / limit.rate
+
+    _count = MemoryStore._count
+
+    def clear(self):
+        self._conn().execute('DELETE FROM buckets')
+
+    def stats(self):
+        keys = self._conn().execute('SELECT COUNT(*) FROM buckets').fetchone()[0]
+        return dict(self._stats.as_dict(), backend=self.backend, keys=keys)
+
+
+class NullStore:
+    """تعطيل التحديد مع الإبقاء على نفس الواجهة."""
+    backend = 'none'
+
+    def __init__(self):
+        self._stats = _Stats()
+
+    def take(self, key, limit, now=None):
+        self._stats.allowed += 1
+        return True, 0.0
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return dict(self._stats.as_dict(), backend=self.backend, keys=0)
+
+
+def make_store(backend, path=None):
+    if backend == 'memory':
+        return MemoryStore()
+    if backend == 'sqlite':
+        return SQLiteStore(path)
+    if backend == 'none':
+        return NullStore()
+    raise ValueError(f'unknown rate limit backend: {backend!r}')
+
+
+def check(store, endpoint, rules, values):
+    """يأخذ رمزاً من دلو كل نطاق له قيمة؛ يعيد 0 إن سُمح أو ثواني Retry-After.
+
+    كل الدلاء تُستهلك حتى لو رُفض أحدها: المهاجم يستنزف حصته على كل المفاتيح.
+    """
+    retry_after = 0.0
+    for scope, limit in rules.items():
+        value = values.get(scope)
+        if value is None:
+            continue
+        allowed, wait = store.take(f'{endpoint}:{scope}:{value}', limit)
+        if not allowed:
+            retry_after = max(retry_after, wait)
+    return math.ceil(retry_after) if retry_after else 0
@@ -1,16 +1,25 @@
 # reset_admin_password.py
+import os
 import sqlite3
-from werkzeug.security import generate_password_hash
+
+import cache
+import credentials
 
 DB = "instance/db.sqlite"   # تأكد من المسار الصحيح
 ADMIN_USERNAME = "admin@example.com"  # استبدل باسم مستخدم المشرف الفعلي
 NEW_PASSWORD = "NewStrongP@ssw0rd"    # ضع هنا كلمة مرور جديدة قوية
 
-hashed = generate_password_hash(NEW_PASSWORD)
+hashed = credentials.hash_password(NEW_PASSWORD, int(os.environ.get("PASSWORD_SCRYPT_N", credentials.DEFAULT_N)))
 
 conn = sqlite3.connect(DB)
 cur = conn.cursor()
 cur.execute("UPDATE users SET password = ? WHERE username = ?", (hashed, ADMIN_USERNAME))
 conn.commit()
+# حذف المستخدم من ذاكرة user_loader المشتركة (USER_CACHE_BACKEND=file)؛
+# ذاكرة memory داخل كل عامل تنتهي خلال USER_CACHE_TTL
+USER_CACHE_DIR = os.path.join(os.path.dirname(DB), "cache", "users")
+if os.path.isdir(USER_CACHE_DIR):
+    for (user_id,) in cur.execute("SELECT id FROM users WHERE username = ?", (ADMIN_USERNAME,)):
+        cache.FileCache(USER_CACHE_DIR).delete(f"user:{user_id}")
 print("Password updated for", ADMIN_USERNAME)
 conn.close()
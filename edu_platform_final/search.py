@@ -0,0 +1,177 @@
+# === البحث النصي الكامل في الدورات والدروس (SQLite FTS5) ===
+# جدول واحد search_index لكل المستندات؛ rowid يحدد النوع والمعرف:
+#   دورة  → id * 2      درس → id * 2 + 1
+# النص يُطبَّع قبل الفهرسة وقبل البحث (normalize) لأن مُقطِّع unicode61 لا يعرف العربية:
+#   حذف التشكيل والتطويل، أ/إ/آ/ٱ → ا، ى → ي، ة → ه، ؤ → و، ئ → ي، وحذف "ال" التعريف
+# الفهرس يُحدَّث من مسارات الإدارة نفسها (index_course / index_lesson / remove_*) داخل معاملتها.
+import html
+import re
+
+import l10n
+
+DIACRITICS_RE = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+# str.replace متتالية أسرع بكثير من str.translate بجدول dict على النص العربي
+FOLD = (('أ', 'ا'), ('إ', 'ا'), ('آ', 'ا'), ('ٱ', 'ا'), ('ى', 'ي'), ('ة', 'ه'), ('ؤ', 'و'), ('ئ', 'ي'))
+TAG_RE = re.compile(r'<[^>]+>')
+WORD_RE = re.compile(r'\w+')
+# أدوات التعريف الملتصقة (الأطول أولاً)؛ لا تُحذف إن بقي أقل من حرفين
+ARTICLE_RE = re.compile(r'\b(?:وال|بال|كال|فال|لل|ال)(?=\w\w)')
+TITLE_WEIGHT = 10.0
+PER_PAGE = 20
+
+
+def normalize(text):
+    """نص قابل للفهرسة: بدون HTML ولا تشكيل، بحروف عربية موحدة وأحرف لاتينية صغيرة."""
+    if not text:
+        return ''
+    text = html.unescape(TAG_RE.sub(' ', text))
+    text = DIACRITICS_RE.sub('', text).lower()
+    for letter, folded in FOLD:
+        text = text.replace(letter, folded)
+    return ' '.join(WORD_RE.findall(ARTICLE_RE.sub('', text)))
+
+
+def match_expression(query):
+    """استعلام المستخدم → تعبير MATCH: كل كلمة مطلوبة (AND) ومطابقة البادئة للأخيرة.
+
+    الكلمات تُقتبس دائماً فلا تُفسَّر رموز FTS5 (NEAR / OR / * / -) القادمة من المستخدم.
+    """
+    words = normalize(query).split()
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words[:-1]] + [f'"{words[-1]}"*']
+    return ' '.join(terms)
+
+
+def course_rowid(course_id):
+    return course_id * 2
+
+
+def lesson_rowid(lesson_id):
+    return lesson_id * 2 + 1
+
+
+def _put(conn, rowid, title, body):
+    conn.execute('DELETE FROM search_index WHERE rowid = ?', (rowid,))
+    conn.execute('INSERT INTO search_index (rowid, title, body) VALUES (?, ?, ?)',
+                 (rowid, normalize(title), normalize(body)))
+
+
+def index_course(conn, course_id):
+    row = conn.execute('SELECT * FROM courses WHERE id = ?', (course_id,)).fetchone()
+    if row is None:
+        return remove_course(conn, course_id)
+    _put(conn, course_rowid(course_id),
+         f"{row['title_ar'] or ''} {row['title_en'] or ''}",
+         ' '.join(row[c] or '' for c in ('short_desc_ar', 'short_desc_en', 'full_desc_ar', 'full_desc_en')))
+
+
+def index_lesson(conn, lesson_id):
+    row = conn.execute('SELECT * FROM lessons WHERE id = ?', (lesson_id,)).fetchone()
+    if row is None:
+        return remove_lesson(conn, lesson_id)
+    _put(conn, lesson_rowid(lesson_id),
+         f"{row['title_ar'] or ''} {row['title_en'] or ''}",
+         f"{row['content_ar'] or ''} {row['content_en'] or ''}")
+
+
+def remove_course(conn, course_id):
+    conn.execute('DELETE FROM search_index WHERE rowid = ?', (course_rowid(course_id),))
+
+
+def remove_lesson(conn, lesson_id):
+    conn.execute('DELETE FROM search_index WHERE rowid = ?', (lesson_rowid(lesson_id),))
+
+
+def remove_course_lessons(conn, course_id):
+    """حذف دروس الدورة من الفهرس (قبل حذف صفوفها)."""
+    conn.execute('DELETE FROM search_index WHERE rowid IN (SELECT id * 2 + 1 FROM lessons WHERE course_id = ?)',
+                 (course_id,))
+
+
+def rebuild(conn, batch=1000):
+    """إعادة بناء الفهرس بالكامل من الجداول (الترحيل وأمر --rebuild)."""
+    conn.execute('DELETE FROM search_index')
+    # بدون دمج تلقائي للمقاطع أثناء الإدخال بالجملة؛ دمج واحد كامل (optimize) في النهاية
+    conn.execute("INSERT INTO search_index (search_index, rank) VALUES ('automerge', 0)")
+    for table, rowid, title, body in (
+            ('courses', 'id * 2', ('title_ar', 'title_en'),
+             ('short_desc_ar', 'short_desc_en', 'full_desc_ar', 'full_desc_en')),
+            ('lessons', 'id * 2 + 1', ('title_ar', 'title_en'), ('content_ar', 'content_en'))):
+        cur = conn.execute(f"SELECT {rowid}, {', '.join(title + body)} FROM {table}")
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            conn.executemany('INSERT INTO search_index (rowid, title, body) VALUES (?, ?, ?)', [
+                (r[0], normalize(' '.join(v or '' for v in r[1:1 + len(title)])),
+                 normalize(' '.join(v or '' for v in r[1 + len(title):])))
+                for r in rows])
+    conn.execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
+    conn.execute("INSERT INTO search_index (search_index, rank) VALUES ('automerge', 4)")
+
+
+# ?1 اللغة (للدورة والدرس من الإسقاط المترجم course_text / lesson_text)، ?2 تعبير MATCH، ?3 / ?4 الحد والإزاحة
+SEARCH_SQL = f"""
+    SELECT r.rowid, r.rank,
+           c.id AS course_id,
+           ct.title AS course_title,
+           ct.short_desc,
+           c.image,
+           lt.lesson_id,
+           lt.title AS lesson_title
+    FROM (SELECT rowid, bm25(search_index, {TITLE_WEIGHT}, 1.0) AS rank
+          FROM search_index WHERE search_index MATCH ?2
+          ORDER BY rank LIMIT ?3 OFFSET ?4) r
+    LEFT JOIN lesson_text lt ON r.rowid % 2 = 1 AND lt.lang = ?1 AND lt.lesson_id = r.rowid / 2
+    JOIN courses c ON c.id = CASE WHEN r.rowid % 2 = 0 THEN r.rowid / 2 ELSE lt.course_id END
+    JOIN course_text ct ON ct.lang = ?1 AND ct.course_id = c.id
+    ORDER BY r.rank
+"""
+
+COUNT_SQL = 'SELECT COUNT(*) FROM search_index WHERE search_index MATCH ?'
+
+# معرفات الدورات المطابقة (بنفسها أو بأحد دروسها) لتصفية لوحة الإدارة
+MATCHING_COURSES_SQL = """
+    SELECT rowid / 2 FROM search_index WHERE search_index MATCH ? AND rowid % 2 = 0
+    UNION
+    SELECT l.course_id FROM search_index s JOIN lessons l ON l.id = s.rowid / 2
+    WHERE search_index MATCH ? AND s.rowid % 2 = 1
+"""
+
+
+def search(conn, query, lang='ar', page=1, per_page=PER_PAGE):
+    """(النتائج، العدد الكلي) مرتبة بـ BM25؛ العنوان أثقل من المحتوى."""
+    expr = match_expression(query)
+    if expr is None:
+        return [], 0
+    total = conn.execute(COUNT_SQL, (expr,)).fetchone()[0]
+    rows = conn.execute(SEARCH_SQL, (l10n.resolve(lang), expr, per_page, (page - 1) * per_page)).fetchall()
+    return rows, total
+
+
+if __name__ == '__main__':
+    import sqlite3
+    import sys
+
+    import migrations
+
+    usage = 'usage: python search.py --rebuild [db_path]\n       python search.py <query> [db_path]'
+    args = sys.argv[1:]
+    if not args:
+        print(usage)
+        sys.exit(2)
+    paths = [a for a in args[1:] if not a.startswith('--')]
+    conn = sqlite3.connect(paths[0] if paths else migrations.DEFAULT_DB_PATH)
+    conn.row_factory = sqlite3.Row
+    migrations.migrate(conn)
+    if args[0] == '--rebuild':
+        with conn:
+            rebuild(conn)
+        print('✅ search index rebuilt:', conn.execute('SELECT COUNT(*) FROM search_index').fetchone()[0], 'documents')
+    else:
+        rows, total = search(conn, args[0])
+        print(f'{total} results')
+        for r in rows:
+            print(f"  {r['rank']:8.3f}  {r['course_title']}" + (f" › {r['lesson_title']}" if r['lesson_id'] else ''))
+    conn.close()
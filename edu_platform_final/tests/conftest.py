@@ -0,0 +1,27 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrations  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """قاعدة مؤقتة بالمخطط الكامل (لا تلمس instance/)."""
+    path = str(tmp_path / 'db.sqlite')
+    conn = sqlite3.connect(path)
+    migrations.migrate(conn, str(tmp_path / 'uploads'))
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def conn(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    yield conn
+    conn.close()
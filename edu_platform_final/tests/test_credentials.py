@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+import credentials
+
+N = 2 ** 4  # تكلفة منخفضة لسرعة الاختبارات
+
+
+@pytest.fixture
+def hasher():
+    hasher = credentials.Hasher(n=N, workers=1, queue=0, timeout=5)
+    yield hasher
+    hasher.close()
+
+
+def occupy(hasher):
+    """يشغل الخيط الوحيد والفتحة الوحيدة حتى يُطلق الحدث المعاد."""
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+    thread = threading.Thread(target=hasher._run, args=(block,))
+    thread.start()
+    started.wait(5)
+    return release, thread
+
+
+def test_verify_and_rehash_weaker_hash(hasher):
+    stored = credentials.hash_password('secret', n=N // 2)
+    ok, new_hash = hasher.verify(stored, 'secret')
+    assert ok and new_hash and not credentials.needs_rehash(new_hash, N, credentials.DEFAULT_R, credentials.DEFAULT_P)
+    assert hasher.verify(new_hash, 'secret') == (True, None)
+    assert hasher.verify(new_hash, 'wrong') == (False, None)
+    assert hasher.verify(None, 'secret') == (False, None)
+
+
+def test_full_pool_rejects_with_busy(hasher):
+    release, thread = occupy(hasher)
+    try:
+        with pytest.raises(credentials.Busy):
+            hasher.hash('secret')
+    finally:
+        release.set()
+        thread.join()
+    assert hasher.hash('secret').startswith('scrypt$')
+
+
+def test_busy_rehash_does_not_fail_a_correct_login(hasher, monkeypatch):
+    stored = credentials.hash_password('secret', n=N // 2)
+
+    def busy(password):
+        raise credentials.Busy()
+    monkeypatch.setattr(hasher, 'hash', busy)
+    assert hasher.verify(stored, 'secret') == (True, None)
+
+
+def test_timeout_is_busy_and_keeps_the_slot_until_the_work_ends():
+    hasher = credentials.Hasher(n=N, workers=1, queue=0, timeout=0.05)
+    release = threading.Event()
+    try:
+        with pytest.raises(credentials.Busy):
+            hasher._run(release.wait, 5)
+        # التجزئة ما زالت تعمل: لا فتحة لعمل جديد
+        with pytest.raises(credentials.Busy):
+            hasher._run(lambda: None)
+        release.set()
+        hasher._executor.submit(lambda: None).result(5)  # انتظار انتهاء العمل السابق
+        assert hasher._run(lambda: 42) == 42
+    finally:
+        release.set()
+        hasher.close()
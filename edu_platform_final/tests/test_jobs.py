@@ -0,0 +1,141 @@
+import sqlite3
+import time
+
+import pytest
+
+import jobs
+from db_pool import connect
+
+NOW = 1_700_000_000.0
+
+
+@pytest.fixture(autouse=True)
+def handlers(monkeypatch):
+    ran = []
+    monkeypatch.setitem(jobs.HANDLERS, 'test_ok', lambda conn, payload: ran.append(payload))
+
+    def boom(conn, payload):
+        raise RuntimeError('boom')
+    monkeypatch.setitem(jobs.HANDLERS, 'test_fail', boom)
+    return ran
+
+
+def add(conn, kind='test_ok', **kwargs):
+    job_id = jobs.enqueue(conn, kind, {'n': 1}, now=NOW, **kwargs)
+    conn.commit()
+    return job_id
+
+
+def test_lease_takes_oldest_ready_job(conn):
+    first = add(conn)
+    add(conn)
+    add(conn, delay=60)
+    job = jobs.lease(conn, 'w1', now=NOW)
+    assert job['id'] == first
+    assert (job['status'], job['attempts'], job['lease_owner']) == ('running', 1, 'w1')
+    assert job['leased_until'] == NOW + jobs.LEASE_SECONDS
+
+
+def test_delayed_job_waits_for_run_after(conn):
+    job_id = add(conn, delay=60)
+    assert jobs.lease(conn, 'w1', now=NOW + 59) is None
+    assert jobs.lease(conn, 'w1', now=NOW + 60)['id'] == job_id
+
+
+def test_unique_enqueue_reuses_queued_job(conn):
+    job_id = add(conn, unique=True)
+    assert add(conn, unique=True) == job_id
+    jobs.lease(conn, 'w1', now=NOW)
+    assert add(conn, unique=True) != job_id
+
+
+def test_expired_lease_of_dead_owner_is_re_leased(conn):
+    job_id = add(conn, max_attempts=3)
+    dead = jobs.lease(conn, 'dead', lease_seconds=30, now=NOW)
+    assert jobs.lease(conn, 'live', now=NOW + 30) is None  # الحجز ما زال صالحاً
+    alive = jobs.lease(conn, 'live', now=NOW + 31)
+    assert alive['id'] == job_id
+    assert (alive['attempts'], alive['lease_owner']) == (2, 'live')
+    # نتيجة العامل الميت بعد عودته متأخراً لا تُحتسب
+    assert not jobs.complete(conn, dead)
+    assert jobs.get(conn, job_id)['status'] == 'running'
+    assert jobs.run_job(conn, alive)
+    assert jobs.get(conn, job_id)['status'] == 'done'
+
+
+def test_lease_expired_on_last_attempt_fails_the_job(conn):
+    job_id = add(conn, max_attempts=1)
+    jobs.lease(conn, 'dead', lease_seconds=30, now=NOW)
+    assert jobs.lease(conn, 'live', now=NOW + 31) is None
+    row = jobs.get(conn, job_id)
+    assert (row['status'], row['last_error'], row['leased_until']) == ('failed', 'lease expired', None)
+    assert row['finished_at'] == NOW + 31
+
+
+def test_failure_retries_with_backoff_then_fails(conn):
+    job_id = add(conn, 'test_fail', max_attempts=3)
+    now, delays = NOW, []
+    for attempt in (1, 2):
+        job = jobs.lease(conn, 'w1', now=now)
+        assert job['attempts'] == attempt
+        jobs.fail(conn, job, 'RuntimeError: boom', now=now)
+        row = jobs.get(conn, job_id)
+        assert (row['status'], row['leased_until'], row['finished_at']) == ('queued', None, None)
+        delays.append(row['run_after'] - now)
+        assert jobs.lease(conn, 'w1', now=row['run_after'] - 1) is None
+        now = row['run_after']
+    assert delays == [jobs.RETRY_BASE_SECONDS, 2 * jobs.RETRY_BASE_SECONDS]
+    job = jobs.lease(conn, 'w1', now=now)
+    assert not jobs.run_job(conn, job)
+    row = jobs.get(conn, job_id)
+    assert row['status'] == 'failed' and row['attempts'] == 3
+    assert row['last_error'] == 'RuntimeError: boom'
+    assert row['finished_at'] is not None
+    assert jobs.lease(conn, 'w1', now=time.time() + 86400) is None
+
+
+def test_unknown_kind_is_a_failure(conn):
+    job_id = add(conn, 'no_such_kind', max_attempts=1)
+    assert not jobs.run_job(conn, jobs.lease(conn, 'w1', now=NOW))
+    assert 'LookupError' in jobs.get(conn, job_id)['last_error']
+
+
+def test_retry_requeues_failed_job_with_fresh_attempts(conn):
+    job_id = add(conn, 'test_fail', max_attempts=1)
+    jobs.run_job(conn, jobs.lease(conn, 'w1', now=NOW))
+    assert jobs.retry(conn, job_id, now=NOW + 5)
+    row = jobs.get(conn, job_id)
+    assert (row['status'], row['attempts'], row['run_after'], row['finished_at']) == ('queued', 0, NOW + 5, None)
+    assert not jobs.retry(conn, job_id)  # ليست فاشلة الآن
+    assert jobs.stats(conn)['queued'] == 1
+
+
+def test_worker_survives_errors_recording_results(db_path, monkeypatch, handlers):
+    complete = jobs.complete
+    calls = []
+
+    def flaky_complete(conn, job, now=None):
+        calls.append(job['id'])
+        if len(calls) == 1:
+            conn.execute('UPDATE jobs SET updated_at = updated_at')  # معاملة مفتوحة يجب التراجع عنها
+            raise sqlite3.OperationalError('database is locked')
+        return complete(conn, job, now)
+    monkeypatch.setattr(jobs, 'complete', flaky_complete)
+    conn = connect(db_path)
+    for n in range(3):
+        jobs.enqueue(conn, 'test_ok', {'n': n})
+    conn.commit()
+    worker = jobs.Worker(lambda: connect(db_path),
+                         concurrency=1, poll_interval=0.05, lease_seconds=1).start()
+    try:
+        deadline = time.time() + 10
+        while jobs.stats(conn)['done'] < 3 and time.time() < deadline:
+            time.sleep(0.05)
+        assert jobs.stats(conn)['done'] == 3
+        assert all(t.is_alive() for t in worker._threads)
+    finally:
+        worker.stop()
+        conn.close()
+    # المهمة التي لم تُسجَّل نتيجتها أُعيد تنفيذها بعد انتهاء حجزها
+    assert sorted(p['n'] for p in handlers) == [0, 0, 1, 2]
+
@@ -0,0 +1,44 @@
+import os
+
+import pytest
+from flask import Flask
+from werkzeug.exceptions import NotFound
+
+import media
+import uploads
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(MEDIA_MAX_AGE=0, MEDIA_OFFLOAD='none', MEDIA_ACCEL_PREFIX='/_protected_uploads/')
+    return app
+
+
+def write(directory, name, data=b'video'):
+    path = os.path.join(directory, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+@pytest.mark.parametrize('name', [
+    f'{uploads.PARTIAL_DIR}/0123abcd{media.PART_SUFFIX}',  # رفع مجزأ غير مكتمل
+    f'tmpk3j2{media.PART_SUFFIX}',                         # save_upload أثناء الكتابة
+    '.hidden.mp4',
+])
+def test_files_being_written_are_not_served(app, tmp_path, name):
+    write(str(tmp_path), name)
+    with app.test_request_context():
+        with pytest.raises(NotFound):
+            media.send_media(str(tmp_path), name)
+
+
+def test_stored_blob_is_served(app, tmp_path):
+    name = media.blob_name('lesson.mp4', 'ab' * 32)
+    write(str(tmp_path), name)
+    with app.test_request_context():
+        response = media.send_media(str(tmp_path), name)
+        assert response.status_code == 200
+        assert response.cache_control.immutable
+        response.close()
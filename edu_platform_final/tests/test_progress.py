@@ -0,0 +1,53 @@
+import pytest
+
+import progress
+
+
+@pytest.fixture
+def course(conn):
+    progress.register_functions(conn)
+    conn.execute("INSERT INTO users (id, username, fullname, email, password) "
+                 "VALUES (1, 'u1', 'U One', 'u1@example.com', 'x')")
+    course_id = conn.execute("INSERT INTO courses (title_ar, title_en) VALUES ('د', 'C')").lastrowid
+    for position in range(3):
+        add_lesson(conn, course_id, position)
+    conn.execute('INSERT INTO enrollments (user_id, course_id, approved) VALUES (1, ?, 1)', (course_id,))
+    conn.commit()
+    return course_id
+
+
+def add_lesson(conn, course_id, position):
+    return conn.execute('INSERT INTO lessons (course_id, title_ar, title_en, position) VALUES (?, ?, ?, ?)',
+                        (course_id, f'درس {position}', f'Lesson {position}', position)).lastrowid
+
+
+def lessons(conn, course_id):
+    return conn.execute('SELECT id, progress_slot FROM lessons WHERE course_id = ? ORDER BY id',
+                        (course_id,)).fetchall()
+
+
+def test_new_lessons_get_increasing_slots(conn, course):
+    assert [row['progress_slot'] for row in lessons(conn, course)] == [0, 1, 2]
+
+
+@pytest.mark.parametrize('notify_store', [True, False])
+def test_slot_of_deleted_last_lesson_is_not_reused(conn, course, notify_store):
+    store = progress.get_store('bitset')
+    last = lessons(conn, course)[-1]
+    store.mark_completed(conn, 1, last['id'], course)
+    lesson = conn.execute('SELECT * FROM lessons WHERE id = ?', (last['id'],)).fetchone()
+    conn.execute('DELETE FROM lessons WHERE id = ?', (last['id'],))
+    if notify_store:
+        store.lesson_deleted(conn, lesson)
+    new_id = add_lesson(conn, course, 3)
+    conn.commit()
+    assert lessons(conn, course)[-1]['progress_slot'] == 3
+    assert not store.is_completed(conn, 1, new_id)
+    assert [l['completed'] for l in store.course_lessons(conn, 1, course, 'en')] == [None, None, None]
+
+
+def test_explicit_slots_advance_the_counter(conn, course):
+    conn.execute('INSERT INTO lessons (course_id, title_ar, title_en, position, progress_slot) '
+                 "VALUES (?, 'د', 'L', 9, 10)", (course,))
+    add_lesson(conn, course, 10)
+    assert lessons(conn, course)[-1]['progress_slot'] == 11
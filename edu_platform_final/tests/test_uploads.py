@@ -0,0 +1,87 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+import media
+import uploads
+
+
+@pytest.fixture
+def upload_dir(tmp_path):
+    return str(tmp_path / 'uploads')
+
+
+def start(conn, upload_dir, size):
+    return uploads.create(conn, upload_dir, 'lecture.mp4', size)
+
+
+def patch(conn, upload_dir, upload_id, offset, data, **kwargs):
+    upload = uploads.get(conn, upload_id)
+    return uploads.write_chunk(conn, upload_dir, upload, offset, io.BytesIO(data), len(data), **kwargs)
+
+
+def partial_bytes(upload_dir, upload_id):
+    with open(os.path.join(upload_dir, uploads.PARTIAL_DIR, upload_id + media.PART_SUFFIX), 'rb') as f:
+        return f.read()
+
+
+def test_chunks_are_stored_under_their_sha256_without_rereading(conn, upload_dir, monkeypatch):
+    data = os.urandom(300_000)
+    upload = start(conn, upload_dir, len(data))
+    monkeypatch.setattr(media, 'file_sha256', lambda path: pytest.fail('file re-read on finalize'))
+    assert patch(conn, upload_dir, upload['id'], 0, data[:100_000]) == 100_000
+    assert patch(conn, upload_dir, upload['id'], 100_000, data[100_000:]) == len(data)
+    name = uploads.get(conn, upload['id'])['stored_name']
+    assert name == media.blob_name('lecture.mp4', hashlib.sha256(data).hexdigest())
+    with open(os.path.join(upload_dir, name), 'rb') as f:
+        assert f.read() == data
+
+
+def test_finalize_rehashes_when_digest_is_not_in_this_process(conn, upload_dir):
+    data = os.urandom(1000)
+    upload = start(conn, upload_dir, len(data))
+    patch(conn, upload_dir, upload['id'], 0, data[:400])
+    uploads._keep_digest(upload['id'], None, None)  # المقطع الأول كتبته عملية أخرى
+    patch(conn, upload_dir, upload['id'], 400, data[400:])
+    assert uploads.get(conn, upload['id'])['stored_name'] == \
+        media.blob_name('lecture.mp4', hashlib.sha256(data).hexdigest())
+
+
+def test_stale_offset_is_rejected_before_writing(conn, upload_dir):
+    upload = start(conn, upload_dir, 8)
+    stale = uploads.get(conn, upload['id'])  # قرأه الطلب قبل أن يكتب طلب آخر المقطع الأول
+    patch(conn, upload_dir, upload['id'], 0, b'aaaa')
+    with pytest.raises(uploads.UploadError) as e:
+        uploads.write_chunk(conn, upload_dir, stale, 0, io.BytesIO(b'bbbb'), 4)
+    assert e.value.status == 409 and 'server has 4' in e.value.message
+    assert partial_bytes(upload_dir, upload['id']) == b'aaaa'
+
+
+def test_concurrent_write_at_same_offset_is_rejected_before_writing(conn, upload_dir):
+    upload = start(conn, upload_dir, 8)
+    uploads._acquire(conn, upload['id'], 0, 'other-request')  # طلب آخر يكتب المقطع الآن
+    with pytest.raises(uploads.UploadError) as e:
+        patch(conn, upload_dir, upload['id'], 0, b'bbbbbbbb')
+    assert e.value.status == 409
+    assert partial_bytes(upload_dir, upload['id']) == b''
+    assert uploads.get(conn, upload['id'])['writer'] == 'other-request'
+
+
+def test_expired_write_lease_can_be_taken_over(conn, upload_dir):
+    upload = start(conn, upload_dir, 4)
+    conn.execute("UPDATE uploads SET writer = 'dead', writer_until = 0 WHERE id = ?", (upload['id'],))
+    conn.commit()
+    assert patch(conn, upload_dir, upload['id'], 0, b'abcd') == 4
+
+
+def test_checksum_mismatch_releases_lease_and_keeps_offset(conn, upload_dir):
+    upload = start(conn, upload_dir, 8)
+    with pytest.raises(uploads.UploadError) as e:
+        patch(conn, upload_dir, upload['id'], 0, b'abcd', checksum_header='sha256 ' + 'A' * 43 + '=')
+    assert e.value.status == uploads.CHECKSUM_MISMATCH
+    row = uploads.get(conn, upload['id'])
+    assert (row['received'], row['writer']) == (0, None)
+    assert partial_bytes(upload_dir, upload['id']) == b''
+    assert patch(conn, upload_dir, upload['id'], 0, b'abcdefgh') == 8
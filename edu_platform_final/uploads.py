@@ -0,0 +1,257 @@
+# === الرفع المجزأ القابل للاستئناف (فيديو الدروس الكبيرة) ===
+# بروتوكول بسيط على نمط tus (المسارات في app.py):
+#   POST   /admin/uploads        {"filename", "size"}  → 201 {"id", "offset": 0}
+#   HEAD   /admin/uploads/<id>   → Upload-Offset / Upload-Length (لاستئناف رفع منقطع)
+#   PATCH  /admin/uploads/<id>   Upload-Offset: n  [Upload-Checksum: sha256 <base64>] + البايتات
+#   DELETE /admin/uploads/<id>
+# البايتات تُكتب مباشرة (بذاكرة محدودة) في ملف جزئي داخل مجلد الرفع نفسه، وعند اكتمالها
+# يُنقل ذرياً إلى المخزن المعنون بالمحتوى (media.py) ثم يُربط بالدرس عبر claim().
+# كل PATCH يحجز الرفع (writer / writer_until) بشرط الإزاحة قبل كتابة أي بايت: طلبان متزامنان
+# عند نفس الإزاحة لا يكتبان معاً، والمرفوض (409) لم يلمس الملف.
+# بصمة sha256 تُحدَّث مع كل مقطع في ذاكرة العملية فلا يُعاد قراءة الملف كله عند اكتماله
+# (إلا إن كتبت عملية أخرى بعض المقاطع، أو أُعيد تشغيل الخادم أثناء الرفع).
+import base64
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from werkzeug.exceptions import ClientDisconnected
+
+import media
+
+PARTIAL_DIR = '.partial'
+CHECKSUM_MISMATCH = 460  # نفس رمز tus
+# مدة حجز الكتابة؛ تُجدَّد أثناء استقبال المقطع، وتنتهي وحدها إن مات العامل أثناءه
+WRITE_LEASE_SECONDS = 60
+DIGEST_CACHE_SIZE = 64
+
+# upload_id → (الإزاحة التي تغطيها البصمة، كائن sha256)
+_digests = OrderedDict()
+_digests_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _partial_path(directory, upload_id):
+    return os.path.join(directory, PARTIAL_DIR, upload_id + media.PART_SUFFIX)
+
+
+def _parse_checksum(header):
+    """'sha256 <base64>' → البايتات المتوقعة؛ None إن لم تُرسل."""
+    if not header:
+        return None
+    algorithm, _, value = header.partition(' ')
+    if algorithm.lower() != 'sha256':
+        raise UploadError(400, 'unsupported checksum algorithm')
+    try:
+        return base64.b64decode(value.strip(), validate=True)
+    except ValueError:
+        raise UploadError(400, 'malformed checksum')
+
+
+def get(conn, upload_id):
+    return conn.execute('SELECT * FROM uploads WHERE id = ?', (upload_id,)).fetchone()
+
+
+def create(conn, directory, filename, size, user_id=None):
+    upload_id = uuid.uuid4().hex
+    os.makedirs(os.path.join(directory, PARTIAL_DIR), exist_ok=True)
+    open(_partial_path(directory, upload_id), 'wb').close()
+    conn.execute('INSERT INTO uploads (id, filename, size, created_by) VALUES (?, ?, ?, ?)',
+                 (upload_id, filename, size, user_id))
+    conn.commit()
+    return get(conn, upload_id)
+
+
+def _running_digest(upload_id, offset):
+    """نسخة من بصمة البايتات [0, offset) إن كانت في ذاكرة هذه العملية، وإلا None."""
+    if offset == 0:
+        return hashlib.sha256()
+    with _digests_lock:
+        entry = _digests.get(upload_id)
+        if entry is None or entry[0] != offset:
+            return None
+        _digests.move_to_end(upload_id)
+        return entry[1].copy()
+
+
+def _keep_digest(upload_id, offset, digest):
+    with _digests_lock:
+        if digest is None:
+            _digests.pop(upload_id, None)
+            return
+        _digests[upload_id] = (offset, digest)
+        _digests.move_to_end(upload_id)
+        while len(_digests) > DIGEST_CACHE_SIZE:
+            _digests.popitem(last=False)
+
+
+def _acquire(conn, upload_id, offset, token):
+    """حجز الرفع للكتابة عند offset؛ 409 إن تغيرت الإزاحة أو اكتمل أو يكتب طلب آخر الآن."""
+    now = time.time()
+    cur = conn.execute("""
+        UPDATE uploads SET writer = ?, writer_until = ?
+        WHERE id = ? AND received = ? AND stored_name IS NULL
+              AND (writer IS NULL OR writer_until < ?)
+    """, (token, now + WRITE_LEASE_SECONDS, upload_id, offset, now))
+    conn.commit()
+    if cur.rowcount == 1:
+        return
+    upload = get(conn, upload_id)
+    if upload is None:
+        raise UploadError(404, 'unknown upload')
+    if upload['stored_name']:
+        raise UploadError(409, 'upload already complete')
+    if upload['received'] != offset:
+        raise UploadError(409, f"offset mismatch, server has {upload['received']}")
+    raise UploadError(409, 'concurrent write to the same upload')
+
+
+def _renew(conn, upload_id, token):
+    cur = conn.execute('UPDATE uploads SET writer_until = ? WHERE id = ? AND writer = ?',
+                       (time.time() + WRITE_LEASE_SECONDS, upload_id, token))
+    conn.commit()
+    if cur.rowcount == 0:
+        raise UploadError(409, 'write lease lost')
+
+
+def write_chunk(conn, directory, upload, offset, stream, length, checksum_header=None):
+    """كتابة مقطع عند offset؛ يعيد الإزاحة الجديدة ويُنهي الرفع إذا اكتمل."""
+    if upload['stored_name']:
+        raise UploadError(409, 'upload already complete')
+    if length is None:
+        raise UploadError(411, 'Content-Length required')
+    if offset + length > upload['size']:
+        raise UploadError(413, 'chunk exceeds declared upload size')
+    expected = _parse_checksum(checksum_header)
+
+    token = uuid.uuid4().hex
+    _acquire(conn, upload['id'], offset, token)
+    try:
+        chunk_digest = hashlib.sha256()
+        running = _running_digest(upload['id'], offset)
+        written = 0
+        renew_at = time.monotonic() + WRITE_LEASE_SECONDS / 3
+        path = _partial_path(directory, upload['id'])
+        with open(path, 'r+b') as fh:
+            fh.seek(offset)
+            try:
+                while written < length:
+                    chunk = stream.read(min(media.CHUNK_SIZE, length - written))
+                    if not chunk:
+                        break
+                    chunk_digest.update(chunk)
+                    if running is not None:
+                        running.update(chunk)
+                    fh.write(chunk)
+                    written += len(chunk)
+                    if time.monotonic() >= renew_at:
+                        _renew(conn, upload['id'], token)
+                        renew_at = time.monotonic() + WRITE_LEASE_SECONDS / 3
+            except ClientDisconnected:
+                pass
+            # مقطع ناقص أو تالف مع checksum: نتجاهله كله ليعيد العميل إرساله
+            if expected is not None and (written < length or chunk_digest.digest() != expected):
+                fh.truncate(offset)
+                if written < length:
+                    raise UploadError(400, 'incomplete chunk')
+                raise UploadError(CHECKSUM_MISMATCH, 'checksum mismatch')
+            fh.flush()
+            os.fsync(fh.fileno())
+
+        received = offset + written
+        cur = conn.execute("""
+            UPDATE uploads SET received = ?, writer = NULL, writer_until = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND writer = ?
+        """, (received, upload['id'], token))
+        conn.commit()
+        if cur.rowcount == 0:
+            raise UploadError(409, 'write lease lost')
+        token = None
+    finally:
+        if token is not None:
+            conn.execute('UPDATE uploads SET writer = NULL, writer_until = NULL WHERE id = ? AND writer = ?',
+                         (upload['id'], token))
+            conn.commit()
+    if received == upload['size']:
+        finalize(conn, directory, get(conn, upload['id']), running.hexdigest() if running is not None else None)
+    else:
+        _keep_digest(upload['id'], received, running)
+    return received
+
+
+def finalize(conn, directory, upload, hexdigest=None):
+    """نقل الملف المكتمل إلى المخزن المعنون بالمحتوى (rename ذري داخل نفس المجلد).
+
+    hexdigest: البصمة المحسوبة أثناء الرفع؛ بدونها يُقرأ الملف كله لحسابها.
+    """
+    _keep_digest(upload['id'], None, None)
+    name = media.store_file(conn, directory, _partial_path(directory, upload['id']), upload['filename'],
+                            hexdigest)
+    conn.execute('UPDATE uploads SET stored_name = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                 (name, upload['id']))
+    conn.commit()
+    return name
+
+
+def claim(conn, upload_id):
+    """ربط رفع مكتمل بدرس: يعيد اسم الملف ويحذف سجل الرفع (ضمن معاملة المستدعي)."""
+    upload = get(conn, upload_id)
+    if upload is None or not upload['stored_name']:
+        return None
+    conn.execute('DELETE FROM uploads WHERE id = ?', (upload_id,))
+    return upload['stored_name']
+
+
+def discard(conn, directory, upload):
+    _keep_digest(upload['id'], None, None)
+    path = _partial_path(directory, upload['id'])
+    if os.path.exists(path):
+        os.remove(path)
+    # الملف المكتمل (إن وُجد) يفقد مرجعه هنا ويحذفه media.collect_garbage
+    conn.execute('DELETE FROM uploads WHERE id = ?', (upload['id'],))
+    conn.commit()
+
+
+def purge_stale(conn, directory, max_age_hours=48):
+    """حذف الرفعات المتروكة (غير المكتملة أو غير المربوطة بدرس) الأقدم من max_age_hours."""
+    stale = conn.execute("SELECT * FROM uploads WHERE updated_at < datetime('now', ?)",
+                         (f'-{int(max_age_hours)} hours',)).fetchall()
+    for upload in stale:
+        discard(conn, directory, upload)
+    media.collect_garbage(conn, directory)
+    return len(stale)
+
+
+if __name__ == '__main__':
+    import sqlite3
+    import sys
+
+    import migrations
+
+    usage = 'usage: python uploads.py --purge [--hours N] [--uploads DIR] [db_path]'
+    args = sys.argv[1:]
+    upload_dir = migrations.upload_dir_arg(args)
+    hours = 48
+    if '--hours' in args:
+        i = args.index('--hours')
+        hours = int(args[i + 1])
+        del args[i:i + 2]
+    paths = [a for a in args if not a.startswith('--')]
+    conn = sqlite3.connect(paths[0] if paths else migrations.DEFAULT_DB_PATH)
+    conn.row_factory = sqlite3.Row
+    migrations.migrate(conn, upload_dir)
+    if '--purge' in args:
+        print(f'✅ removed {purge_stale(conn, upload_dir, hours)} abandoned uploads older than {hours}h')
+    else:
+        print(usage)
+        sys.exit(2)
+    conn.close()
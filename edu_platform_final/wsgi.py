@@ -0,0 +1,64 @@
+# نقطة دخول الإنتاج: gunicorn wsgi:app (الإعداد في gunicorn.conf.py)، أو: python wsgi.py [خيارات gunicorn]
+# التهيئة تعمل مرة واحدة: في العملية الأم قبل fork عند preload_app (الافتراضي)، وبدونه
+# في أول عامل يحصل على القفل فيجدها الباقون منجزة:
+#   - المجلدات (القاعدة، الرفع)
+#   - ترحيلات المخطط (العمال يقرؤون الإصدار فقط)
+#   - تسخين الكاش: قوالب Jinja مترجمة (تُشارك بين العمال عبر copy-on-write) ودروس بلا HTML مجهز
+# لا اتصالات ولا خيوط تبقى مفتوحة في العملية الأم: المجمّع وعمال المهام تبدأ في كل عامل عند أول طلب.
+# خلف وكيل عكسي (nginx...): TRUSTED_PROXIES = عدد الوكلاء الموثوقين أمام gunicorn (0 = لا شيء)؛
+# بدونه يرى التطبيق عنوان الوكيل لكل العملاء فيتشارك الجميع دلو حد المعدل نفسه.
+import fcntl
+import os
+import sys
+import time
+
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+import app as webapp
+import lesson_html
+import migrations
+import progress
+import uploads
+from db_pool import connect as connect_db
+
+app = webapp.app
+if 'RATE_LIMIT_BACKEND' not in os.environ:
+    # دلاء memory لكل عامل: مع N عامل يصبح الحد الفعلي N ضعفاً
+    app.config['RATE_LIMIT_BACKEND'] = 'sqlite'
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 0))
+if TRUSTED_PROXIES:
+    # X-Forwarded-For/Proto/Host من آخر TRUSTED_PROXIES وكيلاً فقط؛ ما قبلها يرسله العميل ولا يُوثق به
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES, x_proto=TRUSTED_PROXIES,
+                            x_host=TRUSTED_PROXIES)
+
+
+def prepare():
+    """تهيئة الخادم (آمنة مع عدة عمال: قفل ملف، وكل خطوة لا تفعل شيئاً إن سبقها غيرها)."""
+    path = app.config['DATABASE']
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], uploads.PARTIAL_DIR), exist_ok=True)
+    t0 = time.perf_counter()
+    with open(path + '.prepare.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        conn = connect_db(path, on_connect=progress.register_functions)
+        try:
+            applied = migrations.migrate(conn, app.config['UPLOAD_FOLDER'])
+            with conn:
+                compiled = lesson_html.compile_missing(conn)
+        finally:
+            conn.close()
+    templates = [name for name in app.jinja_env.list_templates() if name.endswith('.html')]
+    for name in templates:
+        app.jinja_env.get_template(name)
+    print(f'✅ prepared {path} in {time.perf_counter() - t0:.2f}s: migrations {applied or "none"}, '
+          f'{compiled} lesson fragments, {len(templates)} templates', file=sys.stderr, flush=True)
+
+
+if __name__ == '__main__':
+    from gunicorn.app.wsgiapp import run
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.argv = ['gunicorn', '--config', os.path.join(here, 'gunicorn.conf.py'), '--chdir', here,
+                *sys.argv[1:], 'wsgi:app']
+    sys.exit(run())
+
+prepare()